@@ -1,23 +1,61 @@
+import hashlib
 import importlib
 import importlib.util
+import os
 import sys
-from collections.abc import Iterable, Iterator
+import warnings
+from collections.abc import Callable, Iterable, Iterator, Mapping, Sequence
+from contextlib import ExitStack, contextmanager
 from dataclasses import dataclass, field, replace
-from io import TextIOWrapper
+from functools import partial
 from itertools import chain
 from os import PathLike
 from pathlib import Path
-from typing import IO, Generic, Literal, Protocol, TypedDict, TypeVar, Union
-
+from types import TracebackType
+from typing import (
+    IO,
+    TYPE_CHECKING,
+    ClassVar,
+    Generic,
+    Literal,
+    NotRequired,
+    Protocol,
+    Self,
+    TypedDict,
+    TypeVar,
+    Union,
+    runtime_checkable,
+)
+
+from snutree.cache import (
+    CachedEntities,
+    ConfigCache,
+    EntityCache,
+    EntityCacheConfig,
+    loading,
+)
+from snutree.ingest import IngestConfig, InputRows, ReadMode, ingest
 from snutree.model.entity import CustomEntity, Entity, EntityId
-from snutree.model.rank import AnyRank, Rank
+from snutree.model.merge import EntityMerger, MergePolicy
+from snutree.model.rank import AnyRank, Rank, RankFilter, RankWindow
 from snutree.model.tree import FamilyTree, FamilyTreeConfig
+from snutree.model.validation import StructureValidator, ValidationConfig
 from snutree.reader import Reader, ReaderConfigs
 from snutree.reader.csv import CsvReader
 from snutree.reader.json import JsonReader
-from snutree.reader.sql import SqlReader
+from snutree.reader.sql import SqlConnectionPool, SqlReader
+from snutree.reader.sqlite import SqliteReader
 from snutree.writer.dot import DotWriter, DotWriterConfig
-from snutree.writer.pdf import PdfWriter
+
+# Writers other than the DOT writer are only imported once they are configured
+# or used
+if TYPE_CHECKING:
+    from snutree.writer.graphviz import (
+        GraphvizFormat,
+        GraphvizWriter,
+        GraphvizWriterConfig,
+    )
+    from snutree.writer.tidy import TidyWriter, TidyWriterConfig
 
 MemberT = TypeVar("MemberT")
 
@@ -26,36 +64,97 @@ class Parser(Protocol[AnyRank, MemberT]):
     def parse(self, rows: Iterable[dict[str, str]]) -> Iterable[Entity[AnyRank, MemberT]]: ...
 
 
+@runtime_checkable
+class FilterableParser(Protocol):
+    def row_filter(self, window: RankWindow) -> RankFilter:
+        """
+        Return a cheap check on raw rows that discards rows outside the window
+        before they are parsed.
+        """
+
+
+@runtime_checkable
+class RowwiseParser(Protocol):
+    # Marks parsers that parse each row independently of every other row, so
+    # that any subset of rows can be parsed on its own
+    rowwise: ClassVar[bool]
+
+
+@runtime_checkable
+class StatefulParser(Protocol):
+    # Parsers that keep state from one input to the next. The state after
+    # parsing an input is cached with its entities, and restored when they
+    # are taken from the cache instead of being parsed again.
+    def save_state(self) -> object: ...
+
+    def restore_state(self, state: object) -> None: ...
+
+
+@runtime_checkable
+class ProjectingParser(Protocol):
+    # The columns of the rows the parser actually uses
+    columns: ClassVar[frozenset[str]]
+
+
 class Writer(Protocol[AnyRank, MemberT]):
     def write(self, tree: FamilyTree[AnyRank, MemberT]) -> bytes: ...
 
+    def write_to(self, tree: FamilyTree[AnyRank, MemberT], output: IO[bytes]) -> None: ...
+
 
 InputFile = Union[
     Path,
     IO[str],
-    tuple[TextIOWrapper, str],
+    tuple[IO[str], str],
 ]
 
 
 OutputFormat = Literal[
     "dot",
     "pdf",
+    "svg",
+    "png",
 ]
 
+GRAPHVIZ_FORMATS: "list[GraphvizFormat]" = ["pdf", "svg", "png"]
+
+
+def graphviz_writer_config() -> "GraphvizWriterConfig":
+    # pylint: disable-next=import-outside-toplevel
+    from snutree.writer.graphviz import GraphvizWriterConfig
+
+    return GraphvizWriterConfig()
+
 
 @dataclass
 class WritersConfig(Generic[AnyRank, MemberT]):
     dot: DotWriterConfig[AnyRank, MemberT] = field(default_factory=DotWriterConfig)
+    graphviz: "GraphvizWriterConfig" = field(default_factory=graphviz_writer_config)
+
+    # Write SVG with snutree's own tidy tree layout instead of with Graphviz
+    tidy: "TidyWriterConfig | None" = None
 
 
 @dataclass
-class SnutreeConfig(Generic[AnyRank, MemberT]):
+class SnutreeConfig(Generic[AnyRank, MemberT]):  # pylint: disable=too-many-instance-attributes
     rank_type: type[AnyRank]
     parser: Parser[AnyRank, MemberT]
     tree: FamilyTreeConfig[AnyRank]
     writers: WritersConfig[AnyRank, MemberT]
     readers: ReaderConfigs = field(default_factory=ReaderConfigs)
 
+    # Cache the entities parsed from each input file
+    cache: EntityCacheConfig | None = None
+
+    # How many input files are read at once, and how far ahead of the parser
+    ingest: IngestConfig = field(default_factory=IngestConfig)
+
+    # How entities with the same key from different sources are merged
+    merge: MergePolicy = "last"
+
+    # Whether problems with the structure of the tree fail the run
+    validation: ValidationConfig = field(default_factory=ValidationConfig)
+
     custom_entities: list[CustomEntity[AnyRank, MemberT]] = field(default_factory=list)
     custom_relationships: set[tuple[str, str]] = field(default_factory=set)
 
@@ -67,30 +166,86 @@ class SnutreeConfig(Generic[AnyRank, MemberT]):
         return config
 
     @classmethod
-    def from_path(cls, path: Path) -> "SnutreeConfig[Rank, object]":
-        spec = importlib.util.spec_from_file_location("snutree_config", path)
+    def from_path(cls, path: Path, cache: ConfigCache | None = None) -> "SnutreeConfig[Rank, object]":
+        """
+        Load the config defined in the module at the given path.
+
+        Each config module is given a name of its own, derived from its path,
+        so that different configs loaded in the same process don't replace
+        one another.
+
+        With a cache, a config that holds only data is loaded without running
+        its module again, as long as neither the module nor its local imports
+        have changed. Other configs still run their module, but the tables they
+        build with `static_table` are taken from the cache.
+        """
+
+        path = path.resolve()
+        source = path.read_bytes()
+        cached = cache.get(path, source) if cache is not None else None
+        if cache is not None and cached is not None:
+            loaded = cache.config(cached)
+            if isinstance(loaded, SnutreeConfig):
+                return loaded
+
+        module_name = f"snutree_config_{hashlib.sha256(bytes(path)).hexdigest()[:16]}"
+        spec = importlib.util.spec_from_file_location(module_name, path)
         assert spec is not None
         module = importlib.util.module_from_spec(spec)
         assert module is not None
-        sys.modules["snutree_config"] = module
+        sys.modules[module_name] = module
         assert spec.loader is not None
-        spec.loader.exec_module(module)
+        with loading(cached) as tables:
+            spec.loader.exec_module(module)
         config: object = getattr(module, "__snutree__")
         assert isinstance(config, SnutreeConfig)
+        if cache is not None:
+            cache.put(path, source, module_name, config, tables)
         return config
 
 
 class SnutreeWriters(TypedDict, Generic[AnyRank, MemberT]):
     dot: DotWriter[AnyRank, MemberT]
-    pdf: PdfWriter[AnyRank, MemberT]
+    pdf: "GraphvizWriter[AnyRank, MemberT]"
+    svg: "NotRequired[GraphvizWriter[AnyRank, MemberT] | TidyWriter[AnyRank, MemberT]]"
+    png: "NotRequired[GraphvizWriter[AnyRank, MemberT]]"
+
+
+def writers(config: WritersConfig[AnyRank, MemberT]) -> SnutreeWriters[AnyRank, MemberT]:
+    """
+    Return the writers for each output format. Writers are imported only here,
+    and the tidy writer only if it is configured.
+    """
+    # pylint: disable-next=import-outside-toplevel
+    from snutree.writer.graphviz import GraphvizWriter
+
+    dot_writer = DotWriter(config.dot)
+    svg: GraphvizWriter[AnyRank, MemberT] | TidyWriter[AnyRank, MemberT]
+    if config.tidy is None:
+        svg = GraphvizWriter(dot_writer, "svg", config=config.graphviz)
+    else:
+        # pylint: disable-next=import-outside-toplevel
+        from snutree.writer.tidy import TidyWriter
+
+        svg = TidyWriter(dot_writer, config.tidy)
+    return {
+        "dot": dot_writer,
+        "pdf": GraphvizWriter(dot_writer, "pdf", config=config.graphviz),
+        "svg": svg,
+        "png": GraphvizWriter(dot_writer, "png", config=config.graphviz),
+    }
 
 
 class SnutreeApiProtocol(Protocol):
     def run(self, input_files: Iterable[InputFile], writer_name: OutputFormat) -> bytes: ...
 
+    def run_to(self, input_files: Iterable[InputFile], writer_name: OutputFormat, output: IO[bytes]) -> None: ...
+
+    def run_files(self, input_files: Iterable[InputFile], paths: Mapping[OutputFormat, Path]) -> None: ...
+
 
 @dataclass
-class SnutreeApi(Generic[AnyRank, MemberT]):
+class SnutreeApi(Generic[AnyRank, MemberT]):  # pylint: disable=too-many-instance-attributes
     rank_type: type[AnyRank]
     readers: list[Reader]
     parser: Parser[AnyRank, MemberT]
@@ -98,54 +253,287 @@ class SnutreeApi(Generic[AnyRank, MemberT]):
     writers: SnutreeWriters[AnyRank, MemberT]
     custom_entities: list[CustomEntity[AnyRank, MemberT]]
     custom_relationships: set[tuple[str, str]]
+    pool: SqlConnectionPool = field(default_factory=SqlConnectionPool)
+    entity_cache: EntityCache | None = None
+    ingest: IngestConfig = field(default_factory=IngestConfig)
+    merger: EntityMerger = field(default_factory=EntityMerger)
+    validator: StructureValidator = field(default_factory=StructureValidator)
+
+    # Ignore cached results, but still cache the fresh ones
+    refresh: bool = False
 
     @classmethod
-    def from_config(cls, config: SnutreeConfig[AnyRank, MemberT], seed: int | None) -> "SnutreeApi[AnyRank, MemberT]":
-        dot_writer = DotWriter(config.writers.dot)
+    def from_config(
+        cls,
+        config: SnutreeConfig[AnyRank, MemberT],
+        seed: int | None,
+        refresh: bool = False,
+    ) -> "SnutreeApi[AnyRank, MemberT]":
+        pool = SqlConnectionPool() if config.readers.sql is None else SqlConnectionPool(config.readers.sql.idle_timeout)
         return cls(
             rank_type=config.rank_type,
             readers=[
                 CsvReader(),
                 JsonReader(),
-                *([SqlReader(config.readers.sql)] if config.readers.sql is not None else []),
+                *([SqlReader(config.readers.sql, pool, refresh)] if config.readers.sql is not None else []),
+                *([SqliteReader(config.readers.sqlite)] if config.readers.sqlite is not None else []),
             ],
             parser=config.parser,
             tree_config=(config.tree if seed is None else replace(config.tree, seed=seed)),
-            writers={
-                "dot": dot_writer,
-                "pdf": PdfWriter(dot_writer),
-            },
+            writers=writers(config.writers),
             custom_entities=config.custom_entities,
             custom_relationships=config.custom_relationships,
+            pool=pool,
+            entity_cache=EntityCache(config.cache) if config.cache is not None else None,
+            ingest=config.ingest,
+            merger=EntityMerger(config.merge),
+            validator=StructureValidator(config.validation),
+            refresh=refresh,
         )
 
+    def __enter__(self) -> Self:
+        return self
+
+    def __exit__(
+        self,
+        exc_type: type[BaseException] | None,
+        exc_value: BaseException | None,
+        traceback: TracebackType | None,
+    ) -> None:
+        self.close()
+
+    def close(self) -> None:
+        """
+        Close any database connections and tunnels kept open between runs.
+        """
+        self.pool.close()
+
+    @contextmanager
+    def open(self, input_file: InputFile) -> Iterator[tuple[IO[str], str]]:
+        if isinstance(input_file, PathLike):
+            with input_file.open("r") as f:
+                yield f, input_file.suffix
+        elif isinstance(input_file, IO):
+            input_filename: str = input_file.name
+            yield input_file, input_filename
+        else:
+            yield input_file
+
     def read(self, input_files: Iterable[InputFile]) -> Iterator[tuple[IO[str], str]]:
         for input_file in input_files:
-            if isinstance(input_file, PathLike):
-                with input_file.open("r") as f:
-                    yield f, input_file.suffix
-            elif isinstance(input_file, IO):
-                input_filename: str = input_file.name
-                yield input_file, input_filename
+            with ExitStack() as stack:
+                yield stack.enter_context(self.open(input_file))
+
+    def row_filter(self) -> RankFilter | None:
+        window = self.tree_config.window
+        if window.bounded and isinstance(self.parser, FilterableParser):
+            return self.parser.row_filter(window)
+        else:
+            return None
+
+    def columns(self, row_filter: RankFilter | None) -> frozenset[str] | None:
+        if isinstance(self.parser, ProjectingParser):
+            return self.parser.columns | (row_filter.columns if row_filter is not None else frozenset())
+        else:
+            return None
+
+    def reader(self, input_file: InputFile) -> Reader:
+        if isinstance(input_file, PathLike):
+            extension = input_file.suffix
+        elif isinstance(input_file, IO):
+            extension = input_file.name
+        else:
+            _, extension = input_file
+        reader = next((reader for reader in self.readers if extension in reader.extensions), None)
+        if reader is None:
+            supported = ", ".join(sorted({extension for reader in self.readers for extension in reader.extensions}))
+            raise ValueError(f"no reader for input files with extension {extension!r} (supported: {supported})")
+        return reader
+
+    def read_input(
+        self,
+        input_file: InputFile,
+        row_filter: RankFilter | None,
+        columns: frozenset[str] | None,
+    ) -> Iterator[dict[str, str]]:
+        reader = self.reader(input_file)
+        with ExitStack() as stack:
+            stream, _ = stack.enter_context(self.open(input_file))
+            yield from reader.read(stream, row_filter, columns)
+
+    def read_mode(self, input_file: InputFile, reader: Reader) -> ReadMode:
+        if reader.prefetch:
+            return ReadMode.PREFETCH
+        elif self.entity_cache is not None and reader.cacheable and isinstance(input_file, PathLike):
+            return ReadMode.FOREGROUND
+        else:
+            return ReadMode.BACKGROUND
+
+    def sources(self, input_files: Iterable[InputFile]) -> Iterator[tuple[InputFile, Reader, InputRows]]:
+        """
+        Yield each input file with its reader and its queued rows, in order.
+
+        Inputs are opened and read concurrently in the background, each read
+        ahead of the parser only as far as its queue allows. Inputs whose
+        readers prefetch (i.e., database queries) are started first and read
+        in full. Rows are still yielded in the order of the inputs, so the
+        result doesn't depend on which input happens to be read first.
+
+        Inputs whose entities might be cached are only read in the foreground,
+        once their rows are requested.
+        """
+
+        row_filter = self.row_filter()
+        columns = self.columns(row_filter)
+
+        inputs = [(input_file, self.reader(input_file)) for input_file in input_files]
+        reads = [
+            (partial(self.read_input, input_file, row_filter, columns), self.read_mode(input_file, reader))
+            for input_file, reader in inputs
+        ]
+
+        with ingest(reads, self.ingest) as sources:
+            for (input_file, reader), source in zip(inputs, sources):
+                yield input_file, reader, source
+
+    def rows(self, input_files: Iterable[InputFile]) -> Iterator[dict[str, str]]:
+        """
+        Yield the rows of every input file, in order.
+        """
+        for _, _, rows in self.sources(input_files):
+            yield from rows()
+
+    def entities(self, input_files: Iterable[InputFile]) -> Iterator[Entity[AnyRank, MemberT]]:
+        """
+        Yield the entities parsed from every input file, in order.
+
+        If an entity cache is configured, files whose entities are cached are
+        neither read nor parsed again. If the cache is incremental, changed
+        files only have their new or changed rows parsed.
+        """
+
+        if self.entity_cache is None:
+            yield from self.parser.parse(self.rows(input_files))
+            return
+
+        row_filter = self.row_filter()
+        columns = self.columns(row_filter)
+
+        for input_file, reader, rows in self.sources(input_files):
+            key = None
+            if reader.cacheable and isinstance(input_file, PathLike):
+                path = Path(input_file)
+                parts = (type(reader), self.parser, row_filter, columns)
+                key = self.entity_cache.file_key(path, *parts)
+
+            if key is None:
+                yield from self.parser.parse(rows())
+                continue
+
+            cached: CachedEntities[AnyRank, MemberT] | None = None if self.refresh else self.entity_cache.get(key)
+            if cached is not None:
+                rows.cancel()
+                if isinstance(self.parser, StatefulParser):
+                    self.parser.restore_state(cached.state)
             else:
-                yield input_file
+                incremental = self.entity_cache.config.incremental
+                if incremental and isinstance(self.parser, RowwiseParser) and self.parser.rowwise:
+                    # Previous versions of the same file are found by its path
+                    ingest_key = self.entity_cache.key(os.fsencode(path.resolve()), *parts)
+                else:
+                    ingest_key = None
+
+                if ingest_key is not None:
+                    entities = self.entity_cache.ingest(ingest_key, rows(), self.parser.parse, self.refresh)
+                else:
+                    entities = list(self.parser.parse(rows()))
+                state = self.parser.save_state() if isinstance(self.parser, StatefulParser) else None
+                cached = CachedEntities(entities, state)
+                self.entity_cache.put(key, cached)
+
+            yield from cached.entities
 
     def run(self, input_files: Iterable[InputFile], writer_name: OutputFormat) -> bytes:
+        return self.writer(writer_name).write(self.tree(input_files))
+
+    def run_to(self, input_files: Iterable[InputFile], writer_name: OutputFormat, output: IO[bytes]) -> None:
+        """
+        Write the output to the given stream as it is produced.
+        """
+        self.writer(writer_name).write_to(self.tree(input_files), output)
+
+    def run_files(self, input_files: Iterable[InputFile], paths: Mapping[OutputFormat, Path]) -> None:
+        """
+        Write the output in each of the given formats to its own file. The tree
+        is built and its DOT is written only once, and Graphviz lays the tree
+        out only once for all of its formats.
+        """
+        for writer_name in paths:
+            self.writer(writer_name)
+        self.write_files(self.tree(input_files), paths)
+
+    def write_files(self, tree: FamilyTree[AnyRank, MemberT], paths: Mapping[OutputFormat, Path]) -> None:
+        """
+        Write the tree in each of the given formats to its own file.
+        """
+        for writer_name in paths:
+            self.writer(writer_name)
+
+        dot_path = paths.get("dot")
+        if dot_path is not None:
+            with dot_path.open("wb") as f:
+                self.writers["dot"].write_to(tree, f)
+
+        # pylint: disable-next=import-outside-toplevel
+        from snutree.writer.graphviz import GraphvizWriter
+
+        graphviz_paths: dict[GraphvizFormat, Path] = {}
+        for output_format in GRAPHVIZ_FORMATS:
+            if output_format not in paths:
+                continue
+            if isinstance(self.writers.get(output_format), GraphvizWriter):
+                graphviz_paths[output_format] = paths[output_format]
+            else:
+                with paths[output_format].open("wb") as f:
+                    self.writer(output_format).write_to(tree, f)
 
+        if graphviz_paths:
+            # Graphviz writers all share the same DOT writer and differ only in format
+            self.writers["pdf"].write_files(tree, graphviz_paths, dot_path)
+
+    def writer(self, writer_name: OutputFormat) -> Writer[AnyRank, MemberT]:
         if writer_name not in self.writers:
             raise ValueError(f"writer {writer_name!r} is not configured")
-
-        readers = {extension: reader for reader in self.readers for extension in reader.extensions}
-
-        rows = (row for input_file, extension in self.read(input_files) for row in readers[extension].read(input_file))
-
-        entities = self.parser.parse(rows)
-
-        tree = FamilyTree(
+        return self.writers[writer_name]
+
+    def tree(self, input_files: Iterable[InputFile]) -> FamilyTree[AnyRank, MemberT]:
+        return self.seeded(input_files)(self.tree_config.seed)
+
+    def seeded(self, input_files: Iterable[InputFile]) -> Callable[[int], FamilyTree[AnyRank, MemberT]]:
+        """
+        Read the entities once and return a function that builds the tree from
+        them with any seed.
+        """
+        entities = self.merger.merge(chain(self.entities(input_files), self.custom_entities))
+        relationships = {(EntityId(a), EntityId(b)) for a, b in self.custom_relationships}
+
+        # Merging leaves one entity per key, so the keys of entities that
+        # conflicted are passed on to be reported as duplicates
+        report = self.validator.validate(entities, relationships, self.merger.stats.conflicting_keys)
+        if not report.valid:
+            warnings.warn(f"invalid family tree structure:\n{report}", stacklevel=4)
+
+        return partial(self.build, entities, relationships)
+
+    def build(
+        self,
+        entities: Sequence[Entity[AnyRank, MemberT]],
+        relationships: set[tuple[EntityId, EntityId]],
+        seed: int,
+    ) -> FamilyTree[AnyRank, MemberT]:
+        return FamilyTree(
             rank_type=self.rank_type,
-            entities=chain(entities, self.custom_entities),
-            relationships={(EntityId(a), EntityId(b)) for a, b in self.custom_relationships},
-            config=self.tree_config,
+            entities=entities,
+            relationships=relationships,
+            config=replace(self.tree_config, seed=seed),
         )
-
-        return self.writers[writer_name].write(tree)
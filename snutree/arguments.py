@@ -0,0 +1,28 @@
+from pathlib import Path
+
+from pydantic import BaseModel
+
+from snutree.api import OutputFormat
+
+
+class InputArgs(BaseModel):
+    input_files: list[Path]
+    input_format: str | None
+    config: Path
+    refresh: bool
+
+
+class Args(InputArgs):
+    format: list[OutputFormat]
+    output: Path | None
+    seed: int | None
+
+
+class SeedSearchArgs(InputArgs):
+    format: list[OutputFormat] | None
+    output: Path | None
+    seeds: int
+    first_seed: int
+    workers: int | None
+    budget: float | None
+    top: int
@@ -0,0 +1,430 @@
+import hashlib
+import json
+import os
+import pickle
+import sys
+from collections.abc import (
+    Callable,
+    Iterable,
+    Iterator,
+    Mapping,
+    Sequence,
+    Set,
+)
+from contextlib import contextmanager, suppress
+from contextvars import ContextVar
+from dataclasses import dataclass, fields, is_dataclass
+from enum import Enum
+from pathlib import Path
+from tempfile import NamedTemporaryFile
+from types import FunctionType
+from typing import Generic, TypeVar
+
+from snutree.model.entity import Entity
+from snutree.model.rank import AnyRank
+from snutree.reader.cache import evict
+
+MemberT = TypeVar("MemberT")
+T = TypeVar("T")
+
+
+def snutree_version() -> str:
+    # Slow to import, and only needed once an input file is cached
+    # pylint: disable-next=import-outside-toplevel
+    from importlib.metadata import PackageNotFoundError, version
+
+    try:
+        return version("snutree2")
+    except PackageNotFoundError:
+        return "unknown"
+
+
+def row_digest(row: dict[str, str]) -> str:
+    return hashlib.blake2b(json.dumps(row, sort_keys=True, default=str).encode("utf-8"), digest_size=16).hexdigest()
+
+
+def canonical(value: object) -> object:
+    """
+    Return the value as plain JSON data that is the same for equal values in
+    every process. Sets and mappings are sorted, since the order they iterate
+    in can change with the hash seed.
+
+    Raise TypeError for values that can't be encoded this way.
+    """
+    match value:
+        case None | bool() | int() | float() | str():
+            return value
+        case Mapping():
+            return sorted(([canonical(key), canonical(item)] for key, item in value.items()), key=encode)
+        case Set():
+            return ["set", sorted((canonical(item) for item in value), key=encode)]
+        case list() | tuple():
+            return [canonical(item) for item in value]
+        case _:
+            return canonical_object(value)
+
+
+def canonical_object(value: object) -> object:
+    """
+    Return enum members, classes, functions, and dataclass instances as plain
+    JSON data. Classes and functions are named by where they are defined.
+    """
+    match value:
+        case Enum():
+            return [qualified_name(type(value)), value.name]
+        case type() | FunctionType():  # type: ignore[misc]
+            return qualified_name(value)
+        case _ if is_dataclass(value):
+            names: list[str] = [field.name for field in fields(value)]  # type: ignore[misc]
+            values: dict[str, object] = {name: getattr(value, name) for name in names}  # type: ignore[misc]
+            return [qualified_name(type(value)), canonical(values)]
+        case _:
+            raise TypeError(f"no canonical encoding for {type(value).__name__}")
+
+
+def encode(value: object) -> str:
+    return json.dumps(value, sort_keys=True, separators=(",", ":"))
+
+
+def qualified_name(value: type | FunctionType) -> str:
+    name = f"{value.__module__}.{value.__qualname__}"
+    if "<" in name:
+        # Lambdas and local definitions don't have a name that is unique
+        raise TypeError(f"no canonical encoding for {name}")
+    return name
+
+
+def load(path: Path) -> object:
+    """
+    Return the object pickled in the cache file, or None if there is none or it
+    can't be loaded, marking the file as used.
+    """
+    try:
+        data = path.read_bytes()
+    except FileNotFoundError:
+        return None
+    try:
+        cached: object = pickle.loads(data)  # nosec B301 # The cache is only ever written by snutree itself
+    except (pickle.UnpicklingError, EOFError, AttributeError, ImportError):
+        return None
+    with suppress(FileNotFoundError):
+        os.utime(path)
+    return cached
+
+
+@dataclass
+class EntityCacheConfig:
+    directory: Path
+
+    # When a file has changed, parse only the rows that were added or changed
+    # since the file was last ingested (for parsers whose rows are independent)
+    incremental: bool = False
+
+    # Total size of the cache directory before the least recently used entries
+    # are evicted
+    max_bytes: int = 256 * 2**20
+
+    def __post_init__(self) -> None:
+        if self.max_bytes <= 0:
+            raise ValueError("cache size must be strictly positive")
+
+
+@dataclass
+class CachedEntities(Generic[AnyRank, MemberT]):
+    entities: Sequence[Entity[AnyRank, MemberT]]
+
+    # The state of the parser after parsing the entities, for parsers that keep
+    # state from one input to the next
+    state: object = None
+
+
+@dataclass
+class IngestedRows(Generic[AnyRank, MemberT]):
+    # The entities parsed from each row of the last ingested version of a file,
+    # by row digest
+    entities: dict[str, list[Entity[AnyRank, MemberT]]]
+
+
+@dataclass
+class EntityCache:
+    """
+    Cache the entities parsed from each input file on local disk.
+
+    Entries are keyed by everything that could change the result of parsing: the
+    file's contents, the reader, the parser (including its configuration and
+    current state), any row filter or column projection, and the version of
+    snutree itself.
+
+    The modification time of each entry records when it was last read, so the
+    least recently used entries are evicted first.
+    """
+
+    SUFFIX = ".pickle"
+
+    config: EntityCacheConfig
+
+    def key(self, content: bytes, *parts: object) -> str | None:
+        """
+        Return the cache key for the given file content and everything else
+        the parse depends on, or None if any of those parts has no canonical
+        encoding.
+        """
+        return self.digest_key(hashlib.sha256(content).digest(), *parts)
+
+    def file_key(self, path: Path, *parts: object) -> str | None:
+        """
+        Return the cache key for the content of the file, which is hashed a
+        chunk at a time instead of being read into memory whole.
+        """
+        with path.open("rb") as f:
+            content = hashlib.file_digest(f, "sha256")
+        return self.digest_key(content.digest(), *parts)
+
+    def digest_key(self, content: bytes, *parts: object) -> str | None:
+        """
+        Return the cache key for the file content with the given SHA-256 digest.
+        """
+        try:
+            encoded = encode(canonical(parts))
+        except TypeError:
+            return None
+        digest = hashlib.sha256(snutree_version().encode("utf-8"))
+        digest.update(content)
+        digest.update(encoded.encode("utf-8"))
+        return digest.hexdigest()
+
+    def path(self, key: str) -> Path:
+        return self.config.directory / f"{key}{self.SUFFIX}"
+
+    def load(self, key: str) -> object:
+        return load(self.path(key))
+
+    def store(self, key: str, cached: object) -> None:
+        try:
+            data = pickle.dumps(cached)
+        except (pickle.PicklingError, AttributeError, TypeError):
+            return
+        self.config.directory.mkdir(parents=True, exist_ok=True)
+        with NamedTemporaryFile("wb", dir=self.config.directory, suffix=".tmp", delete=False) as f:
+            f.write(data)
+        os.replace(f.name, self.path(key))
+        evict(self.config.directory, self.SUFFIX, self.config.max_bytes)
+
+    def get(self, key: str) -> CachedEntities[AnyRank, MemberT] | None:
+        cached = self.load(key)
+        return cached if isinstance(cached, CachedEntities) else None
+
+    def put(self, key: str, cached: CachedEntities[AnyRank, MemberT]) -> None:
+        self.store(key, cached)
+
+    def ingest(
+        self,
+        key: str,
+        rows: Iterable[dict[str, str]],
+        parse: Callable[[Iterable[dict[str, str]]], Iterable[Entity[AnyRank, MemberT]]],
+        refresh: bool = False,
+    ) -> list[Entity[AnyRank, MemberT]]:
+        """
+        Return the entities of the rows, parsing only the rows that weren't
+        in the version of the file ingested last under the same key. Rows that
+        are gone are dropped, and the new version replaces the old one.
+        """
+        previous = self.load(key) if not refresh else None
+        known: dict[str, list[Entity[AnyRank, MemberT]]] = (
+            previous.entities if isinstance(previous, IngestedRows) else {}
+        )
+
+        ingested: dict[str, list[Entity[AnyRank, MemberT]]] = {}
+        entities: list[Entity[AnyRank, MemberT]] = []
+        for row in rows:
+            digest = row_digest(row)
+            if digest not in ingested:
+                ingested[digest] = known[digest] if digest in known else list(parse([row]))
+            entities.extend(ingested[digest])
+
+        self.store(key, IngestedRows(ingested))
+        return entities
+
+
+def config_cache_directory() -> Path:
+    """
+    Return the directory configs are cached in by default, under the user's
+    cache directory.
+    """
+    cache_home = os.environ.get("XDG_CACHE_HOME")
+    return (Path(cache_home) if cache_home else Path.home() / ".cache") / "snutree" / "configs"
+
+
+@dataclass
+class CachedConfig:
+    # The SHA-256 digest of each local module the config imported, by path
+    imports: dict[str, str]
+
+    # The pickled config, if it holds only data that can be loaded without
+    # running its module
+    config: bytes | None
+
+    # Each pickled static table of the config, by name
+    tables: dict[str, bytes]
+
+
+@dataclass
+class StaticTables:
+    """
+    The static tables of a config being loaded: those taken from the cache,
+    and those built or taken while its module runs.
+    """
+
+    cached: dict[str, bytes]
+    built: dict[str, object]
+
+
+# The static tables of the config being loaded, if any
+LOADING: ContextVar[StaticTables | None] = ContextVar("snutree_config_loading", default=None)
+
+
+def static_table(build: Callable[[], T]) -> T:
+    """
+    Return the table built by the function, taking it from the config cache
+    instead if the config module and its local imports haven't changed since
+    it was built. The table is known by the function's name, and must be
+    picklable to be cached.
+
+    For use in config modules, to keep large tables (like attributes by key or
+    generated color maps) from being built on every run.
+    """
+    tables = LOADING.get()
+    if tables is None:
+        return build()
+    name = build.__qualname__
+    try:
+        table: T = pickle.loads(tables.cached[name])  # nosec B301 # The cache is only ever written by snutree itself
+    except (KeyError, pickle.UnpicklingError, EOFError, AttributeError, ImportError):
+        table = build()
+    tables.built[name] = table
+    return table
+
+
+@contextmanager
+def loading(cached: CachedConfig | None) -> Iterator[StaticTables]:
+    """
+    Collect the static tables of the config module run within, taking them
+    from the cached config if there is one.
+    """
+    tables = StaticTables(cached.tables if cached is not None else {}, {})
+    token = LOADING.set(tables)
+    try:
+        yield tables
+    finally:
+        LOADING.reset(token)
+
+
+def file_digest(path: Path) -> str | None:
+    try:
+        f = path.open("rb")
+    except FileNotFoundError:
+        return None
+    with f:
+        return hashlib.file_digest(f, "sha256").hexdigest()
+
+
+def local_imports(directory: Path, exclude: str) -> dict[str, str]:
+    """
+    Return the SHA-256 digest of each imported module in the directory or
+    below it, by path, except for the module with the given name. Installed
+    packages (as in a virtual environment in the directory) are left out.
+    """
+    installed = {Path(sys.prefix).resolve(), Path(sys.base_prefix).resolve()}
+    imports: dict[str, str] = {}
+    for name, module in list(sys.modules.items()):
+        filename: str | None = getattr(module, "__file__", None)
+        if name == exclude or filename is None:
+            continue
+        path = Path(filename).resolve()
+        if not path.is_relative_to(directory) or any(path.is_relative_to(prefix) for prefix in installed):
+            continue
+        if (digest := file_digest(path)) is not None:
+            imports[str(path)] = digest
+    return imports
+
+
+@dataclass
+class ConfigCache:
+    """
+    Cache each config loaded from a file on local disk, keyed by the file's
+    contents and the version of snutree. An entry is only used while the
+    local modules the config imported (those in its directory or below it)
+    are unchanged.
+
+    A config that holds only data is cached whole, so that its module doesn't
+    have to run again. Otherwise only its static tables are cached.
+    """
+
+    SUFFIX = ".config.pickle"
+
+    directory: Path
+
+    # Total size of the cache directory before the least recently used entries
+    # are evicted
+    max_bytes: int = 64 * 2**20
+
+    def path(self, path: Path, source: bytes) -> Path:
+        digest = hashlib.sha256(snutree_version().encode("utf-8"))
+        digest.update(os.fsencode(path))
+        digest.update(hashlib.sha256(source).digest())
+        return self.directory / f"{digest.hexdigest()}{self.SUFFIX}"
+
+    def get(self, path: Path, source: bytes) -> CachedConfig | None:
+        """
+        Return the cached config loaded from the file with the given source,
+        unless any of its local imports has changed since.
+        """
+        cached = load(self.path(path, source))
+        if not isinstance(cached, CachedConfig):
+            return None
+        if any(file_digest(Path(name)) != digest for name, digest in cached.imports.items()):
+            return None
+        return cached
+
+    def config(self, cached: CachedConfig) -> object:
+        """
+        Return the cached config, or None if it wasn't cached whole or can't be
+        loaded.
+        """
+        if cached.config is None:
+            return None
+        try:
+            config: object = pickle.loads(cached.config)  # nosec B301 # The cache is only written by snutree
+        except (pickle.UnpicklingError, EOFError, AttributeError, ImportError):
+            return None
+        return config
+
+    def put(self, path: Path, source: bytes, module_name: str, config: object, tables: StaticTables) -> None:
+        """
+        Cache the config loaded from the file with the given source as the
+        module with the given name, along with its static tables. Anything that
+        can't be loaded without the module is left out.
+        """
+        pickled = {name: data for name, table in tables.built.items() if (data := dumps(table, module_name))}
+        cached = CachedConfig(
+            imports=local_imports(path.parent, module_name),
+            config=dumps(config, module_name),
+            tables=pickled,
+        )
+        self.directory.mkdir(parents=True, exist_ok=True)
+        with NamedTemporaryFile("wb", dir=self.directory, suffix=".tmp", delete=False) as f:
+            pickle.dump(cached, f)
+        os.replace(f.name, self.path(path, source))
+        evict(self.directory, self.SUFFIX, self.max_bytes)
+
+
+def dumps(value: object, module_name: str) -> bytes | None:
+    """
+    Return the value pickled, or None if it can't be pickled or refers to the
+    module with the given name, which can't be imported when it is unpickled.
+    """
+    try:
+        data = pickle.dumps(value)
+    except (pickle.PicklingError, AttributeError, TypeError):
+        return None
+    return data if module_name.encode("utf-8") not in data else None
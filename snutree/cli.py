@@ -1,28 +1,46 @@
 import argparse
 import sys
 from pathlib import Path
+from typing import TYPE_CHECKING
 
-from pydantic import BaseModel
+from snutree.api import InputFile, OutputFormat, SnutreeApi, SnutreeConfig
+from snutree.cache import ConfigCache, config_cache_directory
+from snutree.reader import INPUT_FORMATS
 
-from snutree.api import OutputFormat, SnutreeApi, SnutreeConfig
+# Pydantic (behind the argument models) and the seed search are slow to
+# import, so they are only imported by the commands that use them
+if TYPE_CHECKING:
+    from snutree.arguments import InputArgs
 
+# Stands for standard input in the list of input files
+STDIN = Path("-")
 
-class Args(BaseModel):
-    input_files: list[Path]
-    format: OutputFormat
-    config: Path
-    seed: int | None
+INPUT_FORMAT_NAMES = sorted(extension.removeprefix(".") for extension in INPUT_FORMATS)
 
 
 def main() -> None:
-    parser = argparse.ArgumentParser(description="Generate family tree.")
+    if sys.argv[1:2] == ["seed-search"]:
+        seed_search(sys.argv[2:])
+    else:
+        generate(sys.argv[1:])
+
 
+def add_input_arguments(parser: argparse.ArgumentParser) -> None:
     parser.add_argument(
         "input_files",
         metavar="INPUT_FILES",
         type=Path,
         nargs="*",
-        help="Input files to process (e.g., .csv, .json, .sql)",
+        help="Input files to process (e.g., .csv, .json, .sql), or - for standard input",
+    )
+
+    parser.add_argument(
+        "-i",
+        "--input-format",
+        type=str,
+        default=None,
+        help="Format of standard input, which is read as a stream",
+        choices=INPUT_FORMAT_NAMES,
     )
 
     parser.add_argument(
@@ -33,15 +51,55 @@ def main() -> None:
         help="Config file path",
     )
 
+    parser.add_argument(
+        "--refresh",
+        action="store_true",
+        help="Ignore cached SQL query results (fresh results are still cached)",
+    )
+
+
+def add_output_arguments(parser: argparse.ArgumentParser, required: bool) -> None:
     parser.add_argument(
         "-f",
         "--format",
         type=str,
-        required=True,
-        help="Format that the output will be in",
+        action="append",
+        required=required,
+        help="Format that the output will be in. Can be given more than once, with --output.",
         choices=OutputFormat.__args__,  # type: ignore[misc,attr-defined] # This does actually exist
     )
 
+    parser.add_argument(
+        "-o",
+        "--output",
+        type=Path,
+        default=None,
+        help="Output file path, whose suffix is replaced by each format's. Defaults to standard output.",
+    )
+
+
+def read_input_files(parser: argparse.ArgumentParser, args: "InputArgs") -> list[InputFile]:
+    input_files: list[InputFile] = []
+    for path in args.input_files:
+        if path != STDIN:
+            input_files.append(path)
+        elif args.input_format is None:
+            parser.error("--input-format is required to read from standard input")
+        elif any(not isinstance(input_file, Path) for input_file in input_files):
+            parser.error("standard input can only be read once")
+        else:
+            input_files.append((sys.stdin, f".{args.input_format}"))
+    return input_files
+
+
+def generate(argv: list[str]) -> None:
+    # pylint: disable-next=import-outside-toplevel
+    from snutree.arguments import Args
+
+    parser = argparse.ArgumentParser(description="Generate family tree.")
+    add_input_arguments(parser)
+    add_output_arguments(parser, required=True)
+
     parser.add_argument(
         "-s",
         "--seed",
@@ -50,17 +108,109 @@ def main() -> None:
         help="Seed for random number generation. Provides *some* control over the tree's layout.",
     )
 
-    raw: object = vars(parser.parse_args())
+    raw: object = vars(parser.parse_args(argv))
 
     args = Args.model_validate(raw)
 
-    config = SnutreeConfig.from_path(args.config)
+    input_files = read_input_files(parser, args)
+
+    if args.output is None and len(set(args.format)) > 1:
+        parser.error("--output is required to write more than one format")
+
+    config = SnutreeConfig.from_path(args.config, ConfigCache(config_cache_directory()))
 
-    api = SnutreeApi.from_config(config, seed=args.seed)
+    with SnutreeApi.from_config(config, seed=args.seed, refresh=args.refresh) as api:
+        if args.output is None:
+            api.run_to(
+                input_files=input_files,
+                writer_name=args.format[0],
+                output=sys.stdout.buffer,  # type: ignore[misc]
+            )
+        else:
+            api.run_files(
+                input_files=input_files,
+                paths={output_format: args.output.with_suffix(f".{output_format}") for output_format in args.format},
+            )
 
-    output = api.run(
-        input_files=args.input_files,
-        writer_name=args.format,
+
+def seed_search(argv: list[str]) -> None:
+    # pylint: disable=import-outside-toplevel
+    from snutree.arguments import SeedSearchArgs
+    from snutree.seeds import SeedSearch, leaderboard
+
+    parser = argparse.ArgumentParser(
+        prog="snutree seed-search",
+        description="Lay out the family tree with many seeds and rank the seeds by their layouts.",
     )
+    add_input_arguments(parser)
+
+    parser.add_argument(
+        "-n",
+        "--seeds",
+        type=int,
+        default=16,
+        help="Number of seeds to try",
+    )
+
+    parser.add_argument(
+        "--first-seed",
+        type=int,
+        default=0,
+        help="First seed to try, followed by the seeds after it",
+    )
+
+    parser.add_argument(
+        "-j",
+        "--workers",
+        type=int,
+        default=None,
+        help="Seeds laid out at once. Defaults to one for each CPU.",
+    )
+
+    parser.add_argument(
+        "-t",
+        "--budget",
+        type=float,
+        default=None,
+        help="Seconds the whole search may take. Seeds not laid out in time are left out.",
+    )
+
+    parser.add_argument(
+        "--top",
+        type=int,
+        default=10,
+        help="Number of seeds shown on the leaderboard",
+    )
+
+    add_output_arguments(parser, required=False)
+
+    raw: object = vars(parser.parse_args(argv))
+
+    args = SeedSearchArgs.model_validate(raw)
+
+    input_files = read_input_files(parser, args)
+
+    if args.format is not None and args.output is None:
+        parser.error("--output is required to write the best layout")
+
+    config = SnutreeConfig.from_path(args.config, ConfigCache(config_cache_directory()))
+
+    with SnutreeApi.from_config(config, seed=None, refresh=args.refresh) as api:
+        build = api.seeded(input_files)
+        search = SeedSearch.like(api.writers["pdf"], workers=args.workers, budget=args.budget)
+        scores = search.search(build(seed) for seed in range(args.first_seed, args.first_seed + args.seeds))
+        if not scores:
+            parser.exit(1, "no layouts finished within the budget\n")
+        print(leaderboard(scores, args.top))
 
-    sys.stdout.buffer.write(output)  # type: ignore[misc]
+        if args.output is not None:
+            # Render the best seed just as it was laid out to be scored, without
+            # an incremental layout or falling back to other strategies
+            api.writers["pdf"] = search.writer()
+            api.write_files(
+                build(scores[0].seed),
+                {
+                    output_format: args.output.with_suffix(f".{output_format}")
+                    for output_format in args.format or ["pdf"]
+                },
+            )
@@ -0,0 +1,163 @@
+from collections.abc import Callable, Generator, Iterable, Iterator, Sequence
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from dataclasses import dataclass, field
+from enum import Enum, auto
+from queue import Empty, Full, Queue
+from threading import Event
+
+# Seconds a blocked producer waits between checks for cancellation
+POLL_INTERVAL = 0.05
+
+RowSource = Callable[[], Iterable[dict[str, str]]]
+
+
+class ReadMode(Enum):
+    # Read in the background on threads of its own, so that it starts before
+    # any other input
+    PREFETCH = auto()
+
+    # Read in the background, only as far ahead as the input's queue allows
+    BACKGROUND = auto()
+
+    # Read in the foreground once the input's rows are requested
+    FOREGROUND = auto()
+
+
+@dataclass
+class IngestConfig:
+    # Threads reading input files at the same time, for prefetched inputs and
+    # for the other background inputs each
+    workers: int = 4
+
+    # Rows read ahead of the parser from each input file before its reader is
+    # paused
+    queue_size: int = 1024
+
+    def __post_init__(self) -> None:
+        if self.workers <= 0:
+            raise ValueError("ingestion needs at least one worker")
+        if self.queue_size <= 0:
+            raise ValueError("ingestion queue size must be strictly positive")
+
+
+@dataclass
+class QueuedRows:
+    """
+    The rows of one input, read by a worker thread into a queue and yielded
+    from the queue in order when called.
+
+    A full queue pauses the worker until rows are taken out again. The end of
+    the rows is marked with None, and an exception raised while reading is
+    passed through the queue to be raised again by the consumer.
+    """
+
+    queue: Queue[dict[str, str] | BaseException | None]
+    cancelled: Event = field(default_factory=Event)
+
+    def put(self, item: dict[str, str] | BaseException | None) -> bool:
+        """
+        Add the item to the queue, waiting for room, unless the rows are
+        cancelled first. Return whether the item was added.
+        """
+        while not self.cancelled.is_set():
+            try:
+                self.queue.put(item, timeout=POLL_INTERVAL)
+            except Full:
+                continue
+            else:
+                return True
+        return False
+
+    def put_all(self, rows: Iterable[dict[str, str]]) -> bool:
+        """
+        Add every row to the queue, unless the rows are cancelled first. Return
+        whether every row was added.
+        """
+        iterator = iter(rows)
+        for row in iterator:
+            if not self.put(row):
+                if isinstance(iterator, Generator):
+                    iterator.close()
+                return False
+        return True
+
+    def fill(self, read: RowSource) -> None:
+        if self.cancelled.is_set():
+            return
+        try:
+            finished = self.put_all(read())
+        except Exception as e:  # pylint: disable=broad-exception-caught # Raised again by the consumer
+            self.put(e)
+        else:
+            if finished:
+                self.put(None)
+
+    def cancel(self) -> None:
+        """
+        Stop reading rows and discard those already read.
+        """
+        self.cancelled.set()
+        while True:
+            try:
+                self.queue.get_nowait()
+            except Empty:
+                return
+
+    def __call__(self) -> Iterator[dict[str, str]]:
+        while (item := self.queue.get()) is not None:
+            if isinstance(item, BaseException):
+                raise item
+            yield item
+
+
+@dataclass
+class ForegroundRows:
+    """
+    The rows of one input, read only when called.
+    """
+
+    read: RowSource
+
+    def cancel(self) -> None:
+        pass
+
+    def __call__(self) -> Iterator[dict[str, str]]:
+        yield from self.read()
+
+
+InputRows = QueuedRows | ForegroundRows
+
+
+@contextmanager
+def ingest(reads: Sequence[tuple[RowSource, ReadMode]], config: IngestConfig) -> Iterator[list[InputRows]]:
+    """
+    Start reading the inputs, yielding the rows of each input in the same order
+    as the inputs.
+
+    Prefetched inputs mostly wait on the network, so they have workers of their
+    own and are not held up behind other inputs. Prefetched and background
+    inputs are each started in order, so the earliest input of each not yet
+    read always has a worker, and the consumer can never wait forever on an
+    input that is paused. Foreground inputs never hold a worker at all.
+
+    On exit, any inputs still being read are cancelled.
+    """
+
+    sources: list[InputRows] = [
+        (ForegroundRows(read) if mode is ReadMode.FOREGROUND else QueuedRows(Queue(maxsize=config.queue_size)))
+        for read, mode in reads
+    ]
+
+    with (
+        ThreadPoolExecutor(max_workers=config.workers, thread_name_prefix="snutree-prefetch") as prefetch,
+        ThreadPoolExecutor(max_workers=config.workers, thread_name_prefix="snutree-ingest") as background,
+    ):
+        for (read, mode), source in zip(reads, sources):
+            if isinstance(source, QueuedRows):
+                (prefetch if mode is ReadMode.PREFETCH else background).submit(source.fill, read)
+        try:
+            yield sources
+        finally:
+            for source in sources:
+                source.cancel()
@@ -1,8 +1,10 @@
 from collections.abc import Iterable
 from dataclasses import dataclass
+from typing import ClassVar
 
 from snutree.model.entity import Entity, EntityId, ParentKeyStatus
 from snutree.model.member.common import BaseMember
+from snutree.model.rank import RankFilter, RankWindow
 from snutree.model.semester import Semester
 
 
@@ -15,6 +17,12 @@ class KeyedMember(BaseMember):
 
 @dataclass
 class KeyedMemberParser:
+    columns: ClassVar[frozenset[str]] = frozenset(KeyedMember.model_fields)
+    rowwise: ClassVar[bool] = True
+
+    def row_filter(self, window: RankWindow) -> RankFilter:
+        return RankFilter(Semester, "semester", window)
+
     def parse(self, rows: Iterable[dict[str, str]]) -> Iterable[Entity[Semester, KeyedMember]]:
         for row in rows:
             member = KeyedMember.model_validate(row)
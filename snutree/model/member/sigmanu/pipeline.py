@@ -1,5 +1,6 @@
 from collections.abc import Iterable
 from dataclasses import dataclass, field
+from typing import ClassVar
 
 from pydantic import TypeAdapter
 
@@ -8,19 +9,53 @@ from snutree.model.member.sigmanu.affiliation import ChapterId
 from snutree.model.member.sigmanu.member import (
     Brother,
     Candidate,
+    Expelled,
+    Knight,
     SigmaNuMember,
+    Status,
 )
+from snutree.model.rank import RankFilter, RankWindow
 from snutree.model.semester import Semester
 
 
 @dataclass
 class SigmaNuParser:
+    columns: ClassVar[frozenset[str]] = frozenset(
+        {
+            *Expelled.model_fields,
+            *Knight.model_fields,
+            *Brother.model_fields,
+            *Candidate.model_fields,
+        }
+    )
+
     default_chapter_id: ChapterId | None
     require_semester: bool
     last_candidate_key: int = -1
     last_brother_key: int = -1
     root_member_badges: set[str] = field(default_factory=set)
 
+    def row_filter(self, window: RankWindow) -> RankFilter:
+        # Candidates and brothers are keyed by their position among all other
+        # candidates or brothers, so every one of them must be parsed to keep
+        # the keys stable
+        return RankFilter(
+            Semester,
+            "semester",
+            window,
+            keep={"status": frozenset({Status.CANDIDATE.value, Status.BROTHER.value})},
+        )
+
+    def save_state(self) -> tuple[int, int]:
+        return self.last_candidate_key, self.last_brother_key
+
+    def restore_state(self, state: object) -> None:
+        match state:
+            case (int() as last_candidate_key, int() as last_brother_key):
+                self.last_candidate_key, self.last_brother_key = last_candidate_key, last_brother_key
+            case _:
+                raise TypeError(f"not a state of {type(self).__name__}: {state!r}")
+
     def parse(self, rows: Iterable[dict[str, str]]) -> Iterable[Entity[Semester, SigmaNuMember]]:
         default_chapter_column = {"chapter": self.default_chapter_id} if self.default_chapter_id is not None else {}
 
@@ -0,0 +1,122 @@
+from collections.abc import Iterable
+from dataclasses import dataclass, field
+from typing import Literal, TypeVar, assert_never
+
+from snutree.model.entity import Entity, EntityId, ParentKeyStatus
+from snutree.model.rank import AnyRank
+
+MemberT = TypeVar("MemberT")
+
+MergePolicy = Literal[
+    # Keep the first entity seen with each key
+    "first",
+    # Keep the last entity seen with each key
+    "last",
+    # Keep the first entity seen with each key, filling in whatever it is
+    # missing from the entities seen after it
+    "coalesce",
+    # Fail if two entities with the same key differ
+    "error",
+]
+
+
+class MergeConflictError(ValueError):
+    pass
+
+
+@dataclass
+class MergeStats:
+    # Entities merged in total
+    entities: int = 0
+
+    # Entities whose key had already been seen
+    duplicates: int = 0
+
+    # Duplicates that differed from the entity already kept for their key
+    conflicts: int = 0
+
+    # Keys of the conflicting duplicates, each listed once
+    conflicting_keys: list[EntityId] = field(default_factory=list)
+
+    @property
+    def unique(self) -> int:
+        return self.entities - self.duplicates
+
+
+def coalesce_member(kept: MemberT | None, other: MemberT | None) -> MemberT | None:
+    """
+    Return the kept member with any of its missing fields filled in from the
+    other member, if both are models of the same type.
+    """
+    if kept is None:
+        return other
+    # pylint: disable-next=import-outside-toplevel
+    from pydantic import BaseModel
+
+    if isinstance(kept, BaseModel) and type(other) is type(kept):  # type: ignore[misc]
+        update: dict[str, object] = {}
+        for name in type(kept).model_fields:
+            value: object = getattr(other, name)
+            current: object = getattr(kept, name)
+            if current is None and value is not None:
+                update[name] = value
+        if update:
+            return kept.model_copy(update=update)
+    return kept
+
+
+def coalesce(kept: Entity[AnyRank, MemberT], other: Entity[AnyRank, MemberT]) -> Entity[AnyRank, MemberT]:
+    parent_key = other.parent_key if kept.parent_key == ParentKeyStatus.UNKNOWN else kept.parent_key
+    member = coalesce_member(kept.member, other.member)
+    if parent_key == kept.parent_key and member is kept.member:
+        return kept
+    return Entity(parent_key=parent_key, key=kept.key, rank=kept.rank, member=member)
+
+
+@dataclass
+class EntityMerger:
+    """
+    Merge entities from every source into one entity per key, in a single
+    pass over the entities. Entities are kept in the order their keys were
+    first seen.
+    """
+
+    policy: MergePolicy = "last"
+
+    # Statistics of the most recent merge
+    stats: MergeStats = field(default_factory=MergeStats)
+
+    def merge(self, entities: Iterable[Entity[AnyRank, MemberT]]) -> list[Entity[AnyRank, MemberT]]:
+        self.stats = MergeStats()
+
+        merged: dict[EntityId, Entity[AnyRank, MemberT]] = {}
+        conflicting: set[EntityId] = set()
+        for entity in entities:
+            self.stats.entities += 1
+
+            kept = merged.get(entity.key)
+            if kept is None:
+                merged[entity.key] = entity
+                continue
+
+            self.stats.duplicates += 1
+            if entity == kept:
+                continue
+            self.stats.conflicts += 1
+            if entity.key not in conflicting:
+                conflicting.add(entity.key)
+                self.stats.conflicting_keys.append(entity.key)
+
+            match self.policy:
+                case "first":
+                    pass
+                case "last":
+                    merged[entity.key] = entity
+                case "coalesce":
+                    merged[entity.key] = coalesce(kept, entity)
+                case "error":
+                    raise MergeConflictError(f"conflicting entities with key {entity.key!r}")
+                case _:
+                    assert_never(self.policy)
+
+        return list(merged.values())
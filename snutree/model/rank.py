@@ -1,10 +1,164 @@
-from typing import Protocol, TypeVar, runtime_checkable
+import re
+from collections.abc import Callable, Mapping
+from dataclasses import dataclass, field
+from operator import index
+from typing import Protocol, SupportsIndex, TypeVar, runtime_checkable
 
 AnyRank = TypeVar("AnyRank", bound="Rank")
 
+# Strings, quoted identifiers, comments, words, whitespace, and single characters
+SQL_TOKEN = re.compile(
+    r"""'(?:[^'\\]|\\.|'')*'|"(?:[^"\\]|\\.|"")*"|`(?:[^`]|``)*`|--[^\n]*|\#[^\n]*|/\*.*?\*/|\w+|\s+|.""",
+    re.DOTALL,
+)
+SQL_COMMENT = ("--", "#", "/*")
+SQL_IDENTIFIER = re.compile(r"[A-Za-z_]\w*|`(?:[^`]|``)*`")
+
+# Clauses that may come after ORDER BY at the end of a query
+AFTER_ORDER_BY = {"LIMIT", "OFFSET", "FETCH", "FOR", "LOCK", "INTO"}
+
 
 @runtime_checkable
 class Rank(Protocol):
     def __init__(self, i: int | None = None, /) -> None: ...
 
     def __index__(self) -> int: ...
+
+
+@dataclass(frozen=True)
+class RankWindow:
+    """
+    An inclusive range of rank indices. A missing bound leaves that end of the
+    range open.
+    """
+
+    minimum: int | None = None
+    maximum: int | None = None
+
+    @property
+    def bounded(self) -> bool:
+        return self.minimum is not None or self.maximum is not None
+
+    def __contains__(self, rank: SupportsIndex) -> bool:
+        i = index(rank)
+        return (self.minimum is None or self.minimum <= i) and (self.maximum is None or i <= self.maximum)
+
+
+@dataclass(frozen=True)
+class RankFilter:
+    """
+    Cheaply check raw rows against a rank window, so rows outside the window
+    can be discarded before they are validated.
+
+    Rows whose rank column is missing, empty, or unparseable are kept so that
+    the parser can deal with them. Rows with one of the `keep` values in the
+    given columns are always kept (e.g., for rows the parser must see even if
+    they are discarded later).
+    """
+
+    parse: Callable[[str], SupportsIndex]
+    column: str
+    window: RankWindow
+    keep: Mapping[str, frozenset[str]] = field(default_factory=dict)
+
+    @property
+    def columns(self) -> frozenset[str]:
+        """
+        Return the columns this filter looks at.
+        """
+        return frozenset({self.column, *self.keep})
+
+    def __call__(self, row: Mapping[str, object]) -> bool:
+        for column, values in self.keep.items():
+            if row.get(column) in values:
+                return True
+
+        value = row.get(self.column)
+        if not isinstance(value, str) or not value:
+            return True
+
+        try:
+            rank = self.parse(value)
+        except ValueError:
+            return True
+
+        return rank in self.window
+
+    def where(self, rank_expression: str, placeholder: str) -> tuple[str, list[str]]:
+        """
+        Return an SQL condition equivalent to this filter, along with its query
+        parameters, given an SQL expression for the rank index of a row.
+        """
+
+        conditions = [f"`{self.column}` IS NULL", f"`{self.column}` = ''"]
+        parameters: list[str] = []
+
+        for column, values in self.keep.items():
+            conditions.append(f"`{column}` IN ({', '.join([placeholder] * len(values))})")
+            parameters.extend(sorted(values))
+
+        bounds = []
+        if self.window.minimum is not None:
+            bounds.append(f"({rank_expression}) >= {int(self.window.minimum)}")
+        if self.window.maximum is not None:
+            bounds.append(f"({rank_expression}) <= {int(self.window.maximum)}")
+        conditions.append(" AND ".join(bounds) or "TRUE")
+
+        return " OR ".join(f"({condition})" for condition in conditions), parameters
+
+    def select(self, query: str, rank_expression: str, placeholder: str) -> tuple[str, list[str]]:
+        """
+        Wrap an SQL query so that it only returns rows that pass this filter.
+
+        Databases need not keep the order of a subquery, so the query's own
+        ORDER BY is applied again to the rows it returns. Its terms must then
+        refer to the columns the query returns.
+        """
+        condition, parameters = self.where(rank_expression, placeholder)
+        subquery = query.strip().rstrip(";")
+        terms = order_by(subquery)
+        ordered = f" ORDER BY {terms}" if terms is not None else ""
+        return f"SELECT * FROM ({subquery}) AS snutree_rows WHERE {condition}{ordered}", parameters
+
+
+def sql_tokens(query: str) -> list[tuple[str, int]]:
+    """
+    Split the SQL into tokens, each with how deeply it is nested in
+    parentheses. Comments are replaced by a space.
+    """
+    tokens: list[tuple[str, int]] = []
+    depth = 0
+    for match in SQL_TOKEN.finditer(query):
+        token = match.group()
+        if token.startswith(SQL_COMMENT):
+            token = " "
+        elif token == ")":
+            depth -= 1
+        tokens.append((token, depth))
+        if token == "(":
+            depth += 1
+    return tokens
+
+
+def order_by(query: str) -> str | None:
+    """
+    Return the terms of the query's own ORDER BY clause, with any table names
+    left out of its columns, or None if it has none.
+    """
+    tokens = sql_tokens(query)
+    words = [(i, token.upper()) for i, (token, depth) in enumerate(tokens) if depth == 0 and not token.isspace()]
+    starts = [j + 2 for j in range(len(words) - 1) if words[j][1] == "ORDER" and words[j + 1][1] == "BY"]
+    if not starts:
+        return None
+    rest = words[starts[-1] :]
+    start = rest[0][0] if rest else len(tokens)
+    end = next((i for i, word in rest if word in AFTER_ORDER_BY), len(tokens))
+
+    terms: list[str] = []
+    for token, _ in tokens[start:end]:
+        if token == "." and terms and SQL_IDENTIFIER.fullmatch(terms[-1]):
+            # The table of a column, which is out of scope outside the query
+            terms.pop()
+            continue
+        terms.append(token)
+    return "".join(terms).strip() or None
@@ -2,10 +2,12 @@ import re
 from dataclasses import dataclass
 from enum import Enum
 from functools import total_ordering
-from typing import assert_never, overload
+from typing import TYPE_CHECKING, assert_never, overload
 
-from pydantic import GetCoreSchemaHandler
-from pydantic_core import CoreSchema, core_schema
+# Pydantic is slow to import, and only needed once members are validated
+if TYPE_CHECKING:
+    from pydantic import GetCoreSchemaHandler
+    from pydantic_core import CoreSchema
 
 
 @total_ordering
@@ -70,7 +72,10 @@ class Semester:
         object.__setattr__(self, "_index", index)
 
     @classmethod
-    def __get_pydantic_core_schema__(cls, _source_type: object, handler: GetCoreSchemaHandler) -> CoreSchema:
+    def __get_pydantic_core_schema__(cls, _source_type: object, handler: "GetCoreSchemaHandler") -> "CoreSchema":
+        # pylint: disable-next=import-outside-toplevel
+        from pydantic_core import core_schema
+
         schema: CoreSchema = core_schema.no_info_before_validator_function(cls, handler(Semester))
         return schema
 
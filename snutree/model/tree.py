@@ -16,7 +16,7 @@ from snutree.model.entity import (
     ParentKeyStatus,
     UnknownEntity,
 )
-from snutree.model.rank import AnyRank
+from snutree.model.rank import AnyRank, RankWindow
 
 MemberT = TypeVar("MemberT")
 
@@ -25,9 +25,23 @@ class FamilyId(EntityId):
     pass
 
 
+EntityOrdering = Literal[
+    # Shuffle the entities of each family with the seed
+    "shuffle",
+    # List each family from its roots down, with each entity's descendants
+    # right after it, so that the tree can be drawn without any crossing
+    # edges in the order given. Only families and siblings are shuffled.
+    "tree",
+]
+
+
 @dataclass
 class FamilyTreeConfig(Generic[AnyRank]):  # pylint: disable=too-many-instance-attributes
     seed: int = 0
+
+    # How entities are ordered, which is the order they are laid out in
+    ordering: EntityOrdering = "shuffle"
+
     include_unknowns: bool = True
     include_singletons: bool = False
     include_families: set[str] | None = None
@@ -51,6 +65,16 @@ class FamilyTreeConfig(Generic[AnyRank]):  # pylint: disable=too-many-instance-a
             if index(self.rank_min) > index(self.rank_max):
                 raise ValueError("min rank must be less than or equal to max rank")
 
+    @property
+    def window(self) -> RankWindow:
+        """
+        Return the window of ranks whose entities are kept in the tree.
+        """
+        return RankWindow(
+            minimum=index(self.rank_min) if self.rank_min is not None else None,
+            maximum=index(self.rank_max) if self.rank_max is not None else None,
+        )
+
 
 class FamilyTree(Generic[AnyRank, MemberT]):
     """
@@ -64,17 +88,14 @@ class FamilyTree(Generic[AnyRank, MemberT]):
         relationships: set[tuple[EntityId, EntityId]],
         config: FamilyTreeConfig[AnyRank] | None = None,
     ) -> None:
-        # TODO Verify identifiers
+        # Identifiers are verified beforehand by StructureValidator
         # TODO Pass members directly?
 
         self.rank_type = rank_type
         self.config = config or FamilyTreeConfig()
 
-        min_rank = float("-inf") if self.config.rank_min is None else index(self.config.rank_min)
-        max_rank = index(self.config.rank_max) if self.config.rank_max is not None else float("inf")
-        self._entities: Sequence[Entity[AnyRank, MemberT]] = [
-            entity for entity in entities if min_rank <= index(entity.rank) <= max_rank
-        ]
+        window = self.config.window
+        self._entities: Sequence[Entity[AnyRank, MemberT]] = [entity for entity in entities if entity.rank in window]
 
         self._relationships: Set[tuple[EntityId, EntityId]] = relationships
 
@@ -189,17 +210,51 @@ class FamilyTree(Generic[AnyRank, MemberT]):
         for component in components:
             entity_ids: list[EntityId] = list(sorted(component))
             rng.shuffle(entity_ids)
+            if self.config.ordering == "tree":
+                entity_ids = self.preorder(entity_ids)
             for key in entity_ids:
                 entities[key] = self.lookup[key]
 
         return entities
 
+    def preorder(self, entity_ids: Sequence[EntityId]) -> list[EntityId]:
+        """
+        Return the entities in depth-first order from the roots among them,
+        keeping the given order among roots and among the children of each
+        entity. Entities with more than one parent come after the first.
+        """
+        positions = {key: i for i, key in enumerate(entity_ids)}
+        roots = [key for key in entity_ids if self.graph.in_degree[key] == 0]
+
+        ordered: list[EntityId] = []
+        visited: set[EntityId] = set()
+        # Entities on cycles can have no roots above them
+        for start in chain(roots, entity_ids):
+            stack = [start]
+            while stack:
+                key = stack.pop()
+                if key in visited:
+                    continue
+                visited.add(key)
+                ordered.append(key)
+                stack.extend(sorted(self.graph.successors(key), key=positions.__getitem__, reverse=True))
+
+        return ordered
+
     @cached_property
     def relationships(self) -> Sequence[tuple[EntityId, EntityId]]:
         """
         Return a sorted list of relationship_ids (tuples of parent entity ID
-        and child entity ID) for this tree.
+        and child entity ID) for this tree. With tree ordering, they are sorted
+        in the order of the entities instead.
         """
+        if self.config.ordering == "tree":
+            positions = {key: i for i, key in enumerate(self.entities)}
+
+            def position(relationship: tuple[EntityId, EntityId]) -> tuple[int, int]:
+                return positions[relationship[0]], positions[relationship[1]]
+
+            return sorted(self.graph.edges(), key=position)
         return list(sorted(self.graph.edges()))
 
     @cached_property
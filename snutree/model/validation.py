@@ -0,0 +1,154 @@
+from collections.abc import Iterable, Sequence
+from dataclasses import dataclass, field
+from operator import index
+from typing import TypeVar
+
+from snutree.model.entity import Entity, EntityId
+from snutree.model.rank import AnyRank
+
+MemberT = TypeVar("MemberT")
+
+
+@dataclass
+class StructureReport:
+    # Keys of more than one entity, either among the validated entities or
+    # among the differing entities merged into one before validation
+    duplicate_keys: list[EntityId] = field(default_factory=list)
+
+    # Relationships, as (parent, child), whose parent or child doesn't exist
+    missing_parents: list[tuple[EntityId, EntityId]] = field(default_factory=list)
+    missing_children: list[tuple[EntityId, EntityId]] = field(default_factory=list)
+
+    # Keys along each cycle, starting from the first key of the cycle found
+    cycles: list[list[EntityId]] = field(default_factory=list)
+
+    # Relationships, as (parent, child), whose child is ranked before its parent
+    rank_inversions: list[tuple[EntityId, EntityId]] = field(default_factory=list)
+
+    @property
+    def valid(self) -> bool:
+        return not (
+            self.duplicate_keys or self.missing_parents or self.missing_children or self.cycles or self.rank_inversions
+        )
+
+    def __str__(self) -> str:
+        lines = [
+            *(f"duplicate key: {key}" for key in self.duplicate_keys),
+            *(f"missing parent: {parent} (of {child})" for parent, child in self.missing_parents),
+            *(f"missing child: {child} (of {parent})" for parent, child in self.missing_children),
+            *(f"cycle: {' -> '.join([*cycle, cycle[0]])}" for cycle in self.cycles),
+            *(f"child ranked before parent: {child} (of {parent})" for parent, child in self.rank_inversions),
+        ]
+        return "\n".join(lines) if lines else "no problems found"
+
+
+class StructureError(ValueError):
+    def __init__(self, report: StructureReport) -> None:
+        super().__init__(f"invalid family tree structure:\n{report}")
+        self.report = report
+
+
+@dataclass
+class ValidationConfig:
+    # Raise as soon as the first problem is found
+    fail_fast: bool = False
+
+    # Raise once every problem has been found, if there were any
+    strict: bool = False
+
+
+@dataclass
+class StructureValidator:
+    """
+    Check the structure of a tree's entities and relationships before the tree
+    is built, in time linear in the number of entities and relationships.
+    """
+
+    config: ValidationConfig = field(default_factory=ValidationConfig)
+
+    # The report of the most recent validation
+    report: StructureReport = field(default_factory=StructureReport)
+
+    def found(self) -> None:
+        if self.config.fail_fast:
+            raise StructureError(self.report)
+
+    def validate(
+        self,
+        entities: Sequence[Entity[AnyRank, MemberT]],
+        relationships: Iterable[tuple[EntityId, EntityId]],
+        merged_keys: Iterable[EntityId] = (),
+    ) -> StructureReport:
+        """
+        Check the entities and relationships. The merged keys are the keys of
+        differing entities that were merged into one before validation, which
+        are reported as duplicates too.
+        """
+        self.report = StructureReport()
+
+        for key in merged_keys:
+            self.report.duplicate_keys.append(key)
+            self.found()
+
+        ranks: dict[EntityId, int] = {}
+        for entity in entities:
+            if entity.key in ranks:
+                self.report.duplicate_keys.append(entity.key)
+                self.found()
+            else:
+                ranks[entity.key] = index(entity.rank)
+
+        parent_keys = (
+            (entity.parent_key, entity.key) for entity in entities if isinstance(entity.parent_key, EntityId)
+        )
+
+        children: dict[EntityId, list[EntityId]] = {}
+        for parent, child in [*parent_keys, *relationships]:
+            if parent not in ranks:
+                self.report.missing_parents.append((parent, child))
+                self.found()
+            elif child not in ranks:
+                self.report.missing_children.append((parent, child))
+                self.found()
+            else:
+                children.setdefault(parent, []).append(child)
+                if ranks[child] < ranks[parent]:
+                    self.report.rank_inversions.append((parent, child))
+                    self.found()
+
+        self.find_cycles(list(ranks), children)
+
+        if self.config.strict and not self.report.valid:
+            raise StructureError(self.report)
+
+        return self.report
+
+    def find_cycles(self, keys: list[EntityId], children: dict[EntityId, list[EntityId]]) -> None:
+        """
+        Find the cycles among the relationships with an iterative depth-first
+        search, which visits each key and relationship once.
+        """
+
+        # Keys on the current path, each with its position on the path
+        path: dict[EntityId, int] = {}
+        visited: set[EntityId] = set()
+
+        for root in keys:
+            if root in visited:
+                continue
+            visited.add(root)
+            path[root] = 0
+            stack = [(root, iter(children.get(root, [])))]
+            while stack:
+                key, remaining = stack[-1]
+                child = next(remaining, None)
+                if child is None:
+                    stack.pop()
+                    del path[key]
+                elif child in path:
+                    self.report.cycles.append(list(path)[path[child] :])
+                    self.found()
+                elif child not in visited:
+                    visited.add(child)
+                    path[child] = len(path)
+                    stack.append((child, iter(children.get(child, []))))
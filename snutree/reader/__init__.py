@@ -1,34 +1,49 @@
-import importlib
-import pkgutil
-from collections.abc import Iterable
+from collections.abc import Iterable, Set
 from dataclasses import dataclass
-from pathlib import Path
 from typing import IO, ClassVar, Protocol, runtime_checkable
 
+from snutree.model.rank import RankFilter
 from snutree.reader.sql import SqlReaderConfig
+from snutree.reader.sqlite import SqliteReaderConfig
 
 
 @dataclass
 class ReaderConfigs:
     sql: SqlReaderConfig | None = None
+    sqlite: SqliteReaderConfig | None = None
+
+    def __post_init__(self) -> None:
+        if self.sql is not None and self.sqlite is not None:
+            raise ValueError("only one of the SQL and SQLite readers may be configured")
 
 
 @runtime_checkable
 class Reader(Protocol):
     extensions: ClassVar[list[str]]
 
-    def read(self, stream: IO[str]) -> Iterable[dict[str, str]]: ...
+    # Whether inputs should be read in the background as soon as a run starts,
+    # for readers that spend most of their time waiting on the network
+    prefetch: ClassVar[bool]
+
+    # Whether the rows read from an input depend only on the input's contents,
+    # so that results can be cached by content
+    cacheable: ClassVar[bool]
 
+    def read(
+        self,
+        stream: IO[str],
+        row_filter: RankFilter | None = None,
+        columns: Set[str] | None = None,
+    ) -> Iterable[dict[str, str]]: ...
 
-def _get_reader_formats(path: Path) -> set[str]:
-    input_formats: set[str] = set()
-    for module_info in pkgutil.iter_modules([str(path)]):
-        module = importlib.import_module(".".join([__name__, module_info.name]))
-        objects: dict[str, object] = vars(module)
-        for obj in objects.values():
-            if isinstance(obj, Reader):
-                input_formats.update(obj.extensions)
-    return input_formats
 
+# The extensions each reader module handles, declared here so that finding the
+# input formats doesn't import every reader and its backend
+READER_EXTENSIONS: dict[str, frozenset[str]] = {
+    "csv": frozenset({".csv"}),
+    "json": frozenset({".json"}),
+    "sql": frozenset({".sql"}),
+    "sqlite": frozenset({".sql"}),
+}
 
-INPUT_FORMATS = _get_reader_formats(Path(__file__).parent)
+INPUT_FORMATS: set[str] = set().union(*READER_EXTENSIONS.values())
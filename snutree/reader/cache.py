@@ -0,0 +1,238 @@
+import base64
+import datetime as dt
+import hashlib
+import json
+import os
+import time
+from collections import deque
+from collections.abc import Callable, Iterable, Iterator, Sequence
+from dataclasses import dataclass
+from decimal import Decimal
+from pathlib import Path
+from tempfile import NamedTemporaryFile
+from typing import IO
+
+# Seconds a temporary file may go unwritten before it is taken to be left over
+# from a run that was interrupted, and is deleted
+STALE_TEMPORARY = 60 * 60
+
+
+def dumps(value: object) -> str:
+    return json.dumps(value, separators=(",", ":"), default=str)
+
+
+def timedelta(data: str) -> dt.timedelta:
+    days, seconds, microseconds = (int(part) for part in data.split())
+    return dt.timedelta(days, seconds, microseconds)
+
+
+# How each value of a type JSON has no type for is read back from the string it
+# was stored as, by the name of its type
+DECODERS: dict[str, Callable[[str], object]] = {
+    "decimal": Decimal,
+    "datetime": dt.datetime.fromisoformat,
+    "date": dt.date.fromisoformat,
+    "time": dt.time.fromisoformat,
+    "timedelta": timedelta,
+    "bytes": base64.b64decode,
+    "set": lambda data: set(data.split(",")) if data else set(),
+}
+
+
+def encode_value(value: object) -> object:
+    """
+    Return the value as JSON data that decodes to a value of the same type.
+    Values of types JSON has no type for are stored as strings tagged with the
+    name of their type. Any other values are stored as strings alone.
+    """
+    match value:
+        case None | bool() | int() | float() | str():
+            return value
+        case Decimal():
+            tagged = ("decimal", str(value))
+        case dt.datetime():
+            tagged = ("datetime", value.isoformat())
+        case dt.date():
+            tagged = ("date", value.isoformat())
+        case dt.time():
+            tagged = ("time", value.isoformat())
+        case dt.timedelta():
+            tagged = ("timedelta", f"{value.days} {value.seconds} {value.microseconds}")
+        case bytes():
+            tagged = ("bytes", base64.b64encode(value).decode("ascii"))
+        case set() if all(isinstance(item, str) for item in value):
+            # MySQL SET values can't contain commas
+            tagged = ("set", ",".join(sorted(value)))
+        case _:
+            return str(value)
+    return {tagged[0]: tagged[1]}
+
+
+def decode_value(value: object) -> object:
+    match value:
+        case {**tagged} if len(tagged) == 1:
+            ((name, data),) = tagged.items()
+            if isinstance(name, str) and isinstance(data, str) and name in DECODERS:
+                return DECODERS[name](data)
+    return value
+
+
+@dataclass
+class ResultCacheConfig:
+    directory: Path
+
+    # Seconds before a cached result set is considered stale
+    ttl: float = 24 * 60 * 60
+
+    # Total size of the cache directory before the least recently used result
+    # sets are evicted
+    max_bytes: int = 256 * 2**20
+
+    def __post_init__(self) -> None:
+        if self.ttl < 0:
+            raise ValueError("cache TTL must not be negative")
+        if self.max_bytes <= 0:
+            raise ValueError("cache size must be strictly positive")
+
+
+@dataclass
+class ResultCache:
+    """
+    Cache query result sets on local disk, keyed by query text, query
+    parameters, and connection target.
+
+    Each result set is one JSON document holding the column names once and
+    each row as a plain array of values. Values JSON cannot represent (dates,
+    decimals, and so on) are stored as strings tagged with their type, so
+    that cached rows have values of the same types as the rows of the query.
+
+    The modification time of each file records when it was last read, so the
+    least recently used files are evicted first.
+    """
+
+    SUFFIX = ".json"
+
+    # Changes whenever result sets are stored differently, so that older ones
+    # are never read
+    VERSION = "2"
+
+    config: ResultCacheConfig
+    clock: Callable[[], float] = time.time
+
+    def path(self, query: str, target: str, parameters: Sequence[str] = ()) -> Path:
+        digest = hashlib.sha256("\0".join([self.VERSION, target, query, *parameters]).encode("utf-8")).hexdigest()
+        return self.config.directory / f"{digest}{self.SUFFIX}"
+
+    def get(self, query: str, target: str, parameters: Sequence[str] = ()) -> list[dict[str, str]] | None:
+        """
+        Return the cached result set of the query, or None if it isn't cached or
+        has expired.
+        """
+        path = self.path(query, target, parameters)
+        try:
+            data = path.read_bytes()
+        except FileNotFoundError:
+            return None
+        try:
+            cached: object = json.loads(data)
+        except ValueError:
+            return None
+
+        match cached:
+            case {"created": float() as created, "columns": list() as columns, "rows": list() as rows}:
+                pass
+            case _:
+                return None
+
+        now = self.clock()
+        if now - created > self.config.ttl:
+            path.unlink(missing_ok=True)
+            return None
+
+        os.utime(path, (now, now))
+        return [dict(zip(columns, map(decode_value, row))) for row in rows]  # type: ignore[misc,arg-type] # Rows hold whatever types the database returns
+
+    def put(self, query: str, target: str, rows: Iterable[dict[str, str]], parameters: Sequence[str] = ()) -> None:
+        """
+        Cache the result set of the query.
+        """
+        deque(self.store(query, target, rows, parameters), maxlen=0)
+
+    def store(
+        self,
+        query: str,
+        target: str,
+        rows: Iterable[dict[str, str]],
+        parameters: Sequence[str] = (),
+    ) -> Iterator[dict[str, str]]:
+        """
+        Yield the rows, writing each to a temporary file as it passes through.
+        Once they have all been yielded, move the file into place and evict
+        old result sets if the cache has grown too large. If the rows are
+        abandoned partway, nothing is cached.
+        """
+        now = self.clock()
+        self.config.directory.mkdir(parents=True, exist_ok=True)
+        with NamedTemporaryFile("w", encoding="utf-8", dir=self.config.directory, suffix=".tmp", delete=False) as f:
+            try:
+                yield from self.write(f, rows, float(now))
+            except BaseException:
+                f.close()
+                os.unlink(f.name)
+                raise
+        path = self.path(query, target, parameters)
+        os.replace(f.name, path)
+        os.utime(path, (now, now))
+
+        self.evict()
+
+    def write(self, f: IO[str], rows: Iterable[dict[str, str]], created: float) -> Iterator[dict[str, str]]:
+        """
+        Write the rows as one JSON document, yielding each once it is written.
+        The column names are taken from the first row.
+        """
+        columns: list[str] | None = None
+        for row in rows:
+            if columns is None:
+                columns = list(row)
+                f.write(f'{{"created":{dumps(created)},"columns":{dumps(columns)},"rows":[')
+            else:
+                f.write(",")
+            f.write(dumps([encode_value(row[column]) for column in columns]))
+            yield row
+        if columns is None:
+            f.write(f'{{"created":{dumps(created)},"columns":[],"rows":[')
+        f.write("]}")
+
+    def evict(self) -> None:
+        evict(self.config.directory, self.SUFFIX, self.config.max_bytes, self.clock())
+
+
+def evict(directory: Path, suffix: str, max_bytes: int, now: float | None = None) -> None:
+    """
+    Delete the least recently used files with the suffix in the directory until
+    they fit in the given size, along with any stale temporary files.
+    """
+    stale = (time.time() if now is None else now) - STALE_TEMPORARY
+    for path in directory.glob("*.tmp"):
+        try:
+            modified = path.stat().st_mtime
+        except FileNotFoundError:
+            continue
+        if modified < stale:
+            path.unlink(missing_ok=True)
+
+    entries = []
+    for path in directory.glob(f"*{suffix}"):
+        try:
+            stat = path.stat()
+        except FileNotFoundError:
+            continue
+        entries.append((stat.st_mtime, stat.st_size, path))
+
+    total = sum(size for _, size, _ in entries)
+    for _, size, path in sorted(entries):
+        if total <= max_bytes:
+            break
+        path.unlink(missing_ok=True)
+        total -= size
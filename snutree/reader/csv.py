@@ -1,10 +1,46 @@
-from collections.abc import Iterable
+import csv
+from collections.abc import Iterable, Iterator, Set
 from csv import DictReader
 from typing import IO, ClassVar
 
+from snutree.model.rank import RankFilter
+
 
 class CsvReader:
     extensions: ClassVar[list[str]] = [".csv"]
+    prefetch: ClassVar[bool] = False
+    cacheable: ClassVar[bool] = True
+
+    def read(
+        self,
+        stream: IO[str],
+        row_filter: RankFilter | None = None,
+        columns: Set[str] | None = None,
+    ) -> Iterable[dict[str, str]]:
+        rows: Iterable[dict[str, str]] = DictReader(stream) if columns is None else self.project(stream, columns)
+        yield from rows if row_filter is None else filter(row_filter, rows)
+
+    def project(self, stream: IO[str], columns: Set[str]) -> Iterator[dict[str, str]]:
+        """
+        Yield rows like DictReader would, but with only the given columns. The
+        positions of the columns are looked up once, so the other fields of a
+        row are never copied into a dict.
+        """
+
+        reader = csv.reader(stream)
+
+        try:
+            header = next(reader)
+        except StopIteration:
+            return
+
+        fields = [(i, name) for i, name in enumerate(header) if name in columns]
 
-    def read(self, stream: IO[str]) -> Iterable[dict[str, str]]:
-        yield from DictReader(stream)
+        for values in reader:
+            if not values:
+                continue
+            if len(values) >= len(header):
+                yield {name: values[i] for i, name in fields}
+            else:
+                # Like DictReader, fill in missing trailing fields with None
+                yield {name: values[i] if i < len(values) else None for i, name in fields}  # type: ignore[misc]
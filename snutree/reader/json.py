@@ -1,12 +1,105 @@
 import json
-from collections.abc import Iterable
+from collections.abc import Iterable, Iterator, Set
+from dataclasses import dataclass
 from typing import IO, ClassVar
 
+from snutree.model.rank import RankFilter
+from snutree.reader.projection import project
+
+# Characters at the end of a buffer that might be the start of the rest of a
+# number, which would otherwise decode early (like "1." of "1.5" or "2e" of
+# "2e-3")
+NUMBER_TAIL = 2
+
+
+@dataclass
+class JsonArrayDecoder:
+    """
+    Decode the elements of a top-level JSON array from a stream one at a time,
+    holding only about one chunk of the stream in memory at once.
+    """
+
+    stream: IO[str]
+    chunk_size: int = 2**16
+
+    buffer: str = ""
+    position: int = 0
+    eof: bool = False
+
+    def fill(self) -> None:
+        chunk = self.stream.read(self.chunk_size)
+        self.buffer = self.buffer[self.position :] + chunk
+        self.position = 0
+        self.eof = not chunk
+
+    def peek(self) -> str:
+        """
+        Skip whitespace and return the next character, or "" at the end of the
+        stream.
+        """
+        while True:
+            while self.position < len(self.buffer) and self.buffer[self.position].isspace():
+                self.position += 1
+            if self.position < len(self.buffer) or self.eof:
+                return self.buffer[self.position : self.position + 1]
+            self.fill()
+
+    def expect(self, characters: str) -> str:
+        character = self.peek()
+        if not character or character not in characters:
+            raise ValueError(f"expected one of {characters!r} in JSON array, but found {character!r}")
+        self.position += 1
+        return character
+
+    def decode(self) -> object:
+        decoder = json.JSONDecoder()
+        self.peek()
+        while True:
+            # A value that is cut off by (or that ends near) the end of the
+            # buffer might continue in the next chunk, so try again with more
+            # data
+            try:
+                obj, end = decoder.raw_decode(self.buffer, self.position)  # type: ignore[misc]
+            except json.JSONDecodeError:
+                if self.eof:
+                    raise
+            else:
+                if len(self.buffer) - end > NUMBER_TAIL or self.eof:
+                    self.position = end
+                    value: object = obj
+                    return value
+            self.fill()
+
+    def __iter__(self) -> Iterator[object]:
+        self.expect("[")
+        if self.peek() == "]":
+            self.position += 1
+        else:
+            while True:
+                yield self.decode()
+                if self.expect(",]") == "]":
+                    break
+        if self.peek():
+            raise ValueError("unexpected data after JSON array")
+
 
 class JsonReader:
     extensions: ClassVar[list[str]] = [".json"]
+    prefetch: ClassVar[bool] = False
+    cacheable: ClassVar[bool] = True
+
+    def read(
+        self,
+        stream: IO[str],
+        row_filter: RankFilter | None = None,
+        columns: Set[str] | None = None,
+    ) -> Iterable[dict[str, str]]:
+        rows = project(self.objects(stream), columns)
+        yield from rows if row_filter is None else filter(row_filter, rows)
 
-    def read(self, stream: IO[str]) -> Iterable[dict[str, str]]:
-        objs: object = json.load(stream)
-        assert isinstance(objs, list)
-        yield from objs
+    def objects(self, stream: IO[str]) -> Iterator[dict[str, str]]:
+        for obj in JsonArrayDecoder(stream):
+            if not isinstance(obj, dict):
+                raise ValueError(f"expected an object in JSON array, but found {type(obj).__name__}")
+            row: dict[str, str] = obj
+            yield row
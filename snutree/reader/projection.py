@@ -0,0 +1,36 @@
+import warnings
+from collections.abc import Iterable, Iterator, Set
+
+
+def project(rows: Iterable[dict[str, str]], columns: Set[str] | None) -> Iterator[dict[str, str]]:
+    """
+    Yield the rows with only the given columns, or with all columns if none
+    are given.
+    """
+    if columns is None:
+        yield from rows
+    else:
+        for row in rows:
+            yield {column: value for column, value in row.items() if column in columns}
+
+
+def check_projection(names: Iterable[str], columns: Set[str] | None, source: str) -> None:
+    """
+    Warn if a source provides columns outside the projection (i.e., columns it
+    is fetching for no reason).
+    """
+    if columns is not None and (unused := sorted(set(names) - columns)):
+        warnings.warn(f"{source} selects columns that are never used: {', '.join(unused)}", stacklevel=3)
+
+
+def check_rows(rows: Iterable[dict[str, str]], columns: Set[str] | None, source: str) -> Iterator[dict[str, str]]:
+    """
+    Yield the rows, checking the columns of the first one against the
+    projection.
+    """
+    iterator = iter(rows)
+    for row in iterator:
+        check_projection(row, columns, source)
+        yield row
+        break
+    yield from iterator
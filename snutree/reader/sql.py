@@ -1,11 +1,29 @@
-from collections.abc import Iterable, Iterator
-from contextlib import closing, contextmanager, nullcontext
-from dataclasses import dataclass
-from types import SimpleNamespace
-from typing import IO, ClassVar, ContextManager, Protocol, TypedDict
+import threading
+import time
+from collections import Counter
+from collections.abc import Callable, Iterable, Iterator, Sequence, Set
+from contextlib import contextmanager
+from dataclasses import dataclass, field
+from typing import (
+    IO,
+    TYPE_CHECKING,
+    ClassVar,
+    Generic,
+    Protocol,
+    TypedDict,
+    TypeVar,
+)
 
-import MySQLdb
-from sshtunnel import SSHTunnelForwarder
+from snutree.model.rank import RankFilter
+from snutree.reader.cache import ResultCache, ResultCacheConfig
+from snutree.reader.projection import check_rows, project
+
+# MySQLdb and sshtunnel (through paramiko) are slow to import, so they are only
+# imported once a query actually runs
+if TYPE_CHECKING:
+    import MySQLdb
+
+T = TypeVar("T")
 
 
 class SshConfig(TypedDict):
@@ -16,10 +34,6 @@ class SshConfig(TypedDict):
     allow_agent: bool
 
 
-class SshTunnelContext(Protocol):
-    local_bind_port: int
-
-
 class SqlConfig(TypedDict):
     host: str
     port: int
@@ -33,36 +47,408 @@ class SqlReaderConfig:
     sql: SqlConfig
     ssh: SshConfig | None = None
 
+    # Stream rows through a server-side cursor instead of buffering the whole
+    # result set on the client. Rows are fetched `batch_size` at a time.
+    streaming: bool = False
+    batch_size: int = 1000
+
+    # Seconds that pooled connections and tunnels may sit unused before they
+    # are closed
+    idle_timeout: float = 300.0
+
+    # Cache result sets on local disk
+    cache: ResultCacheConfig | None = None
+
+    # SQL expression for the rank index of a row returned by a query. If
+    # provided, the tree's rank window is pushed into the query as a WHERE
+    # clause; otherwise, rows are filtered as they are read. For semesters in a
+    # column like "Fall 2010", this might be:
+    #
+    #   2 * CAST(SUBSTRING_INDEX(semester, ' ', -1) AS UNSIGNED) + (semester LIKE 'Fall%')
+    #
+    rank_expression: str | None = None
+
+    def __post_init__(self) -> None:
+        if self.batch_size <= 0:
+            raise ValueError("batch size must be strictly positive")
+        if self.idle_timeout < 0:
+            raise ValueError("idle timeout must not be negative")
+
+    @property
+    def target(self) -> str:
+        """
+        Return a string identifying the database these settings connect to.
+        """
+        target = f"{self.sql['user']}@{self.sql['host']}:{self.sql['port']}/{self.sql['database']}"
+        if self.ssh is not None:
+            ssh_host, ssh_port = self.ssh["ssh_address_or_host"]
+            target += f" via {self.ssh['ssh_username']}@{ssh_host}:{ssh_port}"
+        return target
+
+
+class SqlCursor(Protocol):
+    def __enter__(self) -> "SqlCursor": ...
+
+    def __exit__(self, *exc_info: object) -> None: ...
+
+    def execute(self, query: str, args: Sequence[str] | None = None) -> object: ...
+
+    def fetchmany(self, size: int) -> Sequence[dict[str, str]]: ...
+
+    def fetchall(self) -> Sequence[dict[str, str]]: ...
+
+
+class SqlConnection(Protocol):
+    def cursor(self, cursorclass: "type[MySQLdb.cursors.BaseCursor] | None" = None) -> SqlCursor: ...
+
+    def ping(self) -> None: ...
+
+    def close(self) -> None: ...
+
+
+class SshTunnel(Protocol):
+    local_bind_port: int
+
+    @property
+    def is_active(self) -> bool: ...
+
+    def stop(self) -> None: ...
+
 
 @dataclass
-class SqlReader:
-    extensions: ClassVar[list[str]] = [".sql"]
+class DirectTunnel:
+    """
+    Stand-in for an SSH tunnel when the database is reachable directly.
+    """
 
-    config: SqlReaderConfig
+    local_bind_port: int
+    is_active: bool = True
+
+    def stop(self) -> None:
+        self.is_active = False
+
+
+def connect(config: SqlConfig) -> SqlConnection:
+    import MySQLdb  # pylint: disable=import-outside-toplevel
+
+    connection: SqlConnection = MySQLdb.Connect(**config, use_unicode=True)
+    return connection
+
+
+def open_tunnel(config: SshConfig) -> SshTunnel:
+    # pylint: disable-next=import-outside-toplevel
+    from sshtunnel import SSHTunnelForwarder
+
+    tunnel: SshTunnel = SSHTunnelForwarder(**config)
+    tunnel.start()  # type: ignore[attr-defined]
+    return tunnel
+
+
+def is_healthy(connection: SqlConnection) -> bool:
+    import MySQLdb  # pylint: disable=import-outside-toplevel
+
+    try:
+        connection.ping()
+    except MySQLdb.Error:
+        return False
+    else:
+        return True
+
+
+def close_all(closers: Iterable[Callable[[], None]]) -> None:
+    for close in closers:
+        close()
+
+
+@dataclass
+class Pooled(Generic[T]):
+    resource: T
+    last_used: float
+
+
+@dataclass
+class SqlConnectionPool:  # pylint: disable=too-many-instance-attributes
+    """
+    Keep SSH tunnels and database connections open across SQL inputs.
+
+    Idle connections are handed out again if they pass a health check, and are
+    closed once they have sat unused for longer than the idle timeout. A tunnel
+    is closed once no connections through it remain and it has been unused for
+    just as long. A background thread closes them even if the pool is no
+    longer used.
+
+    The lock only guards the pool's own bookkeeping. Opening tunnels and
+    connections, checking their health, and closing them all happen outside
+    of it, so that threads reading other inputs don't wait on the network.
+
+    The connection, tunnel, and health check functions can be swapped out to
+    run against a local stand-in for the remote database.
+    """
+
+    idle_timeout: float = 300.0
+    connect: Callable[[SqlConfig], SqlConnection] = connect
+    open_tunnel: Callable[[SshConfig], SshTunnel] = open_tunnel
+    is_healthy: Callable[[SqlConnection], bool] = is_healthy
+    clock: Callable[[], float] = time.monotonic
+
+    tunnels: dict[str, Pooled[SshTunnel]] = field(default_factory=dict, init=False, repr=False)
+    idle: dict[str, list[Pooled[SqlConnection]]] = field(default_factory=dict, init=False, repr=False)
+    active: Counter[str] = field(default_factory=Counter, init=False, repr=False)
+    lock: threading.Lock = field(default_factory=threading.Lock, init=False, repr=False)
+
+    # Held while opening the tunnel to a target, so that threads needing the
+    # same tunnel wait for it instead of each opening their own
+    opening: dict[str, threading.Lock] = field(default_factory=dict, init=False, repr=False)
+
+    reaper: threading.Thread | None = field(default=None, init=False, repr=False)
+    closed: threading.Event = field(default_factory=threading.Event, init=False, repr=False)
 
     @contextmanager
-    def forwarded(self) -> Iterator[SqlConfig]:
-        context: ContextManager[SshTunnelContext]
-        if self.config.ssh is None:
-            context = nullcontext(SimpleNamespace(local_bind_port=self.config.sql["port"]))
+    def connection(self, config: SqlReaderConfig) -> Iterator[SqlConnection]:
+        connection = self.acquire(config)
+        try:
+            yield connection
+        except BaseException:
+            # The connection may be in the middle of a result set; don't reuse it
+            self.discard(config, connection)
+            raise
         else:
-            context = SSHTunnelForwarder(**self.config.ssh)
+            self.release(config, connection)
+
+    def acquire(self, config: SqlReaderConfig) -> SqlConnection:
+        """
+        Return a healthy connection to the configured database, reusing an
+        idle connection (and its tunnel) if possible.
+        """
+        key = config.target
+        with self.lock:
+            self.start_reaper()
+            expired = self.prune()
+            self.active[key] += 1
+        close_all(expired)
 
-        with context as tunnel:
-            yield SqlConfig(
-                host=self.config.sql["host"],
+        try:
+            return self.reuse_or_connect(key, config)
+        except BaseException:
+            with self.lock:
+                self.active[key] -= 1
+            raise
+
+    def reuse_or_connect(self, key: str, config: SqlReaderConfig) -> SqlConnection:
+        tunnel = self.tunnel(key, config)
+        while (connection := self.take_idle(key)) is not None:
+            if self.is_healthy(connection):
+                return connection
+            connection.close()
+        return self.connect(
+            SqlConfig(
+                host=config.sql["host"],
                 port=tunnel.local_bind_port,
-                database=self.config.sql["database"],
-                user=self.config.sql["user"],
-                password=self.config.sql["password"],
+                database=config.sql["database"],
+                user=config.sql["user"],
+                password=config.sql["password"],
             )
+        )
+
+    def take_idle(self, key: str) -> SqlConnection | None:
+        with self.lock:
+            idle = self.idle.get(key)
+            return idle.pop().resource if idle else None
+
+    def release(self, config: SqlReaderConfig, connection: SqlConnection) -> None:
+        """
+        Return a connection to the pool.
+        """
+        key = config.target
+        with self.lock:
+            now = self.clock()
+            self.active[key] -= 1
+            self.idle.setdefault(key, []).append(Pooled(connection, now))
+            if key in self.tunnels:
+                self.tunnels[key].last_used = now
+            expired = self.prune()
+        close_all(expired)
+
+    def discard(self, config: SqlReaderConfig, connection: SqlConnection) -> None:
+        """
+        Close a connection taken from the pool instead of returning it.
+        """
+        key = config.target
+        with self.lock:
+            self.active[key] -= 1
+            if key in self.tunnels:
+                self.tunnels[key].last_used = self.clock()
+        connection.close()
+
+    def tunnel(self, key: str, config: SqlReaderConfig) -> SshTunnel:
+        """
+        Return an open tunnel for the given target, replacing it if it died.
+        """
+        with self.lock:
+            opening = self.opening.setdefault(key, threading.Lock())
+
+        with opening:
+            with self.lock:
+                dead: list[Callable[[], None]] = []
+                if (pooled := self.tunnels.get(key)) is not None:
+                    if pooled.resource.is_active:
+                        pooled.last_used = self.clock()
+                        return pooled.resource
+                    # Connections through a dead tunnel are dead too
+                    dead.extend(idle.resource.close for idle in self.idle.pop(key, []))
+                    del self.tunnels[key]
+            close_all(dead)
+
+            tunnel: SshTunnel
+            if config.ssh is None:
+                tunnel = DirectTunnel(config.sql["port"])
+            else:
+                tunnel = self.open_tunnel(config.ssh)
+            with self.lock:
+                self.tunnels[key] = Pooled(tunnel, self.clock())
+            return tunnel
+
+    def prune(self) -> list[Callable[[], None]]:
+        """
+        Take connections and tunnels that have been idle for too long out of
+        the pool, and return the functions that close them, to be called once
+        the lock is released. Must be called with the lock held.
+        """
+        now = self.clock()
+        expired: list[Callable[[], None]] = []
+
+        for idle in self.idle.values():
+            fresh = []
+            for pooled in idle:
+                if now - pooled.last_used > self.idle_timeout:
+                    expired.append(pooled.resource.close)
+                else:
+                    fresh.append(pooled)
+            idle[:] = fresh
+
+        for key, pooled_tunnel in list(self.tunnels.items()):
+            in_use = self.active[key] > 0 or self.idle.get(key)
+            if not in_use and now - pooled_tunnel.last_used > self.idle_timeout:
+                expired.append(pooled_tunnel.resource.stop)
+                del self.tunnels[key]
+
+        return expired
+
+    def reap(self) -> None:
+        """
+        Close connections and tunnels that have been idle for too long.
+        """
+        with self.lock:
+            expired = self.prune()
+        close_all(expired)
+
+    def start_reaper(self) -> None:
+        """
+        Start the thread that reaps idle connections and tunnels every half
+        idle timeout, unless it is running. Must be called with the lock held.
+        """
+        if self.reaper is not None or self.idle_timeout <= 0:
+            return
+
+        def run() -> None:
+            while not self.closed.wait(self.idle_timeout / 2):
+                self.reap()
 
-    def read(self, stream: IO[str]) -> Iterable[dict[str, str]]:
+        self.closed.clear()
+        self.reaper = threading.Thread(target=run, name="snutree-sql-reaper", daemon=True)
+        self.reaper.start()
+
+    def close(self) -> None:
+        """
+        Stop the reaper and close all idle connections and all tunnels.
+        """
+        with self.lock:
+            reaper, self.reaper = self.reaper, None
+            self.closed.set()
+            expired = [pooled.resource.close for idle in self.idle.values() for pooled in idle]
+            expired.extend(pooled_tunnel.resource.stop for pooled_tunnel in self.tunnels.values())
+            self.idle.clear()
+            self.tunnels.clear()
+        if reaper is not None:
+            reaper.join()
+        close_all(expired)
+
+
+@dataclass
+class SqlReader:
+    extensions: ClassVar[list[str]] = [".sql"]
+    prefetch: ClassVar[bool] = True
+    cacheable: ClassVar[bool] = False
+
+    config: SqlReaderConfig
+    pool: SqlConnectionPool = field(default_factory=SqlConnectionPool)
+
+    # Ignore cached result sets, but still cache the fresh ones
+    refresh: bool = False
+
+    cache: ResultCache | None = field(init=False, repr=False)
+
+    def __post_init__(self) -> None:
+        self.cache = ResultCache(self.config.cache) if self.config.cache is not None else None
+
+    def read(
+        self,
+        stream: IO[str],
+        row_filter: RankFilter | None = None,
+        columns: Set[str] | None = None,
+    ) -> Iterable[dict[str, str]]:
         query = stream.read()
+        parameters: list[str] | None = None
+
+        if row_filter is not None and self.config.rank_expression is not None:
+            # MySQLdb interpolates parameters with %, so escape any other % signs
+            query, parameters = row_filter.select(
+                query=query.replace("%", "%%"),
+                rank_expression=self.config.rank_expression.replace("%", "%%"),
+                placeholder="%s",
+            )
+            row_filter = None
+
+        rows = project(check_rows(self.query(query, parameters), columns, "SQL query"), columns)
+        return rows if row_filter is None else filter(row_filter, rows)
+
+    def query(self, query: str, parameters: list[str] | None) -> Iterable[dict[str, str]]:
+        if self.cache is not None and not self.refresh:
+            cached = self.cache.get(query, self.config.target, parameters or ())
+            if cached is not None:
+                return cached
+
+        rows = self.stream(query, parameters) if self.config.streaming else self.fetch(query, parameters)
+
+        if self.cache is not None:
+            return self.cache.store(query, self.config.target, rows, parameters or ())
+        else:
+            return rows
+
+    def fetch(self, query: str, parameters: list[str] | None = None) -> list[dict[str, str]]:
+        """
+        Run the query and return its whole result set at once.
+        """
+        import MySQLdb  # pylint: disable=import-outside-toplevel
+
+        with self.pool.connection(self.config) as connection:
+            with connection.cursor(MySQLdb.cursors.DictCursor) as cursor:  # type: ignore[misc]
+                cursor.execute("SET NAMES 'utf8'")
+                cursor.execute(query, parameters)
+                return list(cursor.fetchall())
+
+    def stream(self, query: str, parameters: list[str] | None = None) -> Iterator[dict[str, str]]:
+        """
+        Run the query and yield its rows in batches from a server-side cursor.
+
+        The connection stays checked out of the pool until the generator is
+        exhausted or closed.
+        """
+        import MySQLdb  # pylint: disable=import-outside-toplevel
 
-        with self.forwarded() as config_sql:
-            with closing(MySQLdb.Connect(**config_sql, use_unicode=True)) as connection:
-                with connection.cursor(MySQLdb.cursors.DictCursor) as cursor:  # type: ignore[misc]
-                    cursor.execute("SET NAMES 'utf8'")  # type: ignore[misc]
-                    cursor.execute(query)  # type: ignore[misc]
-                    return list(cursor.fetchall())  # type: ignore[misc]
+        with self.pool.connection(self.config) as connection:
+            with connection.cursor(MySQLdb.cursors.SSDictCursor) as cursor:  # type: ignore[misc]
+                cursor.execute("SET NAMES 'utf8'")
+                cursor.execute(query, parameters)
+                while batch := cursor.fetchmany(self.config.batch_size):
+                    yield from batch
@@ -0,0 +1,77 @@
+import sqlite3
+from collections.abc import Iterator, Set
+from contextlib import closing
+from dataclasses import dataclass
+from pathlib import Path
+from typing import IO, ClassVar
+from urllib.parse import urlencode
+
+from snutree.model.rank import RankFilter
+from snutree.reader.projection import check_projection
+
+
+@dataclass
+class SqliteReaderConfig:
+    path: Path
+
+    # Open the database with `mode=ro`, so queries can never modify it
+    read_only: bool = True
+
+    # Open the database with `cache=shared`, so connections within this process
+    # share one page cache
+    shared_cache: bool = False
+
+    # Number of rows to fetch from the cursor at a time
+    batch_size: int = 1000
+
+    # SQL expression for the rank index of a row returned by a query. If
+    # provided, the tree's rank window is pushed into the query as a WHERE
+    # clause; otherwise, rows are filtered as they are read.
+    rank_expression: str | None = None
+
+    def __post_init__(self) -> None:
+        if self.batch_size <= 0:
+            raise ValueError("batch size must be strictly positive")
+
+    @property
+    def uri(self) -> str:
+        parameters = {
+            **({"mode": "ro"} if self.read_only else {}),
+            **({"cache": "shared"} if self.shared_cache else {}),
+        }
+        uri = self.path.resolve().as_uri()
+        return f"{uri}?{urlencode(parameters)}" if parameters else uri
+
+
+@dataclass
+class SqliteReader:
+    extensions: ClassVar[list[str]] = [".sql"]
+    prefetch: ClassVar[bool] = False
+    cacheable: ClassVar[bool] = False
+
+    config: SqliteReaderConfig
+
+    def read(
+        self,
+        stream: IO[str],
+        row_filter: RankFilter | None = None,
+        columns: Set[str] | None = None,
+    ) -> Iterator[dict[str, str]]:
+        query = stream.read()
+        parameters: list[str] = []
+
+        if row_filter is not None and self.config.rank_expression is not None:
+            query, parameters = row_filter.select(query, self.config.rank_expression, placeholder="?")
+            row_filter = None
+
+        with closing(sqlite3.connect(self.config.uri, uri=True)) as connection:
+            with closing(connection.execute(query, parameters)) as cursor:
+                names: list[str] = [description[0] for description in cursor.description]  # type: ignore[misc]
+                check_projection(names, columns, "SQL query")
+                fields = [(i, name) for i, name in enumerate(names) if columns is None or name in columns]
+                while batch := cursor.fetchmany(self.config.batch_size):  # type: ignore[misc]
+                    rows: list[tuple[str, ...]] = batch
+                    for row in rows:
+                        result = {name: row[i] for i, name in fields}
+                        if row_filter is None or row_filter(result):
+                            yield result
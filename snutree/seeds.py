@@ -0,0 +1,257 @@
+import math
+import os
+import re
+import subprocess
+import time
+from bisect import bisect_left
+from collections.abc import Iterable, Sequence
+from concurrent.futures import (
+    FIRST_COMPLETED,
+    Future,
+    ProcessPoolExecutor,
+    wait,
+)
+from dataclasses import dataclass, field
+from typing import Generic, TypeVar
+
+from snutree.model.rank import AnyRank
+from snutree.model.tree import FamilyTree
+from snutree.tool.layout import DotContents
+from snutree.writer.dot import DotWriter
+from snutree.writer.graphviz import (
+    GraphvizError,
+    GraphvizFormat,
+    GraphvizWriter,
+    GraphvizWriterConfig,
+    LayoutPolicy,
+    LayoutStrategy,
+    LayoutTier,
+)
+
+MemberT = TypeVar("MemberT")
+
+# The bounding box of the root graph, which is the first one Graphviz writes
+BOUNDING_BOX = re.compile(r'\bbb="?(-?[0-9.]+),(-?[0-9.]+),(-?[0-9.]+),(-?[0-9.]+)')
+
+# A rank direction that lays ranks out from side to side
+RANKDIR = re.compile(r'\brankdir="?(?:LR|RL)\b', re.IGNORECASE)
+
+Point = tuple[float, float]
+
+
+@dataclass(order=True)
+class LayoutScore:
+    """
+    How good the layout of a seed is. Scores are ordered from best to worst by
+    their crossings, then by their edge length, and then by their area.
+    """
+
+    # Pairs of edges that cross, with each edge drawn as a straight line
+    crossings: int
+
+    # Total length of the edges, in points
+    edge_length: float
+
+    # Area of the page, in square points
+    area: float
+
+    seed: int
+
+
+def inversions(values: list[float]) -> int:
+    """
+    Count the pairs of values that are out of order, sorting the values.
+    """
+    if len(values) < 2:
+        return 0
+    middle = len(values) // 2
+    left, right = values[:middle], values[middle:]
+    count = inversions(left) + inversions(right)
+
+    merged: list[float] = []
+    i = j = 0
+    while i < len(left) and j < len(right):
+        if left[i] <= right[j]:
+            merged.append(left[i])
+            i += 1
+        else:
+            merged.append(right[j])
+            j += 1
+            count += len(left) - i
+    values[:] = [*merged, *left[i:], *right[j:]]
+    return count
+
+
+def crossings(segments: Iterable[tuple[Point, Point]]) -> int:
+    """
+    Count the pairs of segments that cross between adjacent rank levels, which
+    are the heights of the segments' endpoints. Two segments cross within the
+    band between two levels only if their order at the top of the band differs
+    from their order at its bottom. A segment that spans several levels is only
+    put in the bands at either end, so crossings in the middle of a long
+    segment aren't counted. Segments that only share an endpoint don't cross,
+    and horizontal segments are left out.
+    """
+    vertical = [(a, b) if a[1] <= b[1] else (b, a) for a, b in segments if a[1] != b[1]]
+    levels = sorted({y for a, b in vertical for _, y in (a, b)})
+
+    bands: dict[int, list[tuple[float, float]]] = {}
+    for (x1, y1), (x2, y2) in vertical:
+        for band in sorted({bisect_left(levels, y1), bisect_left(levels, y2) - 1}):
+            top, bottom = levels[band], levels[band + 1]
+            bands.setdefault(band, []).append(
+                (x1 + (x2 - x1) * (top - y1) / (y2 - y1), x1 + (x2 - x1) * (bottom - y1) / (y2 - y1))
+            )
+
+    return sum(inversions([bottom for _, bottom in sorted(band)]) for band in bands.values())
+
+
+def score_layout(seed: int, dot: str) -> LayoutScore:
+    """
+    Score a layout written by Graphviz in DOT format.
+    """
+    contents = DotContents.read(dot)
+    positions = contents.positions()
+    segments = [
+        (positions[tail], positions[head]) for tail, head in contents.edges if tail in positions and head in positions
+    ]
+    if RANKDIR.search(dot):
+        # Turn the layout so that its ranks are levels on the y-axis
+        ranked = [((y1, x1), (y2, x2)) for (x1, y1), (x2, y2) in segments]
+    else:
+        ranked = segments
+
+    match = BOUNDING_BOX.search(dot)
+    if match is not None:
+        x0, y0, x1, y1 = (float(value) for value in match.groups())
+    else:
+        xs, ys = [x for x, _ in positions.values()], [y for _, y in positions.values()]
+        x0, y0, x1, y1 = min(xs, default=0.0), min(ys, default=0.0), max(xs, default=0.0), max(ys, default=0.0)
+
+    return LayoutScore(
+        crossings=crossings(ranked),
+        edge_length=sum(math.dist(tail, head) for tail, head in segments),
+        area=(x1 - x0) * (y1 - y0),
+        seed=seed,
+    )
+
+
+def lay_out_seed(
+    command: list[str],
+    strategy: LayoutStrategy | None,
+    seed: int,
+    dot: bytes,
+    deadline: float | None,
+) -> LayoutScore | None:
+    """
+    Lay out the DOT written with the seed, with the strategy if there is one,
+    and score the layout, or return None if the deadline passes first. Runs in
+    a worker process.
+    """
+    timeout = None if deadline is None else deadline - time.time()
+    if timeout is not None and timeout <= 0:
+        return None
+    arguments = strategy.arguments if strategy is not None else []
+    try:
+        result = subprocess.run(
+            [*command, *arguments, "-Tdot"], input=dot, capture_output=True, timeout=timeout, check=False
+        )
+    except subprocess.TimeoutExpired:
+        return None
+    output: bytes = result.stdout
+    errors: bytes = result.stderr
+    if result.returncode != 0:
+        raise GraphvizError(f"failed to compile dot file: {errors.decode('utf-8', errors='replace')}")
+    return score_layout(seed, output.decode("utf-8"))
+
+
+@dataclass
+class SeedSearch(Generic[AnyRank, MemberT]):
+    """
+    Lay out the tree with many seeds at once, each in its own Graphviz
+    process, and rank the seeds by how good their layouts are.
+    """
+
+    dot_writer: DotWriter[AnyRank, MemberT]
+
+    # The Graphviz command, to which the output format is added
+    command: list[str] = field(default_factory=lambda: ["dot"])
+
+    # Choose the layout engine by the size of the tree, as the Graphviz writer
+    # does. Only the first strategy of each tier is used, since a layout that
+    # was scored must also be the one rendered.
+    policy: LayoutPolicy | None = None
+
+    # Seeds laid out at once, or None for one for each CPU
+    workers: int | None = None
+
+    # Seconds the whole search may take, or None for no limit. Layouts still
+    # running once it is up are stopped, and seeds not yet started are skipped.
+    budget: float | None = None
+
+    def search(self, trees: Iterable[FamilyTree[AnyRank, MemberT]]) -> list[LayoutScore]:
+        """
+        Return the scores of the layouts of the trees, each with its own seed,
+        from best to worst. Trees are only written to DOT as workers free up.
+        """
+        workers = self.workers or os.cpu_count() or 1
+        deadline = None if self.budget is None else time.time() + self.budget
+
+        scores: list[LayoutScore] = []
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            pending: set[Future[LayoutScore | None]] = set()
+            for tree in trees:
+                if deadline is not None and time.time() >= deadline:
+                    break
+                if len(pending) >= 2 * workers:
+                    done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                    scores.extend(self.collect(done))
+                dot = self.dot_writer.write(tree)
+                strategy = self.strategy(len(tree.entities))
+                pending.add(executor.submit(lay_out_seed, self.command, strategy, tree.config.seed, dot, deadline))
+            scores.extend(self.collect(wait(pending).done))
+
+        return sorted(scores)
+
+    def strategy(self, size: int) -> LayoutStrategy | None:
+        if self.policy is None:
+            return None
+        return next(iter(self.policy.strategies(size)), None)
+
+    def writer(self, output_format: GraphvizFormat = "pdf") -> GraphvizWriter[AnyRank, MemberT]:
+        """
+        Return a Graphviz writer that lays out trees just as their seeds were
+        laid out to be scored.
+        """
+        policy = (
+            LayoutPolicy([LayoutTier(tier.max_entities, tier.strategies[:1]) for tier in self.policy.tiers])
+            if self.policy is not None
+            else None
+        )
+        return GraphvizWriter(self.dot_writer, output_format, self.command, GraphvizWriterConfig(policy=policy))
+
+    @classmethod
+    def like(
+        cls,
+        writer: GraphvizWriter[AnyRank, MemberT],
+        workers: int | None = None,
+        budget: float | None = None,
+    ) -> "SeedSearch[AnyRank, MemberT]":
+        """
+        Return a search that lays out seeds with the writer's Graphviz command
+        and layout policy.
+        """
+        return cls(writer.dot_writer, writer.command, writer.config.policy, workers, budget)
+
+    def collect(self, done: Iterable[Future[LayoutScore | None]]) -> list[LayoutScore]:
+        return [score for future in done if (score := future.result()) is not None]
+
+
+def leaderboard(scores: Sequence[LayoutScore], top: int = 10) -> str:
+    """
+    Return a table of the best scores.
+    """
+    lines = [f"{'':>4} {'seed':>10} {'crossings':>10} {'edge length':>12} {'area':>14}"]
+    for i, score in enumerate(scores[:top], start=1):
+        lines.append(f"{i:>4} {score.seed:>10} {score.crossings:>10} {score.edge_length:>12.0f} {score.area:>14.0f}")
+    return "\n".join(lines)
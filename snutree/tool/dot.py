@@ -1,12 +1,25 @@
 import re
+import string
 from abc import ABC
-from collections.abc import Iterable, Iterator
-from dataclasses import dataclass
+from collections import Counter
+from collections.abc import Callable, Iterable, Iterator, Mapping
+from dataclasses import dataclass, field
 from enum import Enum
+from itertools import count
 from typing import Protocol, Union, overload, runtime_checkable
 
 Id = Union[str, int, float]
 
+HTML_STRING = re.compile(r"^<.+>$")
+
+# IDs that need no quotes, unless they are keywords
+UNQUOTED_ID = re.compile(r"[A-Za-z_][A-Za-z_0-9]*|-?(\.[0-9]+|[0-9]+(\.[0-9]*)?)")
+KEYWORDS = {"node", "edge", "graph", "digraph", "subgraph", "strict"}
+
+# Characters of the short IDs given to nodes by the minimizer
+SHORT_ID_START = string.ascii_letters
+SHORT_ID_REST = string.ascii_letters + string.digits
+
 
 class NullStatementType(Enum):
     INSTANCE = object()
@@ -23,18 +36,28 @@ class Block:
     TAB_CHAR = " "
 
     def __init__(self, *subblocks: Union[str, "Block"]) -> None:
-        self.subblocks = list(subblocks)
+        self.subblocks: Iterable[Union[str, "Block"]] = list(subblocks)
+
+    @classmethod
+    def of(cls, subblocks: Iterable[Union[str, "Block"]]) -> "Block":
+        """
+        Return a block of the subblocks, which are only produced once its
+        lines are. The block can be written only once.
+        """
+        block = cls()
+        block.subblocks = subblocks
+        return block
 
     def __iter__(self) -> Iterator[Union[str, "Block"]]:
         yield from self.subblocks
 
-    def lines(self, level: int) -> Iterable[str]:
-        indent = level * self.TAB_STOP * self.TAB_CHAR
+    def lines(self, level: int, indent: bool = True) -> Iterable[str]:
+        prefix = level * self.TAB_STOP * self.TAB_CHAR if indent else ""
         for block in self.subblocks:
             if isinstance(block, Block):
-                yield from block.lines(level + 1)
+                yield from block.lines(level + 1, indent)
             else:
-                yield f"{indent}{block}\n"
+                yield f"{prefix}{block}\n"
 
 
 @runtime_checkable
@@ -67,6 +90,10 @@ class Component(ABC):
     def block(self) -> Block:
         return Block(str(self) + ";")
 
+    @property
+    def attributes(self) -> dict[str, Id]:
+        return {str(attribute.key): attribute.value for attribute in self.attrs}
+
     def __str__(self) -> str:
         ids: list[str]
         if is_attribute_statement := not bool(self.ids):
@@ -117,11 +144,107 @@ class Attribute:
     def __str__(self) -> str:
         return (
             f'{self.key}="{self.value}"'
-            if isinstance(self.value, str) and not re.match(r"^<.+>$", self.value)
+            if isinstance(self.value, str) and not HTML_STRING.match(self.value)
             else f"{self.key}={self.value}"
         )
 
 
+def render_id(identifier: Id, compact: bool = False) -> str:
+    """
+    Return the ID quoted, unless it is compact and needs no quotes.
+    """
+    text = str(identifier)
+    if compact and (
+        not isinstance(identifier, str)
+        or HTML_STRING.match(identifier)
+        or (UNQUOTED_ID.fullmatch(identifier) and identifier.lower() not in KEYWORDS)
+    ):
+        return text
+    return f'"{text}"'
+
+
+@dataclass
+class AttributeStrings:
+    """
+    Render lists of attributes, rendering each distinct list only once and
+    sharing the result among every statement that uses the same list.
+
+    Values are told apart by their type as well, since values that compare
+    equal (like True, 1, and 1.0) render differently. Once the limit of
+    distinct lists is reached, the rendered lists are cleared.
+    """
+
+    rendered: dict[tuple[tuple[str, type[object], Id], ...], str] = field(default_factory=dict)
+
+    # Leave out the quotes of values that don't need them
+    compact: bool = False
+
+    # Distinct lists kept rendered at once
+    limit: int = 4096
+
+    def __call__(self, attributes: Mapping[str, Id]) -> str:
+        key = tuple((name, type(value), value) for name, value in attributes.items())
+        rendered = self.rendered.get(key)
+        if rendered is None:
+            if len(self.rendered) >= self.limit:
+                self.rendered.clear()
+            if self.compact:
+                rendered = ",".join(
+                    f"{attribute.key}={render_id(attribute.value, compact=True)}"
+                    for attribute in Attribute.from_kwargs(**attributes)
+                )
+            else:
+                rendered = ",".join(map(str, Attribute.from_kwargs(**attributes)))
+            self.rendered[key] = rendered
+        return rendered
+
+
+@dataclass
+class RenderedStatement:
+    """
+    Represent a DOT statement that has already been rendered.
+    """
+
+    text: str
+
+    @classmethod
+    def component(
+        cls,
+        ids: Iterable[Id],
+        attributes: str,
+        edge_op: EdgeOp = EdgeOp.DIRECTED,
+        compact: bool = False,
+    ) -> "RenderedStatement":
+        """
+        Return the rendered node or edge statement with the given IDs and
+        rendered attributes, as Component would render it. Compact statements
+        leave out quotes and spaces that aren't needed.
+        """
+        if compact:
+            identifier = str(edge_op).strip().join(render_id(identifier, compact=True) for identifier in ids)
+            return cls(f"{identifier}[{attributes}];" if attributes else f"{identifier};")
+        identifier = str(edge_op).join(render_id(identifier) for identifier in ids)
+        return cls(f"{identifier} [{attributes}];" if attributes else f"{identifier};")
+
+    @property
+    def block(self) -> Block:
+        return Block(self.text)
+
+
+@dataclass
+class StatementStream:
+    """
+    Represent DOT statements that are produced only as they are written, so
+    that they never all have to be in memory at once.
+    """
+
+    statements: Callable[[], Iterable[Statement]]
+
+    @property
+    def block(self) -> Block:
+        return Block.of(subblock for statement in self.statements() for subblock in statement.block)
+
+
 class Node(Component):
     """
     Represent a DOT node.
@@ -191,14 +314,20 @@ class Graph:
         else:
             begin = f'{self.graph_type} "{self.identifier}"' + " {"
 
-        subblocks = [subblock for statement in self.statements if statement for subblock in statement.block]
+        subblocks = (subblock for statement in self.statements if statement for subblock in statement.block)
 
         end = "}"
 
-        return Block(begin, Block(*subblocks), end)
+        return Block(begin, Block.of(subblocks), end)
+
+    def lines(self, indent: bool = True) -> Iterable[str]:
+        return self.block.lines(level=0, indent=indent)
+
+    def render(self, indent: bool = True) -> str:
+        return "".join(self.lines(indent))
 
     def __str__(self) -> str:
-        return "".join(self.block.lines(level=0))
+        return self.render()
 
 
 class StrictGraph(Graph):
@@ -215,3 +344,156 @@ class StrictDigraph(Graph):
 
 class Subgraph(Graph):
     graph_type = "subgraph"
+
+
+def short_ids() -> Iterator[str]:
+    """
+    Yield the shortest IDs that need no quotes, in order of length.
+    """
+    for number in count():
+        number, first = divmod(number, len(SHORT_ID_START))
+        identifier = SHORT_ID_START[first]
+        while number:
+            number, digit = divmod(number - 1, len(SHORT_ID_REST))
+            identifier += SHORT_ID_REST[digit]
+        if identifier.lower() not in KEYWORDS:
+            yield identifier
+
+
+def factor_defaults(attributes: list[dict[str, Id]], inherited: Mapping[str, Id]) -> dict[str, Id]:
+    """
+    Return the most common value of each attribute that is worth declaring as
+    a default for the given attribute lists, removing it from each list that
+    has it. Lists without the attribute are given the inherited value instead,
+    so attributes with no inherited value are only factored if every list has
+    them.
+    """
+    values = Counter(item for attribute_list in attributes for item in attribute_list.items())
+    keys = Counter(key for attribute_list in attributes for key in attribute_list)
+
+    defaults: dict[str, Id] = {}
+    for (key, value), uses in values.most_common():
+        missing = len(attributes) - keys[key]
+        if key in defaults or (missing and key not in inherited) or uses <= missing + 1:
+            continue
+        defaults[key] = value
+
+    for attribute_list in attributes:
+        for key, value in defaults.items():
+            if key not in attribute_list:
+                attribute_list[key] = inherited[key]
+            elif attribute_list[key] == value:
+                del attribute_list[key]
+
+    return defaults
+
+
+@dataclass
+class DotMinimizer:
+    """
+    Render the nodes and edges of each graph as compactly as possible without
+    changing the layout. Nodes are given short IDs, keeping their original IDs
+    as their labels, and the most common attributes of the nodes and edges
+    created in each graph are declared once as that graph's defaults.
+
+    Graphs must be rendered in the order they appear in the output, since
+    defaults only apply to nodes created after them.
+    """
+
+    ids: dict[Id, Id] = field(default_factory=dict)
+    unused: Iterator[str] = field(default_factory=short_ids)
+    attributes: AttributeStrings = field(default_factory=lambda: AttributeStrings(compact=True))
+
+    # Original IDs of the nodes created so far
+    created: set[Id] = field(default_factory=set)
+
+    def identifier(self, identifier: Id) -> Id:
+        if isinstance(identifier, str) and HTML_STRING.match(identifier):
+            return identifier
+        short = self.ids.get(identifier)
+        if short is None:
+            short = self.ids[identifier] = next(self.unused)
+        return short
+
+    def component(self, ids: Iterable[Id], attributes: Mapping[str, Id]) -> RenderedStatement:
+        return RenderedStatement.component(map(self.identifier, ids), self.attributes(attributes), compact=True)
+
+    def graph(
+        self,
+        nodes: Iterable[tuple[Id, Mapping[str, Id]]],
+        edges: Iterable[tuple[tuple[Id, Id], Mapping[str, Id]]],
+        node_defaults: Mapping[str, Id],
+        edge_defaults: Mapping[str, Id],
+    ) -> list[RenderedStatement]:
+        """
+        Return the statements of a graph with the given nodes, followed by the
+        given edges, and the node and edge defaults in effect in the graph.
+        Nodes that the edges create are declared before the edges are.
+        """
+
+        edge_list = [(ids, dict(attributes)) for ids, attributes in edges]
+
+        # Nodes that already exist don't take on the defaults of this graph
+        created: list[dict[str, Id]] = []
+        statements: list[tuple[Id, dict[str, Id]]] = []
+        for identifier, attributes in nodes:
+            if identifier in self.created:
+                statements.append((identifier, dict(attributes)))
+            else:
+                created.append(self.create(identifier, attributes, node_defaults))
+                statements.append((identifier, created[-1]))
+        for ids, _ in edge_list:
+            for identifier in ids:
+                if identifier not in self.created:
+                    created.append(self.create(identifier, {}, node_defaults))
+                    statements.append((identifier, created[-1]))
+
+        for (tail, head), attributes in edge_list:
+            attributes.update(self.edge_names(tail, head, attributes, edge_defaults))
+
+        factored_nodes = factor_defaults(created, node_defaults)
+        factored_edges = factor_defaults([attributes for _, attributes in edge_list], edge_defaults)
+
+        return [
+            *([RenderedStatement(f"node[{self.attributes(factored_nodes)}];")] if factored_nodes else []),
+            *([RenderedStatement(f"edge[{self.attributes(factored_edges)}];")] if factored_edges else []),
+            *(self.component([identifier], attributes) for identifier, attributes in statements),
+            *(self.component(ids, attributes) for ids, attributes in edge_list),
+        ]
+
+    def create(self, identifier: Id, attributes: Mapping[str, Id], defaults: Mapping[str, Id]) -> dict[str, Id]:
+        self.created.add(identifier)
+        return self.node_names(identifier, dict(attributes), defaults)
+
+    def node_names(self, identifier: Id, attributes: dict[str, Id], defaults: Mapping[str, Id]) -> dict[str, Id]:
+        """
+        Return the attributes of a new node, with the node's original ID put in
+        place of every reference to its name, including the default label.
+        """
+        if self.identifier(identifier) == identifier:
+            return attributes
+        name = str(identifier)
+        effective = {"label": "\\N", **defaults, **attributes}
+        return {
+            **attributes,
+            **{
+                key: value.replace("\\N", name)
+                for key, value in effective.items()
+                if isinstance(value, str) and "\\N" in value
+            },
+        }
+
+    def edge_names(self, tail: Id, head: Id, attributes: dict[str, Id], defaults: Mapping[str, Id]) -> dict[str, Id]:
+        """
+        Return the attributes of an edge that refer to the names of its nodes,
+        with the nodes' original IDs put in place of the references.
+        """
+        names = {"\\T": str(tail), "\\H": str(head), "\\E": f"{tail}->{head}"}
+        effective = {**defaults, **attributes}
+        expanded: dict[str, Id] = {}
+        for key, value in effective.items():
+            if isinstance(value, str) and any(escape in value for escape in names):
+                for escape, name in names.items():
+                    value = value.replace(escape, name)
+                expanded[key] = value
+        return expanded
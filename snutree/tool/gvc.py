@@ -0,0 +1,147 @@
+import ctypes
+import threading
+from collections.abc import Iterable, Iterator
+from contextlib import ExitStack, contextmanager
+from ctypes.util import find_library
+from dataclasses import dataclass, field
+from functools import cache
+from pathlib import Path
+
+
+class GvcError(RuntimeError):
+    pass
+
+
+Length = type[ctypes.c_uint] | type[ctypes.c_size_t]
+
+
+def length_type(version: str) -> Length:
+    """
+    Return the type of the length gvRenderData writes for the given version of
+    Graphviz, which changed from unsigned int to size_t in Graphviz 3.0.
+    """
+    major, _, _ = version.partition(".")
+    return ctypes.c_uint if major.isdigit() and int(major) < 3 else ctypes.c_size_t
+
+
+@dataclass
+class Gvc:
+    """
+    Lay out and render graphs in this process through the Graphviz C library,
+    reusing one Graphviz context for every graph.
+
+    Graphviz keeps global state, so only one graph is handled at a time.
+    """
+
+    gvc: ctypes.CDLL
+    cgraph: ctypes.CDLL
+    context: ctypes.c_void_p
+    length: Length
+    lock: threading.Lock = field(default_factory=threading.Lock)
+
+    @classmethod
+    def open(cls, gvc: ctypes.CDLL, cgraph: ctypes.CDLL) -> "Gvc":
+        cgraph.agmemread.argtypes = [ctypes.c_char_p]
+        cgraph.agmemread.restype = ctypes.c_void_p
+        cgraph.agclose.argtypes = [ctypes.c_void_p]
+        cgraph.agclose.restype = ctypes.c_int
+        cgraph.aglasterr.argtypes = []
+        cgraph.aglasterr.restype = ctypes.c_char_p
+
+        gvc.gvContext.argtypes = []
+        gvc.gvContext.restype = ctypes.c_void_p
+        gvc.gvLayout.argtypes = [ctypes.c_void_p, ctypes.c_void_p, ctypes.c_char_p]
+        gvc.gvLayout.restype = ctypes.c_int
+        gvc.gvFreeLayout.argtypes = [ctypes.c_void_p, ctypes.c_void_p]
+        gvc.gvFreeLayout.restype = ctypes.c_int
+        gvc.gvcVersion.argtypes = [ctypes.c_void_p]
+        gvc.gvcVersion.restype = ctypes.c_char_p
+        gvc.gvFreeRenderData.argtypes = [ctypes.POINTER(ctypes.c_char)]  # type: ignore[misc]
+        gvc.gvFreeRenderData.restype = None
+        gvc.gvRenderFilename.argtypes = [ctypes.c_void_p, ctypes.c_void_p, ctypes.c_char_p, ctypes.c_char_p]
+        gvc.gvRenderFilename.restype = ctypes.c_int
+
+        context = ctypes.c_void_p(gvc.gvContext())  # type: ignore[misc]
+        if not context:
+            raise GvcError("failed to create Graphviz context")
+        version: bytes | None = gvc.gvcVersion(context)
+        length = length_type(version.decode() if version else "")
+        gvc.gvRenderData.argtypes = [
+            ctypes.c_void_p,
+            ctypes.c_void_p,
+            ctypes.c_char_p,
+            ctypes.POINTER(ctypes.POINTER(ctypes.c_char)),  # type: ignore[misc]
+            ctypes.POINTER(length),  # type: ignore[misc]
+        ]
+        gvc.gvRenderData.restype = ctypes.c_int
+        return cls(gvc, cgraph, context, length)
+
+    def check(self, status: int, action: str) -> None:
+        if status != 0:
+            raise GvcError(f"failed to {action}: {self.last_error()}")
+
+    def last_error(self) -> str:
+        message: bytes | None = self.cgraph.aglasterr()
+        return message.decode("utf-8", errors="replace").strip() if message else "unknown error"
+
+    @contextmanager
+    def layout(self, dot: bytes, engine: str = "dot") -> Iterator[ctypes.c_void_p]:
+        """
+        Read the DOT into a graph and lay it out, freeing both on exit.
+        """
+        with self.lock, ExitStack() as stack:
+            graph = ctypes.c_void_p(self.cgraph.agmemread(dot))  # type: ignore[misc]
+            if not graph:
+                raise GvcError(f"failed to read dot file: {self.last_error()}")
+            stack.callback(self.cgraph.agclose, graph)
+            self.check(self.gvc.gvLayout(self.context, graph, engine.encode()), "lay out graph")  # type: ignore[misc]
+            stack.callback(self.gvc.gvFreeLayout, self.context, graph)
+            yield graph
+
+    def render(self, dot: bytes, output_format: str) -> bytes:
+        with self.layout(dot) as graph:
+            return self.render_data(graph, output_format)
+
+    def render_data(self, graph: ctypes.c_void_p, output_format: str) -> bytes:
+        data = ctypes.POINTER(ctypes.c_char)()
+        length = self.length()
+        status: int = self.gvc.gvRenderData(
+            self.context,
+            graph,
+            output_format.encode(),
+            ctypes.byref(data),
+            ctypes.byref(length),
+        )
+        self.check(status, f"render graph to {output_format}")
+        with ExitStack() as stack:
+            stack.callback(self.gvc.gvFreeRenderData, data)
+            return ctypes.string_at(data, length.value)
+
+    def render_files(self, dot: bytes, paths: Iterable[tuple[str, Path]]) -> None:
+        """
+        Lay out the graph once and render the layout to each of the given files
+        in the format given with it.
+        """
+        with self.layout(dot) as graph:
+            for output_format, path in paths:
+                status: int = self.gvc.gvRenderFilename(
+                    self.context,
+                    graph,
+                    output_format.encode(),
+                    str(path).encode(),
+                )
+                self.check(status, f"render graph to {path}")
+
+
+@cache  # type: ignore[misc]
+def load_gvc() -> Gvc | None:
+    """
+    Return the Graphviz C library, loaded once, or None if it isn't installed.
+    """
+    gvc_name, cgraph_name = find_library("gvc"), find_library("cgraph")
+    if gvc_name is None or cgraph_name is None:
+        return None
+    try:
+        return Gvc.open(ctypes.CDLL(gvc_name), ctypes.CDLL(cgraph_name))
+    except (OSError, AttributeError, GvcError):
+        return None
@@ -0,0 +1,230 @@
+import os
+import re
+from collections import deque
+from collections.abc import Iterator
+from contextlib import contextmanager
+from dataclasses import dataclass, field
+from itertools import chain
+from pathlib import Path
+
+TOKEN = re.compile(
+    r"""
+    (?P<space>\s+|//[^\n]*|/\*.*?\*/|^\#[^\n]*)
+    |(?P<quoted>"(?:[^"\\]|\\.)*")
+    |(?P<edge_op>->|--)
+    |(?P<punctuation>[{}\[\];,=:])
+    |(?P<html><)
+    |(?P<id>-?(?:\.[0-9]+|[0-9]+(?:\.[0-9]*)?)|[^\s{}\[\];,=:"<>-]+)
+    """,
+    re.VERBOSE | re.DOTALL | re.MULTILINE,
+)
+
+HTML_BRACKET = re.compile(r"[<>]")
+
+KEYWORDS = {"node", "edge", "graph", "digraph", "subgraph", "strict"}
+
+# Points between a new node and the positioned neighbors it is placed next to
+# before the layout moves it
+NEW_NODE_OFFSET = 72.0
+
+
+def tokens(text: str) -> Iterator[tuple[str, str]]:
+    """
+    Yield the kind and value of each token of the DOT text, with quoted
+    strings unquoted. HTML strings are kept as they are, as IDs.
+    """
+    position = 0
+    while position < len(text):
+        match = TOKEN.match(text, position)
+        if match is None:
+            raise ValueError(f"unexpected character in DOT at {position}: {text[position]!r}")
+        kind = match.lastgroup
+        if kind == "html":
+            depth = 0
+            for bracket in HTML_BRACKET.finditer(text, position):
+                depth += 1 if bracket.group() == "<" else -1
+                if depth == 0:
+                    yield "id", text[position : bracket.end()]
+                    position = bracket.end()
+                    break
+            else:
+                raise ValueError(f"unterminated HTML string in DOT at {position}")
+            continue
+        position = match.end()
+        if kind == "quoted":
+            yield kind, match.group()[1:-1].replace("\\\n", "").replace('\\"', '"')
+        elif kind is not None and kind != "space":
+            yield kind, match.group()
+
+
+@dataclass
+class DotContents:
+    """
+    The nodes and edges of a DOT graph, regardless of the subgraphs they are in.
+    """
+
+    # Attributes given to each node, in the order the nodes were created
+    nodes: dict[str, dict[str, str]] = field(default_factory=dict)
+    edges: list[tuple[str, str]] = field(default_factory=list)
+
+    @classmethod
+    def read(cls, text: str) -> "DotContents":
+        contents = cls()
+        statement: list[tuple[str, str]] = []
+        for kind, value in chain(tokens(text), [("punctuation", ";")]):
+            if kind == "punctuation" and value in ";{}":
+                contents.add(statement)
+                statement = []
+            else:
+                statement.append((kind, value))
+        return contents
+
+    def add(self, statement: list[tuple[str, str]]) -> None:
+        if not statement or statement[0][0] == "id" and statement[0][1].lower() in KEYWORDS:
+            return
+
+        ids: list[tuple[str, str]] = []
+        attributes: dict[str, str] = {}
+        for i, (kind, value) in enumerate(statement):
+            if (kind, value) == ("punctuation", "["):
+                attributes = self.attributes(statement[i:])
+                break
+            ids.append((kind, value))
+
+        if ("punctuation", "=") in ids:
+            # A graph attribute
+            return
+
+        # Ports (e.g., a:n) are left out
+        endpoints: list[str] = []
+        for i, (kind, value) in enumerate(ids):
+            if kind in ("id", "quoted") and (i == 0 or ids[i - 1][0] == "edge_op"):
+                endpoints.append(value)
+
+        for endpoint in endpoints:
+            self.nodes.setdefault(endpoint, {})
+        if len(endpoints) == 1:
+            self.nodes[endpoints[0]].update(attributes)
+        else:
+            self.edges.extend(zip(endpoints, endpoints[1:]))
+
+    def attributes(self, statement: list[tuple[str, str]]) -> dict[str, str]:
+        attributes: dict[str, str] = {}
+        for i in range(1, len(statement) - 1):
+            if statement[i] == ("punctuation", "="):
+                attributes[statement[i - 1][1]] = statement[i + 1][1]
+        return attributes
+
+    def positions(self) -> dict[str, tuple[float, float]]:
+        positions: dict[str, tuple[float, float]] = {}
+        for name, attributes in self.nodes.items():
+            if "pos" in attributes:
+                x, y, *_ = attributes["pos"].rstrip("!").split(",")
+                positions[name] = (float(x), float(y))
+        return positions
+
+
+def quote(name: str) -> str:
+    return '"' + name.replace('"', '\\"') + '"'
+
+
+@dataclass
+class IncrementalLayout:
+    """
+    Lay out graphs starting from the layout of the previous graph, saved by
+    Graphviz in DOT format.
+
+    Nodes that were in the previous graph are pinned to their old positions.
+    If there are no new nodes, the old positions are used as they are, and
+    only edges are routed again. If there are only a few new nodes, they are
+    placed next to their neighbors and then moved by neato around the pinned
+    nodes. Otherwise, the whole graph is laid out again by dot.
+    """
+
+    path: Path
+
+    # Fraction of nodes that may be new for the layout to be incremental
+    threshold: float = 0.1
+
+    def prepare(self, dot: bytes) -> tuple[list[str], bytes]:
+        """
+        Return the Graphviz arguments to lay out the DOT with, along with the
+        DOT itself, which has the positions of its nodes added to it.
+        """
+        if not self.path.exists():
+            return [], dot
+
+        text = dot.decode("utf-8")
+        current = DotContents.read(text)
+        positions = DotContents.read(self.path.read_text(encoding="utf-8")).positions()
+
+        new = [name for name in current.nodes if name not in positions]
+        if len(new) > self.threshold * len(current.nodes):
+            return [], dot
+
+        pins = [f'{quote(name)} [pos="{x},{y}!"];' for name, (x, y) in positions.items() if name in current.nodes]
+        guesses = [f'{quote(name)} [pos="{x},{y}"];' for name, (x, y) in self.guess(new, current, positions).items()]
+
+        # Set the positions of nodes that already exist at the end of the root graph
+        body, end = text.rstrip().rsplit("}", 1)
+        if end:
+            raise ValueError("DOT must end with the root graph")
+        pinned = "\n".join([body.rstrip(), *pins, *guesses, "}\n"]).encode("utf-8")
+
+        if new:
+            return ["-Kneato", "-Ginputscale=72", "-Gnotranslate=true"], pinned
+        else:
+            return ["-Kneato", "-n2", "-Gnotranslate=true"], pinned
+
+    def guess(
+        self,
+        new: list[str],
+        current: DotContents,
+        positions: dict[str, tuple[float, float]],
+    ) -> dict[str, tuple[float, float]]:
+        """
+        Return starting positions for new nodes next to their neighbors, going
+        outward from the nodes that already have positions. New nodes with no
+        path to a positioned node are left for the layout to place.
+        """
+        neighbors: dict[str, list[str]] = {}
+        for tail, head in current.edges:
+            neighbors.setdefault(tail, []).append(head)
+            neighbors.setdefault(head, []).append(tail)
+
+        guesses: dict[str, tuple[float, float]] = {}
+        queue = deque(new)
+        waiting = set(new)
+        while queue:
+            name = queue.popleft()
+            if name in guesses:
+                continue
+            placed = [
+                positions.get(neighbor) or guesses[neighbor]
+                for neighbor in neighbors.get(name, [])
+                if neighbor in positions or neighbor in guesses
+            ]
+            if not placed:
+                continue
+            waiting.discard(name)
+            x = sum(x for x, _ in placed) / len(placed)
+            y = sum(y for _, y in placed) / len(placed)
+            # Spread out new nodes placed next to the same neighbors
+            guesses[name] = (x + len(guesses) % 8 * NEW_NODE_OFFSET / 8, y - NEW_NODE_OFFSET)
+            queue.extend(neighbor for neighbor in neighbors.get(name, []) if neighbor in waiting)
+
+        return guesses
+
+    @contextmanager
+    def saving(self) -> Iterator[Path]:
+        """
+        Yield a path for Graphviz to save the new layout to, which replaces the
+        previous layout once the block exits without an error.
+        """
+        temporary = self.path.with_name(f".{self.path.name}.new")
+        try:
+            yield temporary
+        except BaseException:
+            temporary.unlink(missing_ok=True)
+            raise
+        os.replace(temporary, self.path)
@@ -0,0 +1,170 @@
+from collections.abc import Hashable, Mapping, Sequence
+from dataclasses import dataclass, field
+from typing import Generic, TypeVar
+
+K = TypeVar("K", bound=Hashable)
+
+
+@dataclass
+class Contour:
+    """
+    The outline of a subtree: the leftmost and rightmost points it covers at
+    each level. Points are stored less the offset, so that the whole outline
+    can be moved at once.
+    """
+
+    left: dict[int, float] = field(default_factory=dict)
+    right: dict[int, float] = field(default_factory=dict)
+    offset: float = 0.0
+
+    def __len__(self) -> int:
+        return len(self.left)
+
+    def add(self, level: int, left: float, right: float) -> None:
+        left, right = left - self.offset, right - self.offset
+        self.left[level] = min(self.left.get(level, left), left)
+        self.right[level] = max(self.right.get(level, right), right)
+
+    def gap(self, other: "Contour", separation: float) -> float:
+        """
+        Return how far the other contour must be moved right to be at least the
+        separation away from this one on every level they share.
+        """
+        smaller, larger = (self, other) if len(self) <= len(other) else (other, self)
+        shift = float("-inf")
+        for level in smaller.left:
+            if level in larger.left:
+                shift = max(shift, self.right[level] + self.offset - other.left[level] - other.offset + separation)
+        return shift
+
+    def merge(self, other: "Contour", shift: float) -> "Contour":
+        """
+        Return the outline of this contour together with the other contour
+        moved right by the shift, reusing the larger of the two.
+        """
+        if len(other) <= len(self):
+            delta = other.offset + shift - self.offset
+            for level, right in other.right.items():
+                self.right[level] = right + delta
+                self.left.setdefault(level, other.left[level] + delta)
+            return self
+
+        other.offset += shift
+        delta = self.offset - other.offset
+        for level, left in self.left.items():
+            other.left[level] = left + delta
+            other.right.setdefault(level, self.right[level] + delta)
+        return other
+
+
+@dataclass
+class TidyLayout(Generic[K]):
+    """
+    Lay out a forest in layers, each node centered over its children, with
+    subtrees pushed together as closely as the separation allows.
+
+    This is the layout of Reingold and Tilford, except that each node is on
+    the level it is given instead of the level below its parent, and that
+    the outlines of subtrees are merged smaller into larger. It takes time
+    O(n log n) in the number of nodes, plus the levels skipped by edges.
+    """
+
+    # The level of each node, normally greater than the level of its parent
+    levels: Mapping[K, int]
+
+    # The extent of each node along its level
+    widths: Mapping[K, float]
+
+    # The children of each node, from left to right
+    children: Mapping[K, Sequence[K]]
+
+    # Space between neighboring nodes on the same level
+    separation: float = 18.0
+
+    def positions(self, roots: Sequence[K]) -> dict[K, float]:
+        """
+        Return the position of the center of each node along its level, with
+        the forest's leftmost point at 0.
+        """
+        relative: dict[K, float] = {}
+        contour, offsets = self.place(roots, relative)
+
+        positions: dict[K, float] = {}
+        left = min((value + contour.offset for value in contour.left.values()), default=0.0)
+        stack = [(root, offsets[root] - left) for root in reversed(roots)]
+        while stack:
+            key, position = stack.pop()
+            positions[key] = position
+            stack.extend((child, position + relative[child]) for child in reversed(self.children.get(key, [])))
+        return positions
+
+    def place(self, roots: Sequence[K], relative: dict[K, float]) -> tuple[Contour, dict[K, float]]:
+        """
+        Place every subtree, children before parents, without recursion.
+        Record the position of each node relative to its parent, and return
+        the contour of the forest along with the positions of its roots.
+        """
+        contours: dict[K, Contour] = {}
+        stack: list[tuple[K, bool]] = [(root, False) for root in reversed(roots)]
+        while stack:
+            key, visited = stack.pop()
+            children = self.children.get(key, [])
+            if not visited:
+                stack.append((key, True))
+                stack.extend((child, False) for child in reversed(children))
+                continue
+
+            contours[key] = self.center(key, children, contours, relative)
+
+            # Children that aren't below the node can't be centered under it,
+            # so their subtrees are put beside it instead, to its right
+            level = self.levels[key]
+            beside = [child for child in children if self.levels[child] <= level]
+            if beside:
+                contours[key], offsets = self.join([key, *beside], contours)
+                for child in beside:
+                    relative[child] = offsets[child]
+
+        return self.join(roots, contours)
+
+    def center(
+        self,
+        key: K,
+        children: Sequence[K],
+        contours: dict[K, Contour],
+        relative: dict[K, float],
+    ) -> Contour:
+        """
+        Center the node over the subtrees of its children on later levels, and
+        return the contour of them all.
+        """
+        # Keep other nodes off the edges to children more than one level down
+        level = self.levels[key]
+        below = [child for child in children if self.levels[child] > level]
+        for child in below:
+            for between in range(level + 1, self.levels[child]):
+                contours[child].add(between, 0.0, 0.0)
+
+        contour, offsets = self.join(below, contours)
+        center = (offsets[below[0]] + offsets[below[-1]]) / 2 if below else 0.0
+        for child in below:
+            relative[child] = offsets[child] - center
+        contour.offset -= center
+        half = self.widths[key] / 2
+        contour.add(level, -half, half)
+        return contour
+
+    def join(self, keys: Sequence[K], contours: dict[K, Contour]) -> tuple[Contour, dict[K, float]]:
+        """
+        Put the subtrees of the given nodes side by side, from left to right,
+        and return their joint contour and where each one's root ended up.
+        """
+        joint = Contour()
+        offsets: dict[K, float] = {}
+        previous = 0.0
+        for key in keys:
+            contour = contours.pop(key)
+            shift = max(joint.gap(contour, self.separation), previous) if offsets else 0.0
+            joint = joint.merge(contour, shift)
+            offsets[key] = previous = shift
+        return joint, offsets
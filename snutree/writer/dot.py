@@ -1,7 +1,16 @@
-from collections.abc import Callable, Mapping, Sequence, Set
+from collections.abc import (
+    Callable,
+    Iterable,
+    Iterator,
+    Mapping,
+    Sequence,
+    Set,
+)
 from dataclasses import dataclass, field
+from functools import cached_property
+from io import BytesIO
 from operator import index
-from typing import Generic, TypeVar
+from typing import IO, Generic, TypeVar
 
 from snutree.model.entity import Entity, EntityId, UnknownEntity
 from snutree.model.rank import AnyRank
@@ -9,11 +18,16 @@ from snutree.model.semester import Semester
 from snutree.model.tree import FamilyTree
 from snutree.tool.dot import (
     Attribute,
+    AttributeStrings,
     Digraph,
+    DotMinimizer,
     Edge,
     Graph,
     Id,
     Node,
+    RenderedStatement,
+    Statement,
+    StatementStream,
     Subgraph,
 )
 
@@ -47,12 +61,17 @@ class DefaultEdgeAttributesConfig(DefaultAttributesConfig):
     unknown: dict[str, Id] = field(default_factory=dict)
 
 
+def no_attributes(_: object) -> dict[str, Id]:
+    return {}
+
+
 @dataclass
 class DynamicNodeAttributesConfig(Generic[AnyRank, MemberT]):
-    rank: Callable[[AnyRank], dict[str, Id]] = lambda _: {}
-    entity: Callable[[Entity[AnyRank, MemberT]], dict[str, Id]] = lambda _: {}
-    member: Callable[[MemberT], dict[str, Id]] = lambda _: {}
-    family: Callable[[str], dict[str, Id]] = lambda _: {}
+    # Named functions rather than lambdas, so that configs can be pickled
+    rank: Callable[[AnyRank], dict[str, Id]] = no_attributes
+    entity: Callable[[Entity[AnyRank, MemberT]], dict[str, Id]] = no_attributes
+    member: Callable[[MemberT], dict[str, Id]] = no_attributes
+    family: Callable[[str], dict[str, Id]] = no_attributes
     by_key: dict[str, dict[str, Id]] = field(default_factory=dict)
 
 
@@ -84,19 +103,88 @@ class EdgesConfig:
 @dataclass
 class DotWriterConfig(Generic[AnyRank, MemberT]):
     draw_ranks: bool = True
+
+    # Write smaller DOT that Graphviz lays out the same way: nodes get short IDs
+    # (keeping their keys as labels), the most common attributes in each graph
+    # become its defaults, and nothing is indented or quoted needlessly
+    minimize: bool = False
+
     graph: GraphsConfig = field(default_factory=GraphsConfig)
     node: NodesConfig[AnyRank, MemberT] = field(default_factory=NodesConfig)
     edge: EdgesConfig = field(default_factory=EdgesConfig)
 
 
+def edge_pairs(edges: Iterable[Edge]) -> Iterator[tuple[tuple[Id, Id], dict[str, Id]]]:
+    """
+    Yield each edge of each edge statement, splitting chains like a -> b -> c
+    into their separate edges.
+    """
+    for edge in edges:
+        for tail, head in zip(edge.ids, edge.ids[1:]):
+            yield (tail, head), edge.attributes
+
+
+@dataclass
+class DotRenderPlan:
+    """
+    The parts of the output that depend only on the writer's config, rendered
+    once and reused for every tree written.
+    """
+
+    # Default attribute statements of each graph
+    root: list[RenderedStatement]
+    rank: list[RenderedStatement]
+    entity: list[RenderedStatement]
+
+    attributes: AttributeStrings = field(default_factory=AttributeStrings)
+
+
 @dataclass
 class DotWriter(Generic[AnyRank, MemberT]):
     config: DotWriterConfig[AnyRank, MemberT] = field(default_factory=DotWriterConfig)
 
+    @cached_property
+    def plan(self) -> DotRenderPlan:
+        graph, node, edge = self.config.graph.defaults, self.config.node.defaults, self.config.edge.defaults
+        return DotRenderPlan(
+            root=self.render_defaults(graph.root, node.root, edge.root),
+            rank=self.render_defaults(graph.rank, node.rank, edge.rank),
+            entity=self.render_defaults(graph.entity, node.entity, edge.entity),
+        )
+
+    def render_defaults(
+        self,
+        graph: dict[str, Id],
+        node: dict[str, Id],
+        edge: dict[str, Id],
+    ) -> list[RenderedStatement]:
+        statements: list[Statement | None] = [
+            *self.write_graph_defaults(graph),
+            self.write_node_defaults(node),
+            self.write_edge_defaults(edge),
+        ]
+        return [
+            RenderedStatement(line)
+            for statement in statements
+            if statement is not None
+            for line in statement.block
+            if isinstance(line, str)
+        ]
+
     def write(self, tree: FamilyTree[AnyRank, MemberT]) -> bytes:
-        return str(self.write_family_tree(tree)).encode("utf-8")
+        output = BytesIO()
+        self.write_to(tree, output)
+        return output.getvalue()
+
+    def write_to(self, tree: FamilyTree[AnyRank, MemberT], output: IO[bytes]) -> None:
+        """
+        Write the tree to the output one line at a time.
+        """
+        graph = self.write_family_tree(tree)
+        output.writelines(line.encode("utf-8") for line in graph.lines(indent=not self.config.minimize))
 
     def write_family_tree(self, tree: FamilyTree[AnyRank, MemberT]) -> Graph:
+        minimizer = DotMinimizer() if self.config.minimize else None
         ranks: Sequence[AnyRank] | None
         cohorts: Mapping[AnyRank, Set[EntityId]] | None
         if self.config.draw_ranks:
@@ -106,15 +194,18 @@ class DotWriter(Generic[AnyRank, MemberT]):
             ranks = None
             cohorts = None
 
+        # Have Graphviz keep the edges out of each node in the order they are
+        # written, if that order has no crossings
+        ordered = tree.config.ordering == "tree" and "ordering" not in self.config.graph.defaults.root
+
         return Digraph(
             self.config.graph.names.root,
-            *self.write_graph_defaults(self.config.graph.defaults.root),
-            self.write_node_defaults(self.config.node.defaults.root),
-            self.write_edge_defaults(self.config.edge.defaults.root),
-            self.write_ranks(self.config.graph.names.ranks_left, ranks, "L"),
-            self.write_entities(self.config.graph.names.entities, tree),
-            self.write_ranks(self.config.graph.names.ranks_right, ranks, "R"),
-            self.write_cohorts(cohorts),
+            *self.plan.root,
+            Attribute(ordering="out") if ordered else None,
+            self.write_ranks(self.config.graph.names.ranks_left, ranks, "L", minimizer),
+            self.write_entities(self.config.graph.names.entities, tree, minimizer),
+            self.write_ranks(self.config.graph.names.ranks_right, ranks, "R", minimizer),
+            self.write_cohorts(cohorts, minimizer),
         )
 
     def write_graph_defaults(self, attributes: dict[str, Id]) -> list[Attribute]:
@@ -126,15 +217,44 @@ class DotWriter(Generic[AnyRank, MemberT]):
     def write_edge_defaults(self, attributes: dict[str, Id]) -> Edge | None:
         return None if not attributes else Edge(**attributes)
 
-    def write_ranks(self, graph_id: str, ranks: Sequence[AnyRank] | None, suffix: str) -> Subgraph | None:
+    def write_components(
+        self,
+        nodes: Iterable[Node],
+        edges: Iterable[Edge],
+        node_defaults: Mapping[str, Id],
+        edge_defaults: Mapping[str, Id],
+        minimizer: DotMinimizer | None,
+    ) -> list[Statement]:
+        if minimizer is None:
+            return [*nodes, *edges]
+        return [
+            *minimizer.graph(
+                ((node.ids[0], node.attributes) for node in nodes),
+                edge_pairs(edges),
+                node_defaults,
+                edge_defaults,
+            )
+        ]
+
+    def write_ranks(
+        self,
+        graph_id: str,
+        ranks: Sequence[AnyRank] | None,
+        suffix: str,
+        minimizer: DotMinimizer | None = None,
+    ) -> Subgraph | None:
+        node, edge = self.config.node.defaults, self.config.edge.defaults
         return (
             Subgraph(
                 graph_id,
-                *self.write_graph_defaults(self.config.graph.defaults.rank),
-                self.write_node_defaults(self.config.node.defaults.rank),
-                self.write_edge_defaults(self.config.edge.defaults.rank),
-                *self.write_rank_nodes(graph_id, ranks, suffix),
-                *self.write_rank_edges(graph_id, ranks, suffix),
+                *self.plan.rank,
+                *self.write_components(
+                    self.write_rank_nodes(graph_id, ranks, suffix),
+                    self.write_rank_edges(graph_id, ranks, suffix),
+                    {**node.root, **node.rank},
+                    {**edge.root, **edge.rank},
+                    minimizer,
+                ),
             )
             if ranks is not None
             else None
@@ -170,52 +290,100 @@ class DotWriter(Generic[AnyRank, MemberT]):
             infix = str(index(rank))
         return f"{infix}{suffix}"
 
-    def write_entities(self, graph_id: str, tree: FamilyTree[AnyRank, MemberT]) -> Subgraph:
-        return Subgraph(
-            graph_id,
-            *self.write_graph_defaults(self.config.graph.defaults.entity),
-            self.write_node_defaults(self.config.node.defaults.entity),
-            self.write_edge_defaults(self.config.edge.defaults.entity),
-            *self.write_nodes(tree),
-            *self.config.node.custom,
-            *self.write_edges(tree),
-            *self.config.edge.custom,
-        )
-
-    def write_nodes(self, tree: FamilyTree[AnyRank, MemberT]) -> list[Node]:
-        return [
-            Node(
-                entity.key,
-                **self.config.node.attributes.entity(entity),
-                **(self.config.node.defaults.unknown if isinstance(entity, UnknownEntity) else {}),
-                **(self.config.node.defaults.singleton if key in tree.singletons else {}),
-                **(self.config.node.attributes.family(tree.families[key]) if key in tree.families else {}),
-                **(self.config.node.attributes.member(entity.member) if entity.member is not None else {}),
-                **self.config.node.attributes.by_key.get(key, {}),
+    def write_entities(
+        self,
+        graph_id: str,
+        tree: FamilyTree[AnyRank, MemberT],
+        minimizer: DotMinimizer | None = None,
+    ) -> Subgraph:
+        statements: list[Statement]
+        if minimizer is None:
+
+            def stream() -> Iterator[Statement]:
+                yield from self.write_nodes(tree)
+                yield from self.config.node.custom
+                yield from self.write_edges(tree)
+                yield from self.config.edge.custom
+
+            statements = [StatementStream(stream)]
+        else:
+            node, edge = self.config.node.defaults, self.config.edge.defaults
+            statements = [
+                *minimizer.graph(
+                    [
+                        *self.node_attributes(tree),
+                        *((node.ids[0], node.attributes) for node in self.config.node.custom),
+                    ],
+                    [*self.edge_attributes(tree), *edge_pairs(self.config.edge.custom)],
+                    {**node.root, **node.entity},
+                    {**edge.root, **edge.entity},
+                )
+            ]
+        return Subgraph(graph_id, *self.plan.entity, *statements)
+
+    def node_attributes(self, tree: FamilyTree[AnyRank, MemberT]) -> Iterator[tuple[Id, dict[str, Id]]]:
+        defaults, dynamic = self.config.node.defaults, self.config.node.attributes
+        return (
+            (
+                key,
+                {
+                    **dynamic.entity(entity),
+                    **(defaults.unknown if isinstance(entity, UnknownEntity) else {}),
+                    **(defaults.singleton if key in tree.singletons else {}),
+                    **(dynamic.family(tree.families[key]) if key in tree.families else {}),
+                    **(dynamic.member(entity.member) if entity.member is not None else {}),
+                    **dynamic.by_key.get(key, {}),
+                },
             )
             for key, entity in tree.entities.items()
-        ]
+        )
 
-    def write_edges(self, tree: FamilyTree[AnyRank, MemberT]) -> list[Edge]:
-        return [
-            Edge(
-                parent_key,
-                child_key,
-                **(self.config.edge.defaults.unknown if isinstance(tree.entities[parent_key], UnknownEntity) else {}),
-                **self.config.edge.attributes.by_key.get((parent_key, child_key), {}),
+    def edge_attributes(self, tree: FamilyTree[AnyRank, MemberT]) -> Iterator[tuple[tuple[Id, Id], dict[str, Id]]]:
+        defaults, dynamic = self.config.edge.defaults, self.config.edge.attributes
+        return (
+            (
+                (parent_key, child_key),
+                {
+                    **(defaults.unknown if isinstance(tree.entities[parent_key], UnknownEntity) else {}),
+                    **dynamic.by_key.get((parent_key, child_key), {}),
+                },
             )
             for (parent_key, child_key) in tree.relationships
-        ]
+        )
 
-    def write_cohort(self, rank: AnyRank, cohort: Set[EntityId]) -> Subgraph:
+    def write_nodes(self, tree: FamilyTree[AnyRank, MemberT]) -> Iterator[RenderedStatement]:
+        return (
+            RenderedStatement.component([key], self.plan.attributes(attributes))
+            for key, attributes in self.node_attributes(tree)
+        )
+
+    def write_edges(self, tree: FamilyTree[AnyRank, MemberT]) -> Iterator[RenderedStatement]:
+        return (
+            RenderedStatement.component(ids, self.plan.attributes(attributes))
+            for ids, attributes in self.edge_attributes(tree)
+        )
+
+    def write_cohort(self, rank: AnyRank, cohort: Set[EntityId], minimizer: DotMinimizer | None = None) -> Subgraph:
         return Subgraph(
             Attribute(rank="same"),
-            Node(self.write_rank_identifier(self.config.graph.names.ranks_left, rank, "L")),
-            Node(self.write_rank_identifier(self.config.graph.names.ranks_right, rank, "R")),
-            *[Node(entity_id) for entity_id in sorted(cohort)],
+            *self.write_components(
+                [
+                    Node(self.write_rank_identifier(self.config.graph.names.ranks_left, rank, "L")),
+                    Node(self.write_rank_identifier(self.config.graph.names.ranks_right, rank, "R")),
+                    *[Node(entity_id) for entity_id in sorted(cohort)],
+                ],
+                [],
+                self.config.node.defaults.root,
+                self.config.edge.defaults.root,
+                minimizer,
+            ),
         )
 
-    def write_cohorts(self, cohorts: Mapping[AnyRank, Set[EntityId]] | None) -> Subgraph | None:
+    def write_cohorts(
+        self,
+        cohorts: Mapping[AnyRank, Set[EntityId]] | None,
+        minimizer: DotMinimizer | None = None,
+    ) -> Subgraph | None:
         return (
             Subgraph(
                 self.config.graph.names.ranks,
@@ -223,6 +391,7 @@ class DotWriter(Generic[AnyRank, MemberT]):
                     self.write_cohort(
                         rank=rank,
                         cohort=cohort,
+                        minimizer=minimizer,
                     )
                     for rank, cohort in cohorts.items()
                 ],
@@ -0,0 +1,324 @@
+import shutil
+import subprocess
+import threading
+import time
+from collections.abc import Callable, Mapping
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import ExitStack, suppress
+from dataclasses import dataclass, field
+from functools import partial
+from io import BytesIO
+from pathlib import Path
+from tempfile import SpooledTemporaryFile, TemporaryFile
+from typing import IO, Generic, Literal, TypeVar
+
+from snutree.model.rank import AnyRank
+from snutree.model.tree import FamilyTree
+from snutree.tool.gvc import Gvc, load_gvc
+from snutree.tool.layout import IncrementalLayout
+from snutree.writer.dot import DotWriter
+
+MemberT = TypeVar("MemberT")
+
+GraphvizFormat = Literal[
+    "pdf",
+    "svg",
+    "png",
+]
+
+
+class GraphvizError(RuntimeError):
+    pass
+
+
+class GraphvizTimeoutError(GraphvizError):
+    pass
+
+
+@dataclass
+class LayoutStrategy:
+    # The Graphviz layout engine
+    engine: str = "dot"
+
+    # Graph attributes that override the ones in the DOT
+    attributes: dict[str, str] = field(default_factory=dict)
+
+    @property
+    def arguments(self) -> list[str]:
+        return [f"-K{self.engine}", *(f"-G{name}={value}" for name, value in self.attributes.items())]
+
+
+# dot with fewer crossing minimization and network simplex iterations
+FAST_DOT = LayoutStrategy("dot", {"mclimit": "0.25", "nslimit": "2", "nslimit1": "2", "remincross": "false"})
+
+# Force-directed, in about O(n log n), with lines as edges
+SFDP = LayoutStrategy("sfdp", {"overlap": "prism", "splines": "line"})
+
+# Radial, in about O(n), with lines as edges
+TWOPI = LayoutStrategy("twopi", {"overlap": "true", "splines": "line"})
+
+
+@dataclass
+class LayoutTier:
+    # The most entities a tree may have for it to be laid out with this tier's
+    # strategies, or None for any number
+    max_entities: int | None
+
+    # Strategies to try in order, each cheaper than the one before it
+    strategies: list[LayoutStrategy]
+
+
+def default_tiers() -> list[LayoutTier]:
+    return [
+        LayoutTier(2_000, [LayoutStrategy(), FAST_DOT, SFDP]),
+        LayoutTier(20_000, [FAST_DOT, SFDP, TWOPI]),
+        LayoutTier(None, [SFDP, TWOPI]),
+    ]
+
+
+@dataclass
+class LayoutPolicy:
+    """
+    Choose how Graphviz lays out a tree by its size, and fall back to cheaper
+    strategies when a layout takes too long.
+    """
+
+    # Tiers in increasing order of size; the first tier the tree fits in is used
+    tiers: list[LayoutTier] = field(default_factory=default_tiers)
+
+    # Seconds that all attempts at a layout may take together, or None for no
+    # limit. Each attempt but the last may take a share of the time left, and
+    # is stopped once that runs out so that the next strategy can be tried.
+    budget: float | None = None
+    share: float = 0.5
+
+    def strategies(self, size: int) -> list[LayoutStrategy]:
+        for tier in self.tiers:
+            if tier.max_entities is None or size <= tier.max_entities:
+                return tier.strategies
+        return self.tiers[-1].strategies if self.tiers else [LayoutStrategy()]
+
+
+@dataclass
+class GraphvizWriterConfig:
+    # Lay out and render in this process through the Graphviz C library instead
+    # of running the Graphviz command, if the library can be loaded
+    in_process: bool = False
+
+    # Keep the layout of each run in this file, and start the next run's layout
+    # from it, so that only new nodes are placed and the rest stay where they
+    # were. Layouts are always done by the Graphviz command.
+    layout: Path | None = None
+
+    # Fraction of nodes that may be new for the layout to be incremental;
+    # beyond this, the whole tree is laid out again
+    incremental_threshold: float = 0.1
+
+    # Choose the layout engine by the size of the tree, within a time budget.
+    # Layouts are then always done by the Graphviz command, which can be
+    # stopped. Incremental layouts that keep old positions don't use it.
+    policy: LayoutPolicy | None = None
+
+
+def expire(process: "subprocess.Popen[bytes]", expired: threading.Event) -> None:
+    expired.set()
+    process.kill()
+
+
+def write_bytes(data: bytes, output: IO[bytes]) -> None:
+    output.write(data)
+
+
+def copy_output(source: IO[bytes] | None, output: IO[bytes] | None) -> None:
+    if source is not None and output is not None:
+        shutil.copyfileobj(source, output)
+
+
+@dataclass
+class GraphvizWriter(Generic[AnyRank, MemberT]):
+    """
+    Lay out trees with Graphviz and render them in one of its output formats.
+    """
+
+    dot_writer: DotWriter[AnyRank, MemberT]
+    output_format: GraphvizFormat = "pdf"
+
+    # The Graphviz command, to which the input and output arguments are added.
+    # It can be swapped out for a local stand-in.
+    command: list[str] = field(default_factory=lambda: ["dot"])
+
+    config: GraphvizWriterConfig = field(default_factory=GraphvizWriterConfig)
+
+    def __post_init__(self) -> None:
+        if self.config.layout is not None and self.dot_writer.config.minimize:
+            raise ValueError("incremental layouts need the node names of unminimized DOT")
+
+    def gvc(self) -> Gvc | None:
+        """
+        Return the Graphviz C library if it should be used and can be loaded.
+        """
+        if not self.config.in_process or self.config.layout is not None or self.config.policy is not None:
+            return None
+        return load_gvc()
+
+    def write(self, tree: FamilyTree[AnyRank, MemberT]) -> bytes:
+        output = BytesIO()
+        self.write_to(tree, output)
+        return output.getvalue()
+
+    def write_to(self, tree: FamilyTree[AnyRank, MemberT], output: IO[bytes]) -> None:
+        gvc = self.gvc()
+        if gvc is not None:
+            output.write(gvc.render(self.dot_writer.write(tree), self.output_format))
+        else:
+            self.lay_out(tree, ["-T", self.output_format], output)
+
+    def write_files(
+        self,
+        tree: FamilyTree[AnyRank, MemberT],
+        paths: Mapping[GraphvizFormat, Path],
+        dot_path: Path | None = None,
+    ) -> None:
+        """
+        Lay out the tree once and render the layout to a file in each of the
+        given formats. If the tree's DOT has already been written to a file,
+        Graphviz reads it from there instead of having it written again.
+        """
+        gvc = self.gvc()
+        if gvc is not None:
+            gvc.render_files(self.dot_writer.write(tree) if dot_path is None else dot_path.read_bytes(), paths.items())
+            return
+
+        arguments = [
+            argument for output_format, path in paths.items() for argument in ["-T", output_format, "-o", str(path)]
+        ]
+        self.lay_out(tree, arguments, None, dot_path)
+
+    def lay_out(
+        self,
+        tree: FamilyTree[AnyRank, MemberT],
+        arguments: list[str],
+        output: IO[bytes] | None,
+        dot_path: Path | None = None,
+    ) -> None:
+        """
+        Run Graphviz with the given output arguments on the tree's DOT, which
+        is read from the given file if it has already been written there.
+        """
+        size = len(tree.entities)
+        if self.config.layout is None:
+            if dot_path is None:
+                self.attempt(size, arguments, output, partial(self.dot_writer.write_to, tree))
+            else:
+                self.attempt(size, [*arguments, str(dot_path)], output, None)
+            return
+
+        layout = IncrementalLayout(self.config.layout, self.config.incremental_threshold)
+        layout_arguments, dot = layout.prepare(
+            self.dot_writer.write(tree) if dot_path is None else dot_path.read_bytes()
+        )
+        with layout.saving() as saved:
+            arguments = ["-T", "dot", "-o", str(saved), *arguments]
+            if layout_arguments:
+                self.run([*layout_arguments, *arguments], output, partial(write_bytes, dot))
+            else:
+                self.attempt(size, arguments, output, partial(write_bytes, dot))
+
+    def attempt(
+        self,
+        size: int,
+        arguments: list[str],
+        output: IO[bytes] | None,
+        source: Callable[[IO[bytes]], None] | None,
+    ) -> None:
+        """
+        Run Graphviz with each of the layout policy's strategies for a tree of
+        the given size until one finishes in time. Output is held back until
+        then, so that nothing of a stopped attempt is copied.
+        """
+        policy = self.config.policy
+        if policy is None:
+            self.run(arguments, output, source)
+            return
+
+        strategies = policy.strategies(size)
+        deadline = None if policy.budget is None else time.monotonic() + policy.budget
+        for i, strategy in enumerate(strategies):
+            last = i == len(strategies) - 1
+            timeout = None
+            if deadline is not None:
+                timeout = max(deadline - time.monotonic(), 0.0) * (1.0 if last else policy.share)
+            try:
+                self.run_held([*strategy.arguments, *arguments], output, source, timeout)
+            except GraphvizTimeoutError as error:
+                if last:
+                    raise GraphvizTimeoutError(f"no layout finished within {policy.budget:g} seconds") from error
+                continue
+            return
+
+    def run_held(
+        self,
+        arguments: list[str],
+        output: IO[bytes] | None,
+        source: Callable[[IO[bytes]], None] | None,
+        timeout: float | None,
+    ) -> None:
+        if output is None:
+            self.run(arguments, None, source, timeout)
+            return
+        with SpooledTemporaryFile(max_size=1 << 24) as held:
+            self.run(arguments, held, source, timeout)
+            held.seek(0)
+            shutil.copyfileobj(held, output)
+
+    def run(
+        self,
+        arguments: list[str],
+        output: IO[bytes] | None,
+        source: Callable[[IO[bytes]], None] | None,
+        timeout: float | None = None,
+    ) -> None:
+        """
+        Start Graphviz, then write its input into it from another thread while
+        copying the output of Graphviz, if any, as it is written. Neither the
+        input nor the output is ever held in memory as a whole. Graphviz is
+        killed if it runs longer than the timeout.
+        """
+        expired = threading.Event()
+        with TemporaryFile() as stderr:
+            with (
+                subprocess.Popen(
+                    [*self.command, *arguments],
+                    stdin=subprocess.PIPE if source is not None else subprocess.DEVNULL,
+                    stdout=subprocess.PIPE if output is not None else subprocess.DEVNULL,
+                    stderr=stderr,
+                ) as process,
+                ThreadPoolExecutor(max_workers=1, thread_name_prefix="snutree-dot") as executor,
+                ExitStack() as stack,
+            ):
+                if timeout is not None:
+                    timer = threading.Timer(timeout, expire, (process, expired))
+                    timer.start()
+                    stack.callback(timer.cancel)
+                feeding = executor.submit(self.feed, source, process.stdin) if source is not None else None
+                try:
+                    copy_output(process.stdout, output)
+                except BaseException:
+                    # Otherwise Graphviz could wait forever for its output to be read
+                    process.kill()
+                    raise
+                if feeding is not None:
+                    feeding.result()
+
+            if process.wait() != 0:
+                if expired.is_set():
+                    raise GraphvizTimeoutError(f"Graphviz took longer than {timeout:g} seconds")
+                stderr.seek(0)
+                message = stderr.read().decode("utf-8", errors="replace")
+                raise GraphvizError(f"failed to compile dot file: {message}")
+
+    def feed(self, source: Callable[[IO[bytes]], None], stdin: IO[bytes] | None) -> None:
+        assert stdin is not None
+        # If Graphviz exits early, its own error is reported instead
+        with suppress(BrokenPipeError), stdin:
+            source(stdin)
@@ -0,0 +1,431 @@
+import math
+import re
+from collections.abc import Iterator, Mapping, Sequence
+from dataclasses import dataclass, field
+from io import BytesIO
+from operator import index
+from typing import IO, Generic, TypeVar
+from xml.sax.saxutils import escape, quoteattr
+
+from snutree.model.entity import EntityId
+from snutree.model.rank import AnyRank
+from snutree.model.tree import FamilyTree
+from snutree.tool.dot import Id
+from snutree.tool.tidy import TidyLayout
+from snutree.writer.dot import DotWriter
+
+MemberT = TypeVar("MemberT")
+
+# Points per inch, the unit of sizes in DOT attributes
+POINTS = 72.0
+
+# Line breaks of DOT labels, which are centered, left-justified, and
+# right-justified, respectively
+LINE_BREAK = re.compile(r"\\[nlr]")
+HTML_TAG = re.compile(r"<[^>]*>")
+
+ELLIPSE_SHAPES = {"ellipse", "oval", "circle"}
+TEXT_SHAPES = {"plaintext", "plain", "none"}
+
+DASHES = {"dashed": "5,2", "dotted": "1,5"}
+
+
+@dataclass
+class TidyWriterConfig:
+    # Width of each character of a label, as a fraction of its font size, for
+    # sizing nodes to their labels without measuring any text
+    character_width: float = 0.6
+
+    # Space between a label and the border of its node, in points
+    label_margin: float = 8.0
+
+
+def number(value: Id | None, default: float) -> float:
+    try:
+        return float(value) if value is not None else default
+    except ValueError:
+        return default
+
+
+def styles(attributes: Mapping[str, Id]) -> set[str]:
+    return {style.strip() for style in str(attributes.get("style", "")).split(",")}
+
+
+@dataclass
+class SvgNode:
+    """
+    A node with its DOT attributes and its size in points, with the width
+    along the x-axis and the height along the y-axis.
+    """
+
+    attributes: Mapping[str, Id]
+    lines: list[str]
+    width: float
+    height: float
+
+
+@dataclass
+class Box:
+    x0: float
+    y0: float
+    x1: float
+    y1: float
+
+    @classmethod
+    def around(cls, nodes: Sequence[tuple[SvgNode, float, float]], pad: float) -> "Box":
+        """
+        Return the box around the nodes, each at its point, with the pad around
+        them.
+        """
+        return cls(
+            min((x - node.width / 2 for node, x, _ in nodes), default=0.0) - pad,
+            min((y - node.height / 2 for node, _, y in nodes), default=0.0) - pad,
+            max((x + node.width / 2 for node, x, _ in nodes), default=0.0) + pad,
+            max((y + node.height / 2 for node, _, y in nodes), default=0.0) + pad,
+        )
+
+    @property
+    def width(self) -> float:
+        return self.x1 - self.x0
+
+    @property
+    def height(self) -> float:
+        return self.y1 - self.y0
+
+
+@dataclass
+class SvgEdge:
+    attributes: Mapping[str, Id]
+    tail: tuple[float, float]
+    head: tuple[float, float]
+
+
+@dataclass
+class Axes:
+    """
+    Map positions along ranks and depths across them to points, by the
+    direction the ranks go in.
+    """
+
+    rankdir: str = "TB"
+
+    # The depth of the last rank's far side
+    total: float = 0.0
+
+    @property
+    def across(self) -> bool:
+        return self.rankdir in ("LR", "RL")
+
+    @property
+    def direction(self) -> int:
+        return -1 if self.rankdir in ("BT", "RL") else 1
+
+    def span(self, node: SvgNode) -> float:
+        return node.height if self.across else node.width
+
+    def thickness(self, node: SvgNode) -> float:
+        return node.width if self.across else node.height
+
+    def point(self, position: float, depth: float) -> tuple[float, float]:
+        if self.direction < 0:
+            depth = self.total - depth
+        return (depth, position) if self.across else (position, depth)
+
+
+@dataclass
+class Placement:
+    """
+    Where each entity is, by its position along its rank and the depth of its
+    rank, which is set once every rank is placed.
+    """
+
+    axes: Axes
+    nodes: dict[EntityId, SvgNode]
+    levels: dict[EntityId, int]
+    positions: dict[EntityId, float]
+    depths: list[float] = field(default_factory=list)
+
+    def point(self, key: EntityId) -> tuple[float, float]:
+        return self.axes.point(self.positions[key], self.depths[self.levels[key]])
+
+    def end(self, key: EntityId, side: int) -> tuple[float, float]:
+        """
+        Return the middle of the side of the entity's node facing the next rank,
+        or the previous one if the side is negative.
+        """
+        depth = self.depths[self.levels[key]] + side * self.axes.direction * self.axes.thickness(self.nodes[key]) / 2
+        return self.axes.point(self.positions[key], depth)
+
+    def stack(self, count: int, ranks: Sequence[Sequence[SvgNode]], separation: float) -> None:
+        """
+        Place the ranks one after the other, each as thick as its thickest node,
+        including the given nodes of each rank, and at least the separation
+        away from the next.
+        """
+        thicknesses = [0.0] * count
+        for key, level in self.levels.items():
+            thicknesses[level] = max(thicknesses[level], self.axes.thickness(self.nodes[key]))
+        for rank_nodes in ranks:
+            for level, node in enumerate(rank_nodes):
+                thicknesses[level] = max(thicknesses[level], self.axes.thickness(node))
+
+        depth = 0.0
+        self.depths = []
+        for thickness in thicknesses:
+            self.depths.append(depth + thickness / 2)
+            depth += thickness + separation
+        self.axes.total = depth - separation if thicknesses else 0.0
+
+    def beside(self, ranks: Sequence[Sequence[SvgNode]], separation: float) -> list[tuple[SvgNode, float, float]]:
+        """
+        Place the nodes of the first ranks before the tree and the nodes of the
+        last ranks after it, each on its own rank.
+        """
+        spans = {key: self.axes.span(node) for key, node in self.nodes.items()}
+        start = min((self.positions[key] - span / 2 for key, span in spans.items()), default=0.0)
+        end = max((self.positions[key] + span / 2 for key, span in spans.items()), default=0.0)
+
+        placed: list[tuple[SvgNode, float, float]] = []
+        for rank_nodes, side in zip(ranks, (-1, 1)):
+            edge = start if side < 0 else end
+            position = edge + side * (separation + max(map(self.axes.span, rank_nodes), default=0.0) / 2)
+            placed.extend(
+                (node, *self.axes.point(position, self.depths[level])) for level, node in enumerate(rank_nodes)
+            )
+        return placed
+
+
+@dataclass
+class TidyWriter(Generic[AnyRank, MemberT]):
+    """
+    Lay out trees as tidy trees, aligned by rank, and write them as SVG without
+    Graphviz. Nodes and edges get the same attributes they would in DOT, and
+    the most common ones are drawn: labels, shapes, colors, fonts, line styles,
+    and arrowheads. Custom nodes and edges, which have no rank, are left out.
+    """
+
+    dot_writer: DotWriter[AnyRank, MemberT]
+    config: TidyWriterConfig = field(default_factory=TidyWriterConfig)
+
+    def write(self, tree: FamilyTree[AnyRank, MemberT]) -> bytes:
+        output = BytesIO()
+        self.write_to(tree, output)
+        return output.getvalue()
+
+    def write_to(self, tree: FamilyTree[AnyRank, MemberT], output: IO[bytes]) -> None:
+        output.writelines(line.encode("utf-8") for line in self.lines(tree))
+
+    def graph_attributes(self) -> dict[str, Id]:
+        defaults = self.dot_writer.config.graph.defaults
+        return {**defaults.root, **defaults.entity}
+
+    def node(self, identifier: str, attributes: Mapping[str, Id]) -> SvgNode:
+        """
+        Size the node to fit its label, as Graphviz does, without shrinking it
+        below its own width and height.
+        """
+        label = str(attributes.get("label", "\\N")).replace("\\N", identifier)
+        if label.startswith("<") and label.endswith(">"):
+            label = HTML_TAG.sub("", label[1:-1])
+        lines = LINE_BREAK.split(label)
+        if len(lines) > 1 and not lines[-1]:
+            lines.pop()
+
+        font_size = number(attributes.get("fontsize"), 14.0)
+        width = number(attributes.get("width"), 0.75) * POINTS
+        height = number(attributes.get("height"), 0.5) * POINTS
+        if str(attributes.get("fixedsize", "false")).lower() not in ("true", "shape"):
+            text_width = max(len(line) for line in lines) * font_size * self.config.character_width
+            text_height = len(lines) * font_size * 1.2
+            scale = math.sqrt(2) if str(attributes.get("shape", "ellipse")) in ELLIPSE_SHAPES else 1.0
+            width = max(width, (text_width + 2 * self.config.label_margin) * scale)
+            height = max(height, (text_height + self.config.label_margin) * scale)
+
+        return SvgNode(attributes, lines, width, height)
+
+    def entity_nodes(self, tree: FamilyTree[AnyRank, MemberT]) -> dict[EntityId, SvgNode]:
+        defaults = self.dot_writer.config.node.defaults
+        return {
+            key: self.node(key, {**defaults.root, **defaults.entity, **attributes})
+            for key, (_, attributes) in zip(tree.entities, self.dot_writer.node_attributes(tree))
+        }
+
+    def rank_nodes(self, tree: FamilyTree[AnyRank, MemberT], suffix: str) -> list[SvgNode]:
+        if not self.dot_writer.config.draw_ranks:
+            return []
+        config = self.dot_writer.config
+        defaults, names = config.node.defaults, config.graph.names
+        prefix = names.ranks_left if suffix == "L" else names.ranks_right
+        return [
+            self.node(
+                self.dot_writer.write_rank_identifier(prefix, rank, suffix),
+                {**defaults.root, **defaults.rank, **config.node.attributes.rank(rank)},
+            )
+            for rank in tree.ranks
+        ]
+
+    def lines(self, tree: FamilyTree[AnyRank, MemberT]) -> Iterator[str]:
+        """
+        Lay out the tree and yield the lines of its SVG.
+        """
+        graph = self.graph_attributes()
+        separation = number(graph.get("nodesep"), 0.25) * POINTS
+        placement = self.place(tree, Axes(str(graph.get("rankdir", "TB")).upper()), separation)
+        ranks = [self.rank_nodes(tree, "L"), self.rank_nodes(tree, "R")]
+        placement.stack(len(tree.ranks), ranks, number(graph.get("ranksep"), 0.5) * POINTS)
+
+        defaults = self.dot_writer.config.edge.defaults
+        yield from self.svg(
+            graph,
+            [
+                *((node, *placement.point(key)) for key, node in placement.nodes.items()),
+                *placement.beside(ranks, separation),
+            ],
+            [
+                SvgEdge(
+                    {**defaults.root, **defaults.entity, **attributes},
+                    placement.end(parent, 1),
+                    placement.end(child, -1),
+                )
+                for (parent, child), (_, attributes) in zip(tree.relationships, self.dot_writer.edge_attributes(tree))
+            ],
+        )
+
+    def place(self, tree: FamilyTree[AnyRank, MemberT], axes: Axes, separation: float) -> "Placement":
+        """
+        Place each entity along the line of its rank.
+        """
+        nodes = self.entity_nodes(tree)
+        levels = {key: index(entity.rank) - index(tree.ranks[0]) for key, entity in tree.entities.items()}
+        children, roots = self.forest(tree)
+        spans = {key: axes.span(node) for key, node in nodes.items()}
+        positions = TidyLayout(levels, spans, children, separation).positions(roots)
+        return Placement(axes, nodes, levels, positions)
+
+    def forest(self, tree: FamilyTree[AnyRank, MemberT]) -> tuple[dict[EntityId, list[EntityId]], list[EntityId]]:
+        """
+        Return the children of each entity and the roots of a forest spanning
+        the tree, in which each entity is a child of its first parent only.
+        Children are in the same order as the entities of the tree.
+        """
+        parents: dict[EntityId, EntityId] = {}
+        for parent, child in tree.relationships:
+            parents.setdefault(child, parent)
+        children: dict[EntityId, list[EntityId]] = {}
+        roots: list[EntityId] = []
+        for key in tree.entities:
+            if key in parents:
+                children.setdefault(parents[key], []).append(key)
+            else:
+                roots.append(key)
+        return children, roots
+
+    def svg(
+        self,
+        graph: Mapping[str, Id],
+        nodes: Sequence[tuple[SvgNode, float, float]],
+        edges: Sequence[SvgEdge],
+    ) -> Iterator[str]:
+        pad = number(graph.get("pad"), 4 / POINTS) * POINTS
+        box = Box.around(nodes, pad)
+
+        # Put the graph's label below everything else, as Graphviz does
+        title = str(graph.get("label", ""))
+        font_size = number(graph.get("fontsize"), 14.0)
+        if title:
+            box.y1 += font_size * 1.5
+
+        yield '<?xml version="1.0" encoding="UTF-8" standalone="no"?>\n'
+        yield (
+            f'<svg xmlns="http://www.w3.org/2000/svg" width="{box.width:.0f}pt" height="{box.height:.0f}pt"'
+            f' viewBox="{box.x0:.2f} {box.y0:.2f} {box.width:.2f} {box.height:.2f}">\n'
+        )
+        yield (
+            '<defs><marker id="arrow" viewBox="0 0 10 10" refX="10" refY="5" markerWidth="10" markerHeight="10"'
+            ' markerUnits="userSpaceOnUse" orient="auto"><path d="M0,0L10,5L0,10z" fill="context-stroke"/>'
+            "</marker></defs>\n"
+        )
+        yield f'<g id={quoteattr(self.dot_writer.config.graph.names.root)} class="graph">\n'
+        if "bgcolor" in graph:
+            yield self.rectangle(
+                box.x0, box.y0, box.width, box.height, {"fill": str(graph["bgcolor"]), "stroke": "none"}
+            )
+        if title:
+            yield self.text([title], graph, (box.x0 + box.x1) / 2, box.y1 - pad - font_size * 0.75)
+        for edge in edges:
+            yield from self.edge(edge)
+        for node, x, y in nodes:
+            yield from self.shape(node, x, y)
+        yield "</g>\n"
+        yield "</svg>\n"
+
+    def edge(self, edge: SvgEdge) -> Iterator[str]:
+        attributes = edge.attributes
+        edge_styles = styles(attributes)
+        if "invis" in edge_styles:
+            return
+        (x1, y1), (x2, y2) = edge.tail, edge.head
+        properties = self.stroke(attributes, edge_styles)
+        if str(attributes.get("arrowhead", "normal")) != "none" and str(attributes.get("dir", "forward")) != "none":
+            properties["marker-end"] = "url(#arrow)"
+        yield f'<line x1="{x1:.2f}" y1="{y1:.2f}" x2="{x2:.2f}" y2="{y2:.2f}"{self.properties(properties)}/>\n'
+
+    def shape(self, node: SvgNode, x: float, y: float) -> Iterator[str]:
+        attributes = node.attributes
+        node_styles = styles(attributes)
+        if "invis" in node_styles:
+            return
+
+        properties = self.stroke(attributes, node_styles)
+        if "filled" in node_styles:
+            properties["fill"] = str(attributes.get("fillcolor", attributes.get("color", "lightgrey")))
+        else:
+            properties["fill"] = "none"
+
+        shape = str(attributes.get("shape", "ellipse"))
+        if shape in ELLIPSE_SHAPES:
+            yield (
+                f'<ellipse cx="{x:.2f}" cy="{y:.2f}" rx="{node.width / 2:.2f}" ry="{node.height / 2:.2f}"'
+                f"{self.properties(properties)}/>\n"
+            )
+        elif shape not in TEXT_SHAPES:
+            if "rounded" in node_styles:
+                properties["rx"] = properties["ry"] = "6"
+            yield self.rectangle(x - node.width / 2, y - node.height / 2, node.width, node.height, properties)
+        yield self.text(node.lines, attributes, x, y)
+
+    def stroke(self, attributes: Mapping[str, Id], element_styles: set[str]) -> dict[str, str]:
+        properties = {"stroke": str(attributes.get("pencolor", attributes.get("color", "black")))}
+        width = number(attributes.get("penwidth"), 2.0 if "bold" in element_styles else 1.0)
+        if width != 1.0:
+            properties["stroke-width"] = f"{width:g}"
+        for style, dashes in DASHES.items():
+            if style in element_styles:
+                properties["stroke-dasharray"] = dashes
+        return properties
+
+    def rectangle(self, x: float, y: float, width: float, height: float, properties: dict[str, str]) -> str:
+        return (
+            f'<rect x="{x:.2f}" y="{y:.2f}" width="{width:.2f}" height="{height:.2f}"'
+            f"{self.properties(properties)}/>\n"
+        )
+
+    def text(self, lines: Sequence[str], attributes: Mapping[str, Id], x: float, y: float) -> str:
+        font_size = number(attributes.get("fontsize"), 14.0)
+        properties = {
+            "text-anchor": "middle",
+            "font-family": str(attributes.get("fontname", "Times,serif")),
+            "font-size": f"{font_size:g}",
+            "fill": str(attributes.get("fontcolor", "black")),
+        }
+        # Center the lines around the point, with each baseline a third of a
+        # line below the middle of its line
+        top = y - (len(lines) - 1) * font_size * 0.6 + font_size / 3
+        spans = "".join(
+            f'<tspan x="{x:.2f}" y="{top + i * font_size * 1.2:.2f}">{escape(line)}</tspan>'
+            for i, line in enumerate(lines)
+        )
+        return f"<text{self.properties(properties)}>{spans}</text>\n"
+
+    def properties(self, properties: Mapping[str, str]) -> str:
+        return "".join(f" {name}={quoteattr(value)}" for name, value in properties.items())
@@ -18,6 +18,7 @@ class DiGraph(Generic[T]):
     @property
     def nodes(self) -> Iterable[T]: ...
     def edges(self) -> Iterable[tuple[T, T]]: ...
+    def successors(self, n: T) -> Iterator[T]: ...
     def add_edge(self, u_of_edge: T, v_of_edge: T) -> None: ...
     def add_node(self, node_for_adding: T) -> None: ...
     def __contains__(self, item: T) -> bool: ...
@@ -0,0 +1,62 @@
+from dataclasses import dataclass
+
+import pytest
+
+from snutree.model.entity import Entity, EntityId, ParentKeyStatus
+from snutree.model.member.keyed import KeyedMember
+from snutree.model.merge import (
+    EntityMerger,
+    MergeConflictError,
+    MergePolicy,
+    MergeStats,
+)
+from snutree.model.semester import Semester
+from tests.conftest import TestCase
+
+
+def entity(key: str, name: str, big_key: str | None = None) -> Entity[Semester, KeyedMember]:
+    row: dict[str, str | None] = {"key": key, "big_key": big_key, "name": name, "semester": "Fall 2010"}
+    member = KeyedMember.model_validate(row)
+    return Entity(
+        parent_key=EntityId(big_key) if big_key is not None else ParentKeyStatus.UNKNOWN,
+        key=EntityId(key),
+        rank=member.semester,
+        member=member,
+    )
+
+
+ENTITIES = [
+    entity("1", "Sean Shaw"),
+    entity("2", "Jane Doe"),
+    entity("1", "Sean Shaw", big_key="2"),
+    entity("2", "Jane Doe"),
+    entity("3", "John Doe"),
+]
+
+
+@dataclass
+class MergeTestCase(TestCase):
+    policy: MergePolicy
+    expected: list[Entity[Semester, KeyedMember]]
+
+
+@pytest.mark.parametrize(
+    "case",
+    [
+        MergeTestCase(id="first", policy="first", expected=[ENTITIES[0], ENTITIES[1], ENTITIES[4]]),
+        MergeTestCase(id="last", policy="last", expected=[ENTITIES[2], ENTITIES[3], ENTITIES[4]]),
+        MergeTestCase(id="coalesce", policy="coalesce", expected=[ENTITIES[2], ENTITIES[1], ENTITIES[4]]),
+    ],
+)
+def test_merge(case: MergeTestCase) -> None:
+    merger = EntityMerger(case.policy)
+    assert merger.merge(ENTITIES) == case.expected
+    assert merger.stats == MergeStats(entities=5, duplicates=2, conflicts=1, conflicting_keys=[EntityId("1")])
+    assert merger.stats.unique == 3
+
+
+def test_merge_conflict() -> None:
+    merger = EntityMerger("error")
+    assert merger.merge([ENTITIES[1], ENTITIES[3]]) == [ENTITIES[1]]
+    with pytest.raises(MergeConflictError, match="'1'"):
+        merger.merge(ENTITIES)
@@ -0,0 +1,70 @@
+from dataclasses import dataclass
+from operator import index
+
+import pytest
+
+from snutree.model.rank import RankFilter, RankWindow
+from snutree.model.semester import Semester
+from tests.conftest import TestCase
+
+WINDOW = RankWindow(index(Semester("Fall 2010")), index(Semester("Fall 2011")))
+
+FILTER = RankFilter(Semester, "semester", WINDOW, keep={"status": frozenset({"Candidate"})})
+
+
+@dataclass
+class RankFilterTestCase(TestCase):
+    row: dict[str, object]
+    expected: bool
+
+
+@pytest.mark.parametrize(
+    "case",
+    [
+        RankFilterTestCase(id="lower-bound", row={"semester": "Fall 2010"}, expected=True),
+        RankFilterTestCase(id="upper-bound", row={"semester": "Fall 2011"}, expected=True),
+        RankFilterTestCase(id="too-early", row={"semester": "Spring 2010"}, expected=False),
+        RankFilterTestCase(id="too-late", row={"semester": "Spring 2012"}, expected=False),
+        RankFilterTestCase(id="kept", row={"semester": "Spring 2012", "status": "Candidate"}, expected=True),
+        RankFilterTestCase(id="empty", row={"semester": ""}, expected=True),
+        RankFilterTestCase(id="missing", row={}, expected=True),
+        RankFilterTestCase(id="invalid", row={"semester": "Winter 2012"}, expected=True),
+    ],
+)
+def test_rank_filter(case: RankFilterTestCase) -> None:
+    assert FILTER(case.row) == case.expected
+
+
+def test_rank_window() -> None:
+    assert not RankWindow().bounded
+    assert 10**9 in RankWindow()
+    assert 5 in RankWindow(maximum=5)
+    assert 6 not in RankWindow(maximum=5)
+    assert 4 not in RankWindow(minimum=5)
+
+
+def test_select() -> None:
+    query, parameters = FILTER.select("SELECT * FROM members;\n", "rank(semester)", "?")
+    assert query == (
+        "SELECT * FROM (SELECT * FROM members) AS snutree_rows WHERE "
+        "(`semester` IS NULL) OR (`semester` = '') OR (`status` IN (?)) "
+        "OR ((rank(semester)) >= 4021 AND (rank(semester)) <= 4023)"
+    )
+    assert parameters == ["Candidate"]
+
+
+def test_select_ordered() -> None:
+    query, _ = FILTER.select(
+        "SELECT m.*, 'ORDER BY name' AS note FROM members AS m -- ORDER BY name\n"
+        "ORDER BY FIELD(m.`status`, 'Active', 'Alumni'), m.key DESC LIMIT 10",
+        "rank(semester)",
+        "?",
+    )
+    # The query's order is applied again outside it, by the columns it returns
+    assert query.endswith(") ORDER BY FIELD(`status`, 'Active', 'Alumni'), key DESC")
+
+
+def test_select_unordered() -> None:
+    query, _ = FILTER.select("SELECT * FROM members WHERE key IN (SELECT key FROM brothers ORDER BY key)", "1", "?")
+    assert "ORDER BY key)" in query
+    assert not query.endswith("ORDER BY key")
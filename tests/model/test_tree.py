@@ -0,0 +1,69 @@
+import random
+
+from snutree.model.entity import Entity, EntityId, ParentKeyStatus
+from snutree.model.tree import EntityOrdering, FamilyTree, FamilyTreeConfig
+from snutree.writer.dot import DotWriter
+
+
+def tree(seed: int, ordering: EntityOrdering = "tree") -> FamilyTree[int, None]:
+    """
+    Return a forest of random trees, each child ranked one after its parent.
+    """
+    rng = random.Random(0)
+    entities: list[Entity[int, None]] = [Entity(ParentKeyStatus.NONE, EntityId("0"), 0, None)]
+    ranks = {"0": 0}
+    for i in range(1, 200):
+        if rng.random() < 0.05:
+            entities.append(Entity(ParentKeyStatus.NONE, EntityId(str(i)), 0, None))
+            ranks[str(i)] = 0
+        else:
+            parent = str(rng.randrange(i))
+            entities.append(Entity(EntityId(parent), EntityId(str(i)), ranks[parent] + 1, None))
+            ranks[str(i)] = ranks[parent] + 1
+    return FamilyTree[int, None](
+        rank_type=int,
+        entities=entities,
+        relationships=set(),
+        config=FamilyTreeConfig(seed=seed, ordering=ordering),
+    )
+
+
+def crossings(family_tree: FamilyTree[int, None]) -> int:
+    """
+    Count the pairs of edges between the same ranks that cross when the
+    entities of each rank are drawn in the order of the tree's entities.
+    """
+    positions = {key: i for i, key in enumerate(family_tree.entities)}
+    edges = [
+        (family_tree.entities[parent].rank, positions[parent], positions[child])
+        for parent, child in family_tree.relationships
+    ]
+    return sum(
+        1
+        for i, (rank1, tail1, head1) in enumerate(edges)
+        for rank2, tail2, head2 in edges[i + 1 :]
+        if rank1 == rank2 and (tail1 - tail2) * (head1 - head2) < 0
+    )
+
+
+def test_tree_ordering() -> None:
+    for seed in range(3):
+        ordered = tree(seed)
+        keys = list(ordered.entities)
+
+        # Each entity's descendants come right after it, so no edges cross
+        for parent, child in ordered.relationships:
+            assert keys.index(parent) < keys.index(child)
+        assert crossings(ordered) == 0
+        assert crossings(tree(seed, "shuffle")) > 0
+
+        # Relationships are in the order of their entities
+        positions = [(keys.index(parent), keys.index(child)) for parent, child in ordered.relationships]
+        assert positions == sorted(positions)
+
+    assert list(tree(0).entities) != list(tree(1).entities)
+
+
+def test_tree_ordering_hint() -> None:
+    assert 'ordering="out";' in DotWriter[int, None]().write(tree(0)).decode()
+    assert "ordering" not in DotWriter[int, None]().write(tree(0, "shuffle")).decode()
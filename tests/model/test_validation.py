@@ -0,0 +1,58 @@
+import pytest
+
+from snutree.model.entity import CustomEntity, EntityId, ParentKeyStatus
+from snutree.model.semester import Semester
+from snutree.model.validation import (
+    StructureError,
+    StructureReport,
+    StructureValidator,
+    ValidationConfig,
+)
+
+ENTITIES = [
+    CustomEntity[Semester, None](ParentKeyStatus.NONE, "A", Semester("Fall 2010")),
+    CustomEntity[Semester, None]("A", "B", Semester("Spring 2011")),
+    CustomEntity[Semester, None]("B", "C", Semester("Fall 2010")),
+    CustomEntity[Semester, None]("Z", "D", Semester("Fall 2011")),
+    CustomEntity[Semester, None]("E", "E", Semester("Fall 2011")),
+    CustomEntity[Semester, None](ParentKeyStatus.UNKNOWN, "A", Semester("Fall 2010")),
+]
+
+RELATIONSHIPS = {(EntityId("C"), EntityId("A")), (EntityId("C"), EntityId("Y"))}
+
+
+def test_valid() -> None:
+    report = StructureValidator().validate(ENTITIES[:2], set())
+    assert report.valid
+    assert str(report) == "no problems found"
+
+
+def test_report() -> None:
+    report = StructureValidator().validate(ENTITIES, RELATIONSHIPS)
+    assert report == StructureReport(
+        duplicate_keys=[EntityId("A")],
+        missing_parents=[(EntityId("Z"), EntityId("D"))],
+        missing_children=[(EntityId("C"), EntityId("Y"))],
+        cycles=[[EntityId("A"), EntityId("B"), EntityId("C")], [EntityId("E")]],
+        rank_inversions=[(EntityId("B"), EntityId("C"))],
+    )
+    assert "cycle: A -> B -> C -> A" in str(report)
+
+
+def test_merged_keys() -> None:
+    report = StructureValidator().validate(ENTITIES[:2], set(), merged_keys=[EntityId("B")])
+    assert report == StructureReport(duplicate_keys=[EntityId("B")])
+    assert "duplicate key: B" in str(report)
+
+
+def test_fail_fast() -> None:
+    validator = StructureValidator(ValidationConfig(fail_fast=True))
+    with pytest.raises(StructureError) as e:
+        validator.validate(ENTITIES, RELATIONSHIPS)
+    assert e.value.report == StructureReport(duplicate_keys=[EntityId("A")])
+
+
+def test_strict() -> None:
+    validator = StructureValidator(ValidationConfig(strict=True))
+    with pytest.raises(StructureError, match="missing parent: Z"):
+        validator.validate(ENTITIES, RELATIONSHIPS)
@@ -0,0 +1,124 @@
+import datetime as dt
+import os
+from dataclasses import dataclass
+from decimal import Decimal
+from pathlib import Path
+
+from snutree.reader.cache import (
+    STALE_TEMPORARY,
+    ResultCache,
+    ResultCacheConfig,
+)
+
+ROWS = [
+    {"key": "1", "name": "Sean Shaw", "semester": "Fall 2010"},
+    {"key": "2", "name": "Jane Doe", "semester": "Spring 2011"},
+]
+
+
+@dataclass
+class Clock:
+    now: float = 1_000_000.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+def test_round_trip(tmp_path: Path) -> None:
+    cache = ResultCache(ResultCacheConfig(tmp_path))
+    assert cache.get("SELECT 1", "a") is None
+    cache.put("SELECT 1", "a", ROWS)
+    assert cache.get("SELECT 1", "a") == ROWS
+    assert cache.get("SELECT 1", "b") is None
+    assert cache.get("SELECT 2", "a") is None
+
+
+def test_round_trip_types(tmp_path: Path) -> None:
+    # Values of the types MySQLdb returns come back with the same types
+    row: dict[str, object] = {
+        "key": 1,
+        "name": "Sean Shaw",
+        "dues": Decimal("10.50"),
+        "joined": dt.date(2010, 9, 1),
+        "updated": dt.datetime(2011, 1, 2, 3, 4, 5, 6),
+        "meeting": dt.timedelta(days=1, seconds=2, microseconds=3),
+        "photo": b"\x00\xff",
+        "roles": {"officer", "member"},
+        "tagged": {"date": "2010-09-01"},
+        "missing": None,
+    }
+    cache = ResultCache(ResultCacheConfig(tmp_path))
+    cache.put("SELECT 1", "a", [row])  # type: ignore[list-item]
+    (cached,) = cache.get("SELECT 1", "a") or []
+    assert cached == {**row, "tagged": str(row["tagged"])}
+    assert [type(value) for value in cached.values()] == [
+        str if name == "tagged" else type(value) for name, value in row.items()
+    ]
+
+
+def test_ttl(tmp_path: Path) -> None:
+    clock = Clock()
+    cache = ResultCache(ResultCacheConfig(tmp_path, ttl=60), clock)
+    cache.put("SELECT 1", "a", ROWS)
+    clock.now += 60
+    assert cache.get("SELECT 1", "a") == ROWS
+    clock.now += 1
+    assert cache.get("SELECT 1", "a") is None
+    assert not list(tmp_path.iterdir())
+
+
+def test_lru_eviction(tmp_path: Path) -> None:
+    clock = Clock()
+    cache = ResultCache(ResultCacheConfig(tmp_path), clock)
+    cache.put("SELECT 1", "a", ROWS)
+    size = cache.path("SELECT 1", "a").stat().st_size
+    cache = ResultCache(ResultCacheConfig(tmp_path, max_bytes=2 * size), clock)
+
+    clock.now += 1
+    cache.put("SELECT 2", "a", ROWS)
+    clock.now += 1
+    assert cache.get("SELECT 1", "a") == ROWS  # Now the most recently used
+    clock.now += 1
+    cache.put("SELECT 3", "a", ROWS)
+
+    assert cache.get("SELECT 1", "a") == ROWS
+    assert cache.get("SELECT 2", "a") is None
+    assert cache.get("SELECT 3", "a") == ROWS
+
+
+def test_store(tmp_path: Path) -> None:
+    cache = ResultCache(ResultCacheConfig(tmp_path))
+    rows = cache.store("SELECT 1", "a", iter(ROWS))
+    assert next(rows) == ROWS[0]
+    assert cache.get("SELECT 1", "a") is None
+    assert list(rows) == ROWS[1:]
+    assert cache.get("SELECT 1", "a") == ROWS
+
+
+def test_store_streams(tmp_path: Path) -> None:
+    cache = ResultCache(ResultCacheConfig(tmp_path))
+    rows = cache.store("SELECT 1", "a", iter(ROWS))
+    assert next(rows) == ROWS[0]
+    (partial,) = tmp_path.iterdir()
+    assert partial.suffix == ".tmp"
+    rows.close()  # type: ignore[attr-defined]
+    # Nothing is cached from rows abandoned partway
+    assert not list(tmp_path.iterdir())
+
+
+def test_store_empty(tmp_path: Path) -> None:
+    cache = ResultCache(ResultCacheConfig(tmp_path))
+    assert not list(cache.store("SELECT 1", "a", iter([])))
+    assert cache.get("SELECT 1", "a") == []
+
+
+def test_stale_temporary_evicted(tmp_path: Path) -> None:
+    clock = Clock()
+    stale, fresh = tmp_path / "stale.tmp", tmp_path / "fresh.tmp"
+    stale.touch()
+    fresh.touch()
+    os.utime(stale, (clock.now - STALE_TEMPORARY - 1, clock.now - STALE_TEMPORARY - 1))
+    os.utime(fresh, (clock.now, clock.now))
+    ResultCache(ResultCacheConfig(tmp_path), clock).put("SELECT 1", "a", ROWS)
+    assert not stale.exists()
+    assert fresh.exists()
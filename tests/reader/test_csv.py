@@ -0,0 +1,28 @@
+from csv import DictReader
+from io import StringIO
+
+import pytest
+
+from snutree.reader.csv import CsvReader
+
+CSV = """\
+key,big_key,name,semester,email,notes
+1,,Sean Shaw,Fall 2010,sean@example.com,"a, b"
+
+2,1,Jane Doe,Spring 2011
+3,1,John Doe,Fall 2011,john@example.com,,extra
+"""
+
+
+@pytest.mark.parametrize(
+    "columns",
+    [
+        None,
+        {"key", "big_key", "name", "semester"},
+        {"key", "notes", "missing"},
+    ],
+)
+def test_read(columns: set[str] | None) -> None:
+    rows: list[dict[str, str]] = list(DictReader(StringIO(CSV)))
+    expected = [{key: value for key, value in row.items() if columns is None or key in columns} for row in rows]
+    assert list(CsvReader().read(StringIO(CSV), columns=columns)) == expected
@@ -0,0 +1,48 @@
+import json
+from io import StringIO
+
+import pytest
+
+from snutree.reader.json import JsonArrayDecoder, JsonReader
+
+ROWS = [
+    {"key": "1", "big_key": None, "name": "Sean Shaw", "semester": "Fall 2010", "notes": '["a", {b}]'},
+    {"key": "2", "big_key": "1", "name": "Jane Doe", "semester": "Spring 2011", "notes": ""},
+]
+
+
+@pytest.mark.parametrize("chunk_size", [1, 2, 7, 2**16])
+@pytest.mark.parametrize("indent", [None, 4])
+def test_decoder(chunk_size: int, indent: int | None) -> None:
+    values: list[object] = [*ROWS, [1, 2], 12345, "x"]
+    text = json.dumps(values, indent=indent)
+    assert list(JsonArrayDecoder(StringIO(text), chunk_size)) == values
+
+
+@pytest.mark.parametrize("chunk_size", [1, 2, 3, 4])
+@pytest.mark.parametrize("text", ["[1.5, 2e3]", "[1.5e+3, -0.25E-2]", "[123456789, 0]"])
+def test_decoder_numbers(chunk_size: int, text: str) -> None:
+    # Numbers cut off at the end of a chunk are decoded whole
+    values: list[object] = json.loads(text)
+    assert list(JsonArrayDecoder(StringIO(text), chunk_size)) == values
+
+
+@pytest.mark.parametrize("text", ["[]", " [ ] ", "[\n]\n"])
+def test_decoder_empty(text: str) -> None:
+    assert not list(JsonArrayDecoder(StringIO(text), chunk_size=1))
+
+
+@pytest.mark.parametrize("text", ["", "{}", "[1 2]", "[1,", "[1] 2", '[{"a": 1]'])
+def test_decoder_invalid(text: str) -> None:
+    with pytest.raises(ValueError):
+        list(JsonArrayDecoder(StringIO(text), chunk_size=1))
+
+
+def test_read_projected() -> None:
+    rows = JsonReader().read(StringIO(json.dumps(ROWS)), columns={"key", "name"})
+    assert list(rows) == [{"key": "1", "name": "Sean Shaw"}, {"key": "2", "name": "Jane Doe"}]
+
+
+def test_read_not_objects() -> None:
+    with pytest.raises(ValueError, match="expected an object in JSON array, but found list"):
+        list(JsonReader().read(StringIO("[[1, 2]]")))
@@ -0,0 +1,16 @@
+import importlib
+import pkgutil
+from pathlib import Path
+
+from snutree.reader import READER_EXTENSIONS, Reader
+
+
+def test_reader_extensions() -> None:
+    extensions: dict[str, frozenset[str]] = {}
+    for module_info in pkgutil.iter_modules([str(Path(__file__).parents[2] / "snutree" / "reader")]):
+        module = importlib.import_module(f"snutree.reader.{module_info.name}")
+        objects: dict[str, object] = vars(module)
+        for obj in objects.values():
+            if isinstance(obj, Reader):
+                extensions[module_info.name] = frozenset(obj.extensions)
+    assert extensions == READER_EXTENSIONS
@@ -0,0 +1,302 @@
+import sqlite3
+import time
+from collections.abc import Sequence
+from dataclasses import dataclass, field
+from io import StringIO
+from operator import index
+from pathlib import Path
+
+import pytest
+
+from snutree.model.rank import RankFilter, RankWindow
+from snutree.model.semester import Semester
+from snutree.reader.cache import ResultCacheConfig
+from snutree.reader.sql import (
+    SqlConfig,
+    SqlConnection,
+    SqlConnectionPool,
+    SqlReader,
+    SqlReaderConfig,
+    SshConfig,
+    SshTunnel,
+)
+
+QUERY = "SELECT key, name, semester FROM members ORDER BY key"
+
+ROWS = [
+    {"key": "1", "name": "Sean Shaw", "semester": "Fall 2010"},
+    {"key": "2", "name": "Jane Doe", "semester": "Spring 2011"},
+    {"key": "3", "name": "John Doe", "semester": "Fall 2011"},
+]
+
+
+class StandInCursor:
+    """
+    A sqlite3 cursor that behaves enough like a MySQLdb dictionary cursor.
+    """
+
+    def __init__(self, connection: sqlite3.Connection) -> None:
+        self.cursor = connection.cursor()
+
+    def __enter__(self) -> "StandInCursor":
+        return self
+
+    def __exit__(self, *exc_info: object) -> None:
+        self.cursor.close()
+
+    def execute(self, query: str, args: Sequence[str] | None = None) -> object:
+        if query.startswith("SET NAMES"):
+            return None
+        if args is None:
+            return self.cursor.execute(query)
+        # Translate from the MySQLdb parameter style
+        return self.cursor.execute(query.replace("%s", "?").replace("%%", "%"), args)
+
+    def fetchmany(self, size: int) -> list[dict[str, str]]:
+        return self.rows(self.cursor.fetchmany(size))  # type: ignore[misc]
+
+    def fetchall(self) -> list[dict[str, str]]:
+        return self.rows(self.cursor.fetchall())  # type: ignore[misc]
+
+    def rows(self, values: list[tuple[str, ...]]) -> list[dict[str, str]]:
+        names: list[str] = [description[0] for description in self.cursor.description]  # type: ignore[misc]
+        return [dict(zip(names, row)) for row in values]
+
+
+@dataclass
+class StandInConnection:
+    path: Path
+    alive: bool = True
+
+    def __post_init__(self) -> None:
+        # The pool's reaper may close connections from its own thread
+        self.connection = sqlite3.connect(self.path, check_same_thread=False)
+
+    def cursor(self, cursorclass: object = None) -> StandInCursor:  # pylint: disable=unused-argument
+        return StandInCursor(self.connection)
+
+    def ping(self) -> None:
+        if not self.alive:
+            raise ConnectionError("connection lost")
+
+    def close(self) -> None:
+        self.alive = False
+        self.connection.close()
+
+
+@dataclass
+class StandInTunnel:
+    local_bind_port: int = 3307
+    is_active: bool = True
+
+    def stop(self) -> None:
+        self.is_active = False
+
+
+@dataclass
+class StandInServer:
+    """
+    Hands out stand-in connections and tunnels, keeping track of each.
+    """
+
+    path: Path
+    connections: list[StandInConnection] = field(default_factory=list)
+    tunnels: list[StandInTunnel] = field(default_factory=list)
+    now: float = 0.0
+
+    def connect(self, config: SqlConfig) -> SqlConnection:  # pylint: disable=unused-argument
+        connection = StandInConnection(self.path)
+        self.connections.append(connection)
+        return connection
+
+    def open_tunnel(self, config: SshConfig) -> SshTunnel:  # pylint: disable=unused-argument
+        tunnel = StandInTunnel()
+        self.tunnels.append(tunnel)
+        return tunnel
+
+    def is_healthy(self, connection: SqlConnection) -> bool:
+        try:
+            connection.ping()
+        except ConnectionError:
+            return False
+        else:
+            return True
+
+    def clock(self) -> float:
+        return self.now
+
+    def pool(self, idle_timeout: float = 60) -> SqlConnectionPool:
+        return SqlConnectionPool(
+            idle_timeout=idle_timeout,
+            connect=self.connect,
+            open_tunnel=self.open_tunnel,
+            is_healthy=self.is_healthy,
+            clock=self.clock,
+        )
+
+
+@pytest.fixture(name="server")
+def fixture_server(tmp_path: Path) -> StandInServer:
+    path = tmp_path / "members.db"
+    with sqlite3.connect(path) as connection:
+        connection.execute("CREATE TABLE members (key TEXT, name TEXT, semester TEXT)")
+        connection.executemany("INSERT INTO members VALUES (:key, :name, :semester)", ROWS)
+    connection.close()
+    return StandInServer(path)
+
+
+def reader_config(
+    streaming: bool = False,
+    ssh: bool = False,
+    cache: Path | None = None,
+    rank_expression: str | None = None,
+) -> SqlReaderConfig:
+    return SqlReaderConfig(
+        sql=SqlConfig(host="127.0.0.1", port=3306, database="members", user="user", password="password"),
+        ssh=(
+            SshConfig(
+                ssh_address_or_host=("example.com", 22),
+                ssh_username="user",
+                ssh_pkey="key",
+                remote_bind_address=("127.0.0.1", 3306),
+                allow_agent=False,
+            )
+            if ssh
+            else None
+        ),
+        streaming=streaming,
+        batch_size=2,
+        cache=ResultCacheConfig(cache) if cache is not None else None,
+        rank_expression=rank_expression,
+    )
+
+
+@pytest.mark.parametrize("streaming", [False, True])
+def test_connection_reused(server: StandInServer, streaming: bool) -> None:
+    reader = SqlReader(reader_config(streaming=streaming, ssh=True), server.pool())
+    for _ in range(3):
+        assert list(reader.read(StringIO(QUERY))) == ROWS
+    assert len(server.connections) == 1
+    assert len(server.tunnels) == 1
+
+
+def test_stream_closed_early(server: StandInServer) -> None:
+    reader = SqlReader(reader_config(streaming=True), server.pool())
+    rows = iter(reader.read(StringIO(QUERY)))
+    assert next(rows) == ROWS[0]
+    rows.close()  # type: ignore[attr-defined]
+    # A connection abandoned mid-result is not handed out again
+    assert list(reader.read(StringIO(QUERY))) == ROWS
+    assert len(server.connections) == 2
+    assert not server.connections[0].alive
+
+
+def test_idle_timeout(server: StandInServer) -> None:
+    pool = server.pool(idle_timeout=60)
+    reader = SqlReader(reader_config(ssh=True), pool)
+    list(reader.read(StringIO(QUERY)))
+    server.now += 61
+    list(reader.read(StringIO(QUERY)))
+    server.now += 30
+    list(reader.read(StringIO(QUERY)))
+    assert len(server.connections) == 2
+    assert len(server.tunnels) == 2
+    assert not server.connections[0].alive
+    assert not server.tunnels[0].is_active
+    server.now += 61
+    pool.reap()
+    assert not server.connections[1].alive
+    assert not server.tunnels[1].is_active
+
+
+def test_idle_reaped(server: StandInServer) -> None:
+    pool = SqlConnectionPool(
+        idle_timeout=0.05,
+        connect=server.connect,
+        open_tunnel=server.open_tunnel,
+        is_healthy=server.is_healthy,
+    )
+    list(SqlReader(reader_config(ssh=True), pool).read(StringIO(QUERY)))
+    # The pool is no longer used, but its connection and tunnel are closed anyway
+    deadline = time.monotonic() + 5
+    while server.tunnels[0].is_active and time.monotonic() < deadline:
+        time.sleep(0.01)
+    assert not server.connections[0].alive
+    assert not server.tunnels[0].is_active
+    pool.close()
+
+
+def test_network_outside_lock(server: StandInServer) -> None:
+    pool = server.pool()
+    locked: list[bool] = []
+
+    def open_tunnel(config: SshConfig) -> SshTunnel:
+        locked.append(pool.lock.locked())
+        return server.open_tunnel(config)
+
+    def is_healthy(connection: SqlConnection) -> bool:
+        locked.append(pool.lock.locked())
+        return server.is_healthy(connection)
+
+    pool.open_tunnel = open_tunnel
+    pool.is_healthy = is_healthy
+    reader = SqlReader(reader_config(ssh=True), pool)
+    for _ in range(2):
+        list(reader.read(StringIO(QUERY)))
+    assert locked == [False, False]
+
+
+def test_health_check(server: StandInServer) -> None:
+    reader = SqlReader(reader_config(), server.pool())
+    list(reader.read(StringIO(QUERY)))
+    server.connections[0].close()
+    assert list(reader.read(StringIO(QUERY))) == ROWS
+    assert len(server.connections) == 2
+
+
+def test_dead_tunnel_replaced(server: StandInServer) -> None:
+    reader = SqlReader(reader_config(ssh=True), server.pool())
+    list(reader.read(StringIO(QUERY)))
+    server.tunnels[0].stop()
+    assert list(reader.read(StringIO(QUERY))) == ROWS
+    assert len(server.tunnels) == 2
+    assert len(server.connections) == 2
+
+
+@pytest.mark.parametrize("streaming", [False, True])
+def test_cached(server: StandInServer, tmp_path: Path, streaming: bool) -> None:
+    config = reader_config(streaming=streaming, cache=tmp_path / "cache")
+    pool = server.pool()
+    assert list(SqlReader(config, pool).read(StringIO(QUERY))) == ROWS
+    server.connections[0].close()
+    assert list(SqlReader(config, pool).read(StringIO(QUERY))) == ROWS
+    assert len(server.connections) == 1
+    assert list(SqlReader(config, pool, refresh=True).read(StringIO(QUERY))) == ROWS
+    assert len(server.connections) == 2
+
+
+@pytest.mark.parametrize(
+    "rank_expression",
+    [
+        None,
+        "2 * CAST(substr(semester, instr(semester, ' ') + 1) AS INTEGER) + (semester LIKE 'Fall%')",
+    ],
+)
+def test_read_filtered(server: StandInServer, rank_expression: str | None) -> None:
+    reader = SqlReader(reader_config(rank_expression=rank_expression), server.pool())
+    row_filter = RankFilter(
+        Semester,
+        "semester",
+        RankWindow(maximum=index(Semester("Spring 2011"))),
+        keep={"key": frozenset({"3"})},
+    )
+    assert list(reader.read(StringIO(QUERY), row_filter)) == ROWS
+    row_filter = RankFilter(Semester, "semester", RankWindow(maximum=index(Semester("Spring 2011"))))
+    assert list(reader.read(StringIO(QUERY), row_filter)) == ROWS[:2]
+
+
+def test_read_projected(server: StandInServer) -> None:
+    reader = SqlReader(reader_config(), server.pool())
+    with pytest.warns(UserWarning, match="never used: name"):
+        rows = list(reader.read(StringIO(QUERY), columns={"key", "semester"}))
+    assert rows == [{"key": row["key"], "semester": row["semester"]} for row in ROWS]
@@ -0,0 +1,63 @@
+import sqlite3
+from io import StringIO
+from operator import index
+from pathlib import Path
+
+import pytest
+
+from snutree.model.rank import RankFilter, RankWindow
+from snutree.model.semester import Semester
+from snutree.reader.sqlite import SqliteReader, SqliteReaderConfig
+
+ROWS: list[dict[str, str | None]] = [
+    {"key": "1", "big_key": None, "name": "Sean Shaw", "semester": "Fall 2010"},
+    {"key": "2", "big_key": "1", "name": "Jane Doe", "semester": "Spring 2011"},
+    {"key": "3", "big_key": "1", "name": "John Doe", "semester": "Fall 2011"},
+]
+
+
+@pytest.fixture(name="path")
+def fixture_path(tmp_path: Path) -> Path:
+    path = tmp_path / "members.db"
+    with sqlite3.connect(path) as connection:
+        connection.execute("CREATE TABLE members (key TEXT, big_key TEXT, name TEXT, semester TEXT)")
+        connection.executemany("INSERT INTO members VALUES (:key, :big_key, :name, :semester)", ROWS)
+    connection.close()
+    return path
+
+
+@pytest.mark.parametrize("shared_cache", [False, True])
+def test_read(path: Path, shared_cache: bool) -> None:
+    reader = SqliteReader(SqliteReaderConfig(path, shared_cache=shared_cache, batch_size=2))
+    assert list(reader.read(StringIO("SELECT * FROM members ORDER BY key"))) == ROWS
+
+
+def test_read_only(path: Path) -> None:
+    reader = SqliteReader(SqliteReaderConfig(path))
+    with pytest.raises(sqlite3.OperationalError, match="readonly"):
+        list(reader.read(StringIO("DELETE FROM members RETURNING *")))
+
+
+def test_uri() -> None:
+    config = SqliteReaderConfig(Path("/data/members db.sqlite"), shared_cache=True)
+    assert config.uri == "file:///data/members%20db.sqlite?mode=ro&cache=shared"
+
+
+@pytest.mark.parametrize(
+    "rank_expression",
+    [
+        None,
+        "2 * CAST(substr(semester, instr(semester, ' ') + 1) AS INTEGER) + (semester LIKE 'Fall%')",
+    ],
+)
+def test_read_filtered(path: Path, rank_expression: str | None) -> None:
+    reader = SqliteReader(SqliteReaderConfig(path, rank_expression=rank_expression))
+    row_filter = RankFilter(Semester, "semester", RankWindow(minimum=index(Semester("Spring 2011"))))
+    assert list(reader.read(StringIO("SELECT * FROM members ORDER BY key;"), row_filter)) == ROWS[1:]
+
+
+def test_read_filtered_ordered(path: Path) -> None:
+    reader = SqliteReader(SqliteReaderConfig(path, rank_expression="semester LIKE 'Fall%'"))
+    row_filter = RankFilter(Semester, "semester", RankWindow(minimum=1))
+    rows = reader.read(StringIO("SELECT m.* FROM members AS m ORDER BY m.key DESC"), row_filter)
+    assert [row["key"] for row in rows] == ["3", "1"]
@@ -0,0 +1,218 @@
+import sys
+import threading
+from collections.abc import Iterable, Set
+from dataclasses import dataclass, field
+from io import StringIO
+from pathlib import Path
+from typing import IO, ClassVar
+
+import pytest
+
+from snutree.api import SnutreeApi, SnutreeConfig
+from snutree.cache import ConfigCache
+from snutree.model.member.keyed import KeyedMember, KeyedMemberParser
+from snutree.model.rank import RankFilter
+from snutree.model.semester import Semester
+from snutree.model.tree import FamilyTreeConfig
+from snutree.reader.csv import CsvReader
+from snutree.reader.json import JsonReader
+from snutree.writer.dot import DotWriter
+from snutree.writer.graphviz import GraphvizWriter
+from snutree.writer.tidy import TidyWriter
+
+EXAMPLE_PATH = Path(__file__).parents[1] / "examples" / "keyed"
+
+
+@dataclass
+class RemoteReader:
+    """
+    Pretends to run a slow query, which can only finish once the local input
+    before it has been read.
+    """
+
+    extensions: ClassVar[list[str]] = [".remote"]
+    prefetch: ClassVar[bool] = True
+    cacheable: ClassVar[bool] = False
+
+    started: threading.Event = field(default_factory=threading.Event)
+    local_read: threading.Event = field(default_factory=threading.Event)
+
+    def read(
+        self,
+        stream: IO[str],
+        row_filter: RankFilter | None = None,  # pylint: disable=unused-argument
+        columns: Set[str] | None = None,  # pylint: disable=unused-argument
+    ) -> Iterable[dict[str, str]]:
+        self.started.set()
+        assert self.local_read.wait(timeout=5)
+        return [{"key": stream.read(), "name": "remote"}]
+
+
+def api(remote: RemoteReader) -> SnutreeApi[Semester, KeyedMember]:
+    dot_writer = DotWriter[Semester, KeyedMember]()
+    return SnutreeApi(
+        rank_type=Semester,
+        readers=[CsvReader(), remote],
+        parser=KeyedMemberParser(),
+        tree_config=FamilyTreeConfig(),
+        writers={"dot": dot_writer, "pdf": GraphvizWriter(dot_writer)},
+        custom_entities=[],
+        custom_relationships=set(),
+    )
+
+
+def test_rows_prefetched() -> None:
+    remote = RemoteReader()
+    rows = api(remote).rows(
+        [
+            (StringIO("key,name\n1,local\n2,local\n"), ".csv"),
+            (StringIO("3"), ".remote"),
+            (StringIO("key,name\n4,local\n"), ".csv"),
+        ]
+    )
+
+    first = next(rows)
+    assert remote.started.wait(timeout=5)
+    remote.local_read.set()
+
+    assert [first, *rows] == [
+        {"key": "1", "name": "local"},
+        {"key": "2", "name": "local"},
+        {"key": "3", "name": "remote"},
+        {"key": "4", "name": "local"},
+    ]
+
+
+def test_unknown_extension() -> None:
+    with pytest.raises(ValueError, match=r"extension '\.txt' \(supported: \.csv, \.remote\)"):
+        list(api(RemoteReader()).rows([(StringIO("1"), ".txt")]))
+
+
+def test_merge_conflicts_reported() -> None:
+    header = "key,name,semester,big_key\n"
+    sources = [
+        (StringIO(header + "1,Sean Shaw,Fall 2010,\n2,Jane Doe,Spring 2011,1\n"), ".csv"),
+        (StringIO(header + "1,Sean Shaw,Fall 2010,\n2,Jane Smith,Spring 2011,1\n"), ".csv"),
+    ]
+    snutree = api(RemoteReader())
+    with pytest.warns(UserWarning, match="invalid family tree structure"):
+        snutree.tree(sources)
+    # Only the key whose entities differed is a duplicate
+    assert snutree.validator.report.duplicate_keys == ["2"]
+
+
+CONFIG = """
+from snutree.api import SnutreeConfig, WritersConfig
+from snutree.model.member.keyed import KeyedMemberParser
+from snutree.model.semester import Semester
+from snutree.model.tree import FamilyTreeConfig
+from {tables} import SEED
+
+__snutree__ = SnutreeConfig(
+    rank_type=Semester,
+    parser=KeyedMemberParser(),
+    tree=FamilyTreeConfig(seed=SEED),
+    writers=WritersConfig(),
+)
+"""
+
+
+def test_configs_loaded_separately(tmp_path: Path, monkeypatch: pytest.MonkeyPatch) -> None:
+    monkeypatch.syspath_prepend(tmp_path)
+    tables = tmp_path / "snutree_test_tables.py"
+    tables.write_text("SEED = 1\n", encoding="utf-8")
+
+    paths = [tmp_path / "a.py", tmp_path / "b.py"]
+    for path in paths:
+        path.write_text(CONFIG.format(tables=tables.stem), encoding="utf-8")
+
+    a, b = (SnutreeConfig.from_path(path) for path in paths)
+    assert a is not b
+    assert a.tree.seed == b.tree.seed == 1
+
+    # Changing the config module loads the changed version
+    paths[0].write_text(CONFIG.format(tables=tables.stem).replace("seed=SEED", "seed=SEED + 1"), encoding="utf-8")
+    assert SnutreeConfig.from_path(paths[0]).tree.seed == 2
+    assert SnutreeConfig.from_path(paths[1]) is not b
+
+
+CACHED_CONFIG = """
+from pathlib import Path
+
+from snutree.api import SnutreeConfig, WritersConfig
+from snutree.cache import static_table
+from snutree.model.member.keyed import KeyedMemberParser
+from snutree.model.semester import Semester
+from snutree.model.tree import FamilyTreeConfig
+from snutree.writer.dot import DotWriterConfig, DynamicNodeAttributesConfig, NodesConfig
+from {tables} import SEED
+
+LOG = Path(__file__).with_suffix(".log")
+with LOG.open("a", encoding="utf-8") as log:
+    log.write("run\\n")
+
+
+def build() -> dict[str, dict[str, str]]:
+    with LOG.open("a", encoding="utf-8") as log:
+        log.write("build\\n")
+    return {{str(key): {{"label": str(key)}} for key in range(1000)}}
+
+
+__snutree__ = SnutreeConfig(
+    rank_type=Semester,
+    parser=KeyedMemberParser(),
+    tree=FamilyTreeConfig(seed=SEED),
+    writers=WritersConfig(
+        dot=DotWriterConfig(node=NodesConfig(attributes=DynamicNodeAttributesConfig({member}by_key=static_table(build))))
+    ),
+)
+"""
+
+
+@pytest.mark.parametrize("member", [False, True])
+def test_config_cached(tmp_path: Path, monkeypatch: pytest.MonkeyPatch, member: bool) -> None:
+    monkeypatch.syspath_prepend(tmp_path)
+    tables = tmp_path / f"snutree_test_tables_{tmp_path.name}.py"
+    tables.write_text("SEED = 1\n", encoding="utf-8")
+    path = tmp_path / "config.py"
+    # A config with a function of its own can only have its static tables cached
+    path.write_text(
+        CACHED_CONFIG.format(tables=tables.stem, member="member=lambda member: {}, " if member else ""),
+        encoding="utf-8",
+    )
+    log = path.with_suffix(".log")
+    cache = ConfigCache(tmp_path / "cache")
+
+    for _ in range(2):
+        config = SnutreeConfig.from_path(path, cache)
+        assert config.tree.seed == 1
+        assert len(config.writers.dot.node.attributes.by_key) == 1000
+    assert log.read_text(encoding="utf-8").split() == (["run", "build", "run"] if member else ["run", "build"])
+
+    # Changing a local import loads the config again (in a new process, which
+    # imports the changed module)
+    log.unlink()
+    tables.write_text("SEED = 2\n", encoding="utf-8")
+    monkeypatch.delitem(sys.modules, tables.stem)
+    assert SnutreeConfig.from_path(path, cache).tree.seed == 2
+    assert log.read_text(encoding="utf-8").split() == ["run", "build"]
+
+
+def test_run_files_native_svg(tmp_path: Path) -> None:
+    dot_writer = DotWriter[Semester, KeyedMember]()
+    snutree = SnutreeApi(
+        rank_type=Semester,
+        readers=[JsonReader()],
+        parser=KeyedMemberParser(),
+        tree_config=FamilyTreeConfig(),
+        writers={
+            "dot": dot_writer,
+            "pdf": GraphvizWriter(dot_writer, command=[sys.executable, "-c", "import sys; sys.exit('no graphviz')"]),
+            "svg": TidyWriter(dot_writer),
+        },
+        custom_entities=[],
+        custom_relationships=set(),
+    )
+    snutree.run_files([EXAMPLE_PATH / "keyed.json"], {"dot": tmp_path / "tree.dot", "svg": tmp_path / "tree.svg"})
+    assert (tmp_path / "tree.dot").read_bytes().startswith(b"digraph")
+    assert (tmp_path / "tree.svg").read_bytes().startswith(b"<?xml")
@@ -0,0 +1,247 @@
+import os
+import subprocess
+import sys
+from collections.abc import Iterable, Set
+from dataclasses import dataclass, replace
+from pathlib import Path
+from typing import IO
+
+import pytest
+
+from snutree.api import SnutreeApi
+from snutree.cache import EntityCache, EntityCacheConfig
+from snutree.model.entity import Entity, EntityId
+from snutree.model.member.keyed import KeyedMember, KeyedMemberParser
+from snutree.model.rank import RankFilter, RankWindow
+from snutree.model.semester import Semester
+from snutree.model.tree import FamilyTreeConfig
+from snutree.reader.csv import CsvReader
+from snutree.writer.dot import DotWriter
+from snutree.writer.graphviz import GraphvizWriter
+
+
+@dataclass
+class CountingCsvReader(CsvReader):
+    reads: int = 0
+
+    def read(
+        self,
+        stream: IO[str],
+        row_filter: RankFilter | None = None,
+        columns: Set[str] | None = None,
+    ) -> Iterable[dict[str, str]]:
+        self.reads += 1
+        return super().read(stream, row_filter, columns)
+
+
+def api(
+    reader: CsvReader,
+    cache: Path,
+    refresh: bool = False,
+    incremental: bool = False,
+) -> SnutreeApi[Semester, KeyedMember]:
+    dot_writer = DotWriter[Semester, KeyedMember]()
+    return SnutreeApi(
+        rank_type=Semester,
+        readers=[reader],
+        parser=KeyedMemberParser(),
+        tree_config=FamilyTreeConfig(),
+        writers={"dot": dot_writer, "pdf": GraphvizWriter(dot_writer)},
+        custom_entities=[],
+        custom_relationships=set(),
+        entity_cache=EntityCache(EntityCacheConfig(cache, incremental)),
+        refresh=refresh,
+    )
+
+
+def test_entities_cached(tmp_path: Path) -> None:
+    path = tmp_path / "members.csv"
+    path.write_text("key,name,semester,big_key\n1,Sean Shaw,Fall 2010,\n2,Jane Doe,Spring 2011,1\n")
+    reader = CountingCsvReader()
+
+    expected = list(api(reader, tmp_path / "cache").entities([path]))
+    assert list(api(reader, tmp_path / "cache").entities([path])) == expected
+    assert reader.reads == 1
+
+    assert list(api(reader, tmp_path / "cache", refresh=True).entities([path])) == expected
+    assert reader.reads == 2
+
+    path.write_text("key,name,semester,big_key\n1,Sean Shaw,Fall 2010,\n")
+    assert list(api(reader, tmp_path / "cache").entities([path])) == expected[:1]
+    assert reader.reads == 3
+
+
+KEY_SCRIPT = """
+from pathlib import Path
+from snutree.cache import EntityCache, EntityCacheConfig
+from snutree.model.member.keyed import KeyedMemberParser
+from snutree.model.rank import RankFilter, RankWindow
+from snutree.model.semester import Semester
+from snutree.reader.csv import CsvReader
+
+row_filter = RankFilter(Semester, "semester", RankWindow(1, 2), keep={"status": frozenset("abcdefgh")})
+columns = KeyedMemberParser.columns | row_filter.columns
+print(EntityCache(EntityCacheConfig(Path())).key(b"content", CsvReader, KeyedMemberParser(), row_filter, columns))
+"""
+
+
+def test_key_stable_across_processes() -> None:
+    keys = {
+        subprocess.run(
+            [sys.executable, "-c", KEY_SCRIPT],
+            env={**os.environ, "PYTHONHASHSEED": str(seed)},
+            capture_output=True,
+            check=True,
+            text=True,
+        ).stdout
+        for seed in range(4)
+    }
+    assert len(keys) == 1
+
+
+def test_key_without_canonical_encoding(tmp_path: Path) -> None:
+    cache = EntityCache(EntityCacheConfig(tmp_path))
+    assert cache.key(b"content", RankFilter(lambda value: 0, "semester", RankWindow())) is None
+    assert cache.key(b"content", object()) is None
+
+
+def test_file_key(tmp_path: Path, monkeypatch: pytest.MonkeyPatch) -> None:
+    cache = EntityCache(EntityCacheConfig(tmp_path))
+    path = tmp_path / "input.csv"
+    path.write_bytes(b"content" * 100_000)
+
+    def read_bytes(_: Path) -> bytes:
+        raise AssertionError("the file is read into memory whole")
+
+    monkeypatch.setattr(Path, "read_bytes", read_bytes)
+    assert cache.file_key(path, "parser") == cache.key(b"content" * 100_000, "parser")
+
+
+def test_lru_eviction(tmp_path: Path) -> None:
+    cache = EntityCache(EntityCacheConfig(tmp_path))
+    cache.store("a", list(range(1000)))
+    size = cache.path("a").stat().st_size
+    cache = EntityCache(EntityCacheConfig(tmp_path, max_bytes=2 * size))
+
+    os.utime(cache.path("a"), (0, 0))
+    cache.store("b", list(range(1000)))
+    os.utime(cache.path("b"), (1, 1))
+    assert cache.load("a") is not None  # Now the most recently used
+    cache.store("c", list(range(1000)))
+
+    assert cache.load("a") is not None
+    assert cache.load("b") is None
+    assert cache.load("c") is not None
+
+
+def test_unreadable_entry_missed(tmp_path: Path) -> None:
+    cache = EntityCache(EntityCacheConfig(tmp_path))
+    key = cache.key(b"content", "parser")
+    assert key is not None
+    cache.path(key).write_bytes(b"not a pickle")
+    assert cache.get(key) is None
+
+
+@dataclass
+class CountingParser(KeyedMemberParser):
+    parsed: int = 0
+
+    def parse(self, rows: Iterable[dict[str, str]]) -> Iterable[Entity[Semester, KeyedMember]]:
+        for row in rows:
+            self.parsed += 1
+            yield from super().parse([row])
+
+
+def test_entities_ingested_incrementally(tmp_path: Path) -> None:
+    path = tmp_path / "members.csv"
+    header = "key,name,semester,big_key\n"
+    path.write_text(header + "1,Sean Shaw,Fall 2010,\n2,Jane Doe,Spring 2011,1\n3,John Doe,Fall 2011,1\n")
+
+    def ingest() -> tuple[list[Entity[Semester, KeyedMember]], int]:
+        parser = CountingParser()
+        incremental = api(CsvReader(), tmp_path / "cache", incremental=True)
+        incremental.parser = parser
+        return list(incremental.entities([path])), parser.parsed
+
+    assert ingest()[1] == 3
+
+    # One row changed, one removed, and one added
+    path.write_text(header + "1,Sean Shaw,Fall 2010,\n2,Jane Smith,Spring 2011,1\n4,Jim Doe,Spring 2012,2\n")
+    entities, parsed = ingest()
+    assert parsed == 2
+    with path.open() as f:
+        assert entities == list(KeyedMemberParser().parse(CsvReader().read(f)))
+
+
+@dataclass
+class NumberingParser(KeyedMemberParser):
+    """
+    Keys members by their position among all members parsed so far.
+    """
+
+    last_key: int = -1
+
+    def save_state(self) -> int:
+        return self.last_key
+
+    def restore_state(self, state: object) -> None:
+        assert isinstance(state, int)
+        self.last_key = state
+
+    def parse(self, rows: Iterable[dict[str, str]]) -> Iterable[Entity[Semester, KeyedMember]]:
+        for entity in super().parse(rows):
+            self.last_key += 1
+            yield replace(entity, key=EntityId(f"Member {self.last_key}"))
+
+
+def test_parser_state_restored(tmp_path: Path) -> None:
+    header = "key,name,semester,big_key\n"
+    first, second = tmp_path / "first.csv", tmp_path / "second.csv"
+    first.write_text(header + "1,Sean Shaw,Fall 2010,\n2,Jane Doe,Spring 2011,1\n")
+    second.write_text(header + "3,John Doe,Fall 2011,1\n")
+
+    def keys() -> list[str]:
+        numbering = api(CsvReader(), tmp_path / "cache")
+        numbering.parser = NumberingParser()
+        return [entity.key for entity in numbering.entities([first, second])]
+
+    assert keys() == ["Member 0", "Member 1", "Member 2"]
+
+    # The first file's entities come from the cache, and the second file is
+    # parsed again from where the first left off
+    second.write_text(header + "3,John Doe,Fall 2011,1\n4,Jim Doe,Spring 2012,3\n")
+    assert keys() == ["Member 0", "Member 1", "Member 2", "Member 3"]
+
+
+INGEST_SCRIPT = """
+import sys
+from pathlib import Path
+from tests.test_cache import CountingParser, api
+from snutree.reader.csv import CsvReader
+
+incremental = api(CsvReader(), Path(sys.argv[1]) / "cache", incremental=True)
+incremental.parser = parser = CountingParser()
+list(incremental.entities([Path(sys.argv[1]) / "members.csv"]))
+print(parser.parsed)
+"""
+
+
+def test_entities_ingested_across_processes(tmp_path: Path) -> None:
+    path = tmp_path / "members.csv"
+    header = "key,name,semester,big_key\n"
+
+    def ingest(seed: int) -> int:
+        result = subprocess.run(
+            [sys.executable, "-c", INGEST_SCRIPT, str(tmp_path)],
+            cwd=Path(__file__).parents[1],
+            env={**os.environ, "PYTHONHASHSEED": str(seed)},
+            capture_output=True,
+            check=True,
+            text=True,
+        )
+        return int(result.stdout)
+
+    path.write_text(header + "1,Sean Shaw,Fall 2010,\n2,Jane Doe,Spring 2011,1\n")
+    assert ingest(1) == 2
+    path.write_text(header + "1,Sean Shaw,Fall 2010,\n2,Jane Doe,Spring 2011,1\n3,John Doe,Fall 2011,1\n")
+    assert ingest(2) == 1
@@ -0,0 +1,63 @@
+import sys
+from io import StringIO
+from pathlib import Path
+
+import pytest
+
+from snutree.cli import main
+
+ROOT_PATH = Path(__file__).parents[1]
+
+EXAMPLE_PATH = ROOT_PATH / "examples" / "keyed"
+
+
+def test_stdin(monkeypatch: pytest.MonkeyPatch, capsysbinary: pytest.CaptureFixture[bytes]) -> None:
+    config = str(EXAMPLE_PATH / "config.py")
+    input_path = str(EXAMPLE_PATH / "keyed.json")
+
+    monkeypatch.setattr(sys, "argv", ["snutree", "-c", config, "-f", "dot", input_path])
+    main()
+    expected = capsysbinary.readouterr().out
+
+    monkeypatch.setattr(sys, "argv", ["snutree", "-c", config, "-f", "dot", "-i", "json", "-"])
+    monkeypatch.setattr(sys, "stdin", StringIO(Path(input_path).read_text(encoding="utf-8")))
+    main()
+    assert capsysbinary.readouterr().out == expected
+
+
+def test_stdin_requires_format(monkeypatch: pytest.MonkeyPatch) -> None:
+    monkeypatch.setattr(sys, "argv", ["snutree", "-c", str(EXAMPLE_PATH / "config.py"), "-f", "dot", "-"])
+    with pytest.raises(SystemExit):
+        main()
+
+
+def test_output_file(
+    monkeypatch: pytest.MonkeyPatch,
+    capsysbinary: pytest.CaptureFixture[bytes],
+    tmp_path: Path,
+) -> None:
+    config = str(EXAMPLE_PATH / "config.py")
+    input_path = str(EXAMPLE_PATH / "keyed.json")
+
+    monkeypatch.setattr(sys, "argv", ["snutree", "-c", config, "-f", "dot", "-o", str(tmp_path / "tree"), input_path])
+    main()
+    assert not capsysbinary.readouterr().out
+    assert (tmp_path / "tree.dot").read_bytes() == (EXAMPLE_PATH / "keyed.dot").read_bytes()
+
+
+def test_formats_require_output(monkeypatch: pytest.MonkeyPatch) -> None:
+    config = str(EXAMPLE_PATH / "config.py")
+    monkeypatch.setattr(
+        sys, "argv", ["snutree", "-c", config, "-f", "pdf", "-f", "svg", str(EXAMPLE_PATH / "keyed.json")]
+    )
+    with pytest.raises(SystemExit):
+        main()
+
+
+def test_seed_search_format_requires_output(monkeypatch: pytest.MonkeyPatch) -> None:
+    config = str(EXAMPLE_PATH / "config.py")
+    monkeypatch.setattr(
+        sys, "argv", ["snutree", "seed-search", "-c", config, "-f", "pdf", str(EXAMPLE_PATH / "keyed.json")]
+    )
+    with pytest.raises(SystemExit):
+        main()
@@ -0,0 +1,47 @@
+import re
+import subprocess
+import sys
+
+# Modules that are slow to import and only needed by some runs, so that they
+# must only be imported once they're actually used
+DEFERRED_MODULES = {
+    "MySQLdb",
+    "sshtunnel",
+    "paramiko",
+    "pydantic",
+    "snutree.arguments",
+    "snutree.seeds",
+    "snutree.writer.graphviz",
+    "snutree.writer.tidy",
+}
+
+# Microseconds that importing the CLI may take in total, just above the time it
+# takes (about 375 ms, most of it in networkx)
+BUDGET = 450_000
+
+IMPORT_TIME = re.compile(r"import time:\s*(?P<self>\d+) \|\s*(?P<cumulative>\d+) \| (?P<module>.+)")
+
+
+def import_times(module: str) -> dict[str, int]:
+    """
+    Return the cumulative time in microseconds taken to import each module
+    imported along with the given module, as reported by `-X importtime`.
+    """
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        capture_output=True,
+        check=True,
+        text=True,
+    )
+    times: dict[str, int] = {}
+    for line in result.stderr.splitlines():
+        if match := IMPORT_TIME.fullmatch(line):
+            times[match["module"].strip()] = int(match["cumulative"])  # type: ignore[misc]
+    return times
+
+
+def test_cli_import_time() -> None:
+    times = import_times("snutree.cli")
+    imported = {".".join(name.split(".")[:depth]) for name in times for depth in range(1, name.count(".") + 2)}
+    assert not DEFERRED_MODULES & imported
+    assert times["snutree.cli"] <= BUDGET
@@ -0,0 +1,51 @@
+import time
+from collections.abc import Iterator
+
+import pytest
+
+from snutree.ingest import IngestConfig, ReadMode, RowSource, ingest
+
+MODES = [ReadMode.PREFETCH, ReadMode.BACKGROUND, ReadMode.FOREGROUND, ReadMode.BACKGROUND]
+
+
+def numbered(name: str, count: int, read: list[int] | None = None) -> RowSource:
+    def rows() -> Iterator[dict[str, str]]:
+        for i in range(count):
+            if read is not None:
+                read.append(i)
+            yield {"name": name, "number": str(i)}
+
+    return rows
+
+
+@pytest.mark.parametrize("workers", [1, 2, 8])
+@pytest.mark.parametrize("modes", [MODES, MODES[::-1], [ReadMode.PREFETCH] * 4])
+def test_ingest_ordered(workers: int, modes: list[ReadMode]) -> None:
+    reads = [(numbered(name, 50), mode) for name, mode in zip("abcd", modes)]
+    with ingest(reads, IngestConfig(workers=workers, queue_size=3)) as sources:
+        rows = [row for source in sources for row in source()]
+    assert rows == [row for read, _ in reads for row in read()]
+
+
+@pytest.mark.parametrize("mode", [ReadMode.PREFETCH, ReadMode.BACKGROUND])
+def test_ingest_bounded(mode: ReadMode) -> None:
+    read: list[int] = []
+    with ingest([(numbered("a", 100, read), mode)], IngestConfig(queue_size=5)) as (source,):
+        rows = source()
+        assert next(rows) == {"name": "a", "number": "0"}
+        time.sleep(0.2)
+        # One row taken, five queued, and one waiting for room in the queue
+        assert len(read) == 7
+    assert len(read) < 100
+
+
+def test_ingest_failure() -> None:
+    def failing() -> Iterator[dict[str, str]]:
+        yield {"name": "a"}
+        raise ValueError("unreadable")
+
+    with ingest([(failing, ReadMode.BACKGROUND)], IngestConfig()) as (source,):
+        rows = source()
+        assert next(rows) == {"name": "a"}
+        with pytest.raises(ValueError, match="unreadable"):
+            next(rows)
@@ -0,0 +1,147 @@
+import sys
+
+import pytest
+
+from snutree.model.entity import Entity, EntityId, ParentKeyStatus
+from snutree.model.tree import FamilyTree, FamilyTreeConfig
+from snutree.seeds import (
+    LayoutScore,
+    SeedSearch,
+    crossings,
+    inversions,
+    leaderboard,
+    score_layout,
+)
+from snutree.writer.dot import DotWriter
+from snutree.writer.graphviz import (
+    GraphvizWriter,
+    GraphvizWriterConfig,
+    LayoutPolicy,
+    LayoutStrategy,
+    LayoutTier,
+)
+
+LAYOUT = """
+digraph "tree" {
+    graph [bb="0,0,200,100"];
+    a [pos="0,100"];
+    b [pos="100,100"];
+    c [pos="0,0"];
+    d [pos="100,0"];
+    e [pos="200,0"];
+    a -> d;
+    b -> c;
+    b -> e;
+}
+"""
+
+
+def test_inversions() -> None:
+    values = [3.0, 1.0, 2.0, 0.0]
+    assert inversions(values) == 5
+    assert values == [0.0, 1.0, 2.0, 3.0]
+
+
+def test_crossings() -> None:
+    assert crossings([((0, 0), (10, 10)), ((10, 0), (0, 10))]) == 1
+    assert crossings([((0, 0), (10, 10)), ((0, 0), (0, 10))]) == 0
+    assert crossings([((0, 0), (0, 10)), ((10, 0), (10, 10))]) == 0
+
+    # Crossing below a level that only one of the segments has an end on
+    assert crossings([((0, 0), (20, 20)), ((20, 0), (20, 5)), ((20, 5), (0, 20))]) == 1
+
+    # Crossings in the middle of a segment that spans several levels aren't counted
+    assert crossings([((0, 0), (0, 30)), ((-5, 10), (5, 20))]) == 0
+
+
+def test_score_layout() -> None:
+    score = score_layout(7, LAYOUT)
+    assert score.seed == 7
+    assert score.crossings == 1
+    assert score.edge_length == pytest.approx(3 * 100 * 2**0.5)
+    assert score.area == 200 * 100
+
+
+LAYOUT_LR = """
+digraph "tree" {
+    graph [bb="0,0,100,30", rankdir=LR];
+    a [pos="0,0"];
+    b [pos="0,30"];
+    c [pos="100,0"];
+    d [pos="100,30"];
+    e [pos="0,10"];
+    f [pos="100,10"];
+    g [pos="0,20"];
+    h [pos="100,20"];
+    a -> d;
+    b -> c;
+    e -> f;
+    g -> h;
+}
+"""
+
+
+def test_score_layout_sideways() -> None:
+    # Crossings are counted between the ranks, which are on the x-axis
+    assert score_layout(7, LAYOUT_LR).crossings == 5
+
+
+def test_leaderboard() -> None:
+    scores = [LayoutScore(0, 10.0, 100.0, 3), LayoutScore(1, 5.0, 50.0, 4)]
+    lines = leaderboard(sorted(scores), top=1).splitlines()
+    assert len(lines) == 2
+    assert lines[1].split() == ["1", "3", "0", "10", "100"]
+
+
+def tree(seed: int) -> FamilyTree[int, None]:
+    return FamilyTree[int, None](
+        rank_type=int,
+        entities=[
+            Entity(EntityId("2"), EntityId("1"), 2, None),
+            Entity(ParentKeyStatus.NONE, EntityId("2"), 1, None),
+        ],
+        relationships=set(),
+        config=FamilyTreeConfig(seed=seed),
+    )
+
+
+def test_search() -> None:
+    # Stands in for Graphviz by copying the DOT straight through, unlaid out
+    search = SeedSearch(
+        DotWriter[int, None](),
+        command=[sys.executable, "-c", "import shutil, sys; shutil.copyfileobj(sys.stdin.buffer, sys.stdout.buffer)"],
+        workers=2,
+    )
+    scores = search.search(tree(seed) for seed in range(5))
+    assert [score.seed for score in scores] == [0, 1, 2, 3, 4]
+
+
+def test_search_out_of_time() -> None:
+    search = SeedSearch(
+        DotWriter[int, None](),
+        command=[sys.executable, "-c", "import time; time.sleep(60)"],
+        workers=2,
+        budget=0.5,
+    )
+    assert not search.search(tree(seed) for seed in range(3))
+
+
+def test_search_like_writer() -> None:
+    # Stands in for Graphviz only when given the engine of the policy's first strategy
+    command = [
+        sys.executable,
+        "-c",
+        "import shutil, sys; assert '-Kneato' in sys.argv; shutil.copyfileobj(sys.stdin.buffer, sys.stdout.buffer)",
+    ]
+    policy = LayoutPolicy([LayoutTier(None, [LayoutStrategy("neato"), LayoutStrategy("sfdp")])], budget=10)
+    writer = GraphvizWriter(DotWriter[int, None](), command=command, config=GraphvizWriterConfig(policy=policy))
+    search = SeedSearch.like(writer, workers=2)
+    assert [score.seed for score in search.search(tree(seed) for seed in range(2))] == [0, 1]
+
+    # The best seed is rendered without falling back to any other strategy
+    rendered = search.writer("svg")
+    assert rendered.command == command
+    assert rendered.output_format == "svg"
+    assert rendered.config.policy is not None
+    assert rendered.config.policy.strategies(2) == [LayoutStrategy("neato")]
+    assert rendered.config.policy.budget is None
@@ -1,21 +1,28 @@
 from collections.abc import Callable
 from dataclasses import dataclass
+from itertools import islice
 from unittest.mock import patch
 
 import pytest
 
 from snutree.tool.dot import (
+    UNQUOTED_ID,
     Attribute,
+    AttributeStrings,
     Component,
     Digraph,
     Edge,
     EdgeOp,
     Graph,
+    Id,
     Node,
+    RenderedStatement,
     Statement,
     StrictDigraph,
     StrictGraph,
     Subgraph,
+    factor_defaults,
+    short_ids,
 )
 from tests.conftest import TestCase, trim
 
@@ -340,3 +347,53 @@ def test_dot() -> None:
         }
         """
     )
+
+
+def test_rendered_statements() -> None:
+    attributes = AttributeStrings()
+    node = RenderedStatement.component(["Key One"], attributes({"label": "A Label", "color": "piss yellow"}))
+    edge = RenderedStatement.component(["Key One", "Key Two"], attributes({}))
+    assert list(node.block.lines(0)) == list(Node("Key One", label="A Label", color="piss yellow").block.lines(0))
+    assert list(edge.block.lines(0)) == list(Edge("Key One", "Key Two").block.lines(0))
+    assert len(attributes.rendered) == 2
+    attributes({"label": "A Label", "color": "piss yellow"})
+    assert len(attributes.rendered) == 2
+
+
+def test_rendered_attributes_by_type() -> None:
+    attributes = AttributeStrings()
+    assert attributes({"width": 1}) == "width=1"
+    assert attributes({"width": 1.0}) == "width=1.0"
+    assert attributes({"width": True}) == "width=True"
+
+
+def test_rendered_attributes_limited() -> None:
+    attributes = AttributeStrings(limit=3)
+    for i in range(10):
+        assert attributes({"label": i}) == f"label={i}"
+        assert len(attributes.rendered) <= 3
+
+
+def test_short_ids() -> None:
+    ids = list(islice(short_ids(), 200_000))
+    assert ids[:3] == ["a", "b", "c"]
+    assert len(set(ids)) == len(ids)
+    assert all(UNQUOTED_ID.fullmatch(identifier) for identifier in ids)
+    assert not {"node", "edge", "Node", "EDGE"} & set(ids)
+
+
+def test_factor_defaults() -> None:
+    attributes: list[dict[str, Id]] = [
+        {"shape": "box", "color": "red", "label": "A"},
+        {"shape": "box", "color": "blue"},
+        {"shape": "box"},
+        {"color": "red", "label": "B"},
+    ]
+    defaults = factor_defaults(attributes, {"shape": "ellipse"})
+    assert defaults == {"shape": "box"}
+    assert attributes == [
+        {"color": "red", "label": "A"},
+        {"color": "blue"},
+        {},
+        {"color": "red", "label": "B", "shape": "ellipse"},
+    ]
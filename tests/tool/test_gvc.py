@@ -0,0 +1,53 @@
+import ctypes
+from pathlib import Path
+
+import pytest
+
+from snutree.tool import gvc
+from snutree.tool.gvc import GvcError, length_type, load_gvc
+
+DOT = b'digraph { "a" -> "b"; }'
+
+
+@pytest.fixture(name="library")
+def fixture_library() -> gvc.Gvc:
+    library = load_gvc()
+    if library is None:
+        pytest.skip("the Graphviz C library is not installed")
+    return library
+
+
+def test_load_missing(monkeypatch: pytest.MonkeyPatch) -> None:
+    def find_library(_: str) -> None:
+        return None
+
+    monkeypatch.setattr(gvc, "find_library", find_library)
+    load_gvc.cache_clear()
+    try:
+        assert load_gvc() is None
+    finally:
+        load_gvc.cache_clear()
+
+
+def test_render(library: gvc.Gvc) -> None:
+    assert library.render(DOT, "svg").lstrip().startswith(b"<?xml")
+    assert library.render(DOT, "pdf").startswith(b"%PDF")
+
+
+@pytest.mark.parametrize(
+    "version, expected",
+    [("2.43.0", ctypes.c_uint), ("3.0.0", ctypes.c_size_t), ("12.2.1~dev", ctypes.c_size_t), ("", ctypes.c_size_t)],
+)
+def test_length_type(version: str, expected: gvc.Length) -> None:
+    assert length_type(version) is expected
+
+
+def test_render_length(library: gvc.Gvc, tmp_path: Path) -> None:
+    # The data rendered in memory is exactly what is rendered to a file
+    library.render_files(DOT, [("svg", tmp_path / "tree.svg")])
+    assert library.render(DOT, "svg") == (tmp_path / "tree.svg").read_bytes()
+
+
+def test_render_invalid(library: gvc.Gvc) -> None:
+    with pytest.raises(GvcError):
+        library.render(b"digraph {", "svg")
@@ -0,0 +1,90 @@
+from pathlib import Path
+
+import pytest
+
+from snutree.tool.layout import DotContents, IncrementalLayout, tokens
+
+LAYOUT = """
+digraph "tree" {
+    graph [bb="0,0,100,100"];
+    node [label="\\N"];
+    subgraph "members" {
+        "a" [label=<<b>A</b>>, pos="10,90"];
+        "b c" [pos="10,50!"];
+        "a" -> "b c" [pos="e,10,60 10,80"];
+    }
+    subgraph {
+        rank=same;
+        "a";
+    }
+}
+"""
+
+
+def test_tokens() -> None:
+    assert list(tokens('"a \\"b\\"" -> c [label=<x<br/>y>];')) == [
+        ("quoted", 'a "b"'),
+        ("edge_op", "->"),
+        ("id", "c"),
+        ("punctuation", "["),
+        ("id", "label"),
+        ("punctuation", "="),
+        ("id", "<x<br/>y>"),
+        ("punctuation", "]"),
+        ("punctuation", ";"),
+    ]
+
+
+def test_read() -> None:
+    contents = DotContents.read(LAYOUT)
+    assert contents.nodes == {"a": {"label": "<<b>A</b>>", "pos": "10,90"}, "b c": {"pos": "10,50!"}}
+    assert contents.edges == [("a", "b c")]
+    assert contents.positions() == {"a": (10.0, 90.0), "b c": (10.0, 50.0)}
+
+
+def test_prepare_without_layout(tmp_path: Path) -> None:
+    dot = b'digraph { "a" -> "b"; }\n'
+    assert IncrementalLayout(tmp_path / "layout.dot").prepare(dot) == ([], dot)
+
+
+@pytest.mark.parametrize(
+    ("dot", "arguments", "pins"),
+    [
+        (
+            'digraph {\n    "a" -> "b c";\n}\n',
+            ["-Kneato", "-n2", "-Gnotranslate=true"],
+            ['"a" [pos="10.0,90.0!"];', '"b c" [pos="10.0,50.0!"];'],
+        ),
+        (
+            'digraph {\n    "a" -> "b c";\n    "b c" -> "d";\n}\n',
+            ["-Kneato", "-Ginputscale=72", "-Gnotranslate=true"],
+            ['"a" [pos="10.0,90.0!"];', '"b c" [pos="10.0,50.0!"];', '"d" [pos="10.0,-22.0"];'],
+        ),
+    ],
+)
+def test_prepare(tmp_path: Path, dot: str, arguments: list[str], pins: list[str]) -> None:
+    (tmp_path / "layout.dot").write_text(LAYOUT, encoding="utf-8")
+    layout = IncrementalLayout(tmp_path / "layout.dot", threshold=0.5)
+    assert layout.prepare(dot.encode()) == (
+        arguments,
+        "\n".join([dot.rstrip().removesuffix("}").rstrip(), *pins, "}\n"]).encode(),
+    )
+
+
+def test_prepare_too_many_new(tmp_path: Path) -> None:
+    (tmp_path / "layout.dot").write_text(LAYOUT, encoding="utf-8")
+    dot = b'digraph { "a" -> "d"; "e" -> "f"; }\n'
+    assert IncrementalLayout(tmp_path / "layout.dot").prepare(dot) == ([], dot)
+
+
+def test_saving(tmp_path: Path) -> None:
+    layout = IncrementalLayout(tmp_path / "layout.dot")
+    with layout.saving() as saved:
+        saved.write_text("new", encoding="utf-8")
+    assert layout.path.read_text(encoding="utf-8") == "new"
+
+    with pytest.raises(RuntimeError), layout.saving() as saved:
+        saved.write_text("failed", encoding="utf-8")
+        raise RuntimeError()
+    assert layout.path.read_text(encoding="utf-8") == "new"
+    assert not saved.exists()
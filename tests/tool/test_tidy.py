@@ -0,0 +1,51 @@
+from snutree.tool.tidy import Contour, TidyLayout
+
+
+def test_contour_merge() -> None:
+    left = Contour({0: -1.0, 1: -3.0}, {0: 1.0, 1: 3.0})
+    right = Contour({1: -1.0, 2: -5.0}, {1: 1.0, 2: 5.0})
+    shift = left.gap(right, 2.0)
+    assert shift == 6.0
+
+    merged = left.merge(right, shift)
+    assert {level: value + merged.offset for level, value in merged.left.items()} == {0: -1.0, 1: -3.0, 2: 1.0}
+    assert {level: value + merged.offset for level, value in merged.right.items()} == {0: 1.0, 1: 7.0, 2: 11.0}
+
+
+def test_positions() -> None:
+    layout = TidyLayout(
+        levels={"a": 0, "b": 1, "c": 1, "d": 2, "e": 0},
+        widths={"a": 10.0, "b": 10.0, "c": 10.0, "d": 30.0, "e": 10.0},
+        children={"a": ["b", "c"], "c": ["d"]},
+        separation=10.0,
+    )
+    assert layout.positions(["a", "e"]) == {
+        "a": 15.0,
+        "b": 5.0,
+        "c": 25.0,
+        "d": 25.0,
+        # Placed beside a, since the two trees don't overlap below a
+        "e": 35.0,
+    }
+
+
+def test_positions_skip_levels() -> None:
+    layout = TidyLayout(
+        levels={"a": 0, "b": 3, "c": 1},
+        widths={"a": 10.0, "b": 10.0, "c": 10.0},
+        children={"a": ["b", "c"]},
+        separation=10.0,
+    )
+    positions = layout.positions(["a"])
+    assert positions["b"] < positions["a"] < positions["c"]
+
+
+def test_positions_same_level() -> None:
+    layout = TidyLayout(
+        levels={"a": 0, "b": 1, "c": 0, "d": 1},
+        widths={"a": 10.0, "b": 10.0, "c": 10.0, "d": 10.0},
+        children={"a": ["b", "c"], "c": ["d"]},
+        separation=10.0,
+    )
+    # The child on its parent's level is beside it, with its own child under it
+    assert layout.positions(["a"]) == {"a": 5.0, "b": 5.0, "c": 25.0, "d": 25.0}
@@ -2,7 +2,7 @@ from dataclasses import dataclass
 
 from snutree.model.entity import Entity, EntityId, ParentKeyStatus
 from snutree.model.tree import FamilyTree, FamilyTreeConfig
-from snutree.tool.dot import Edge, Node
+from snutree.tool.dot import Edge, Id, Node
 from snutree.writer.dot import (
     DotWriter,
     DotWriterConfig,
@@ -112,3 +112,131 @@ def test_write_family_tree() -> None:
     )
 
     assert str(dot) == expected, str(dot)
+
+
+def test_write_minimized_family_tree() -> None:
+    tree = FamilyTree[int, BasicDotMember](
+        rank_type=int,
+        entities=[
+            Entity(EntityId("Candidate 50"), EntityId("Candidate 100"), 2, BasicDotMember()),
+            Entity(ParentKeyStatus.NONE, EntityId("Candidate 50"), 1, BasicDotMember()),
+            Entity(ParentKeyStatus.NONE, EntityId("Candidate 51"), 1, BasicDotMember()),
+        ],
+        relationships=set(),
+        config=FamilyTreeConfig(
+            rank_min_offset=0,
+            rank_max_offset=0,
+        ),
+    )
+
+    writer = DotWriter(
+        DotWriterConfig[int, BasicDotMember](
+            minimize=True,
+            edge=EdgesConfig(
+                custom=[Edge("Candidate 51", "Candidate 50", color="red")],
+            ),
+            node=NodesConfig(
+                attributes=DynamicNodeAttributesConfig(
+                    member=lambda _: {"style": "filled", "fillcolor": "gray"},
+                    by_key={"Candidate 51": {"label": "Fifty-one"}},
+                ),
+            ),
+        ),
+    )
+
+    expected = trim(
+        """
+        digraph "family_tree" {
+        subgraph "datesL" {
+        a[label="1L"];
+        b[label="2L"];
+        a->b;
+        }
+        subgraph "members" {
+        node[fillcolor=gray,style=filled];
+        c[label="Candidate 100"];
+        d[label="Candidate 50"];
+        e[label="Fifty-one"];
+        d->c;
+        e->d[color=red];
+        }
+        subgraph "datesR" {
+        f[label="1R"];
+        g[label="2R"];
+        f->g;
+        }
+        subgraph "ranks" {
+        subgraph {
+        rank="same";
+        a;
+        f;
+        d;
+        e;
+        }
+        subgraph {
+        rank="same";
+        b;
+        g;
+        c;
+        }
+        }
+        }
+        """
+    )
+
+    assert writer.write(tree).decode() == expected
+
+
+def test_minimized_size() -> None:
+    tree = FamilyTree[int, BasicDotMember](
+        rank_type=int,
+        entities=[
+            Entity(
+                EntityId(f"Candidate {i // 2} Parent") if i > 1 else ParentKeyStatus.NONE,
+                EntityId(f"Candidate {i} Parent"),
+                i.bit_length(),
+                BasicDotMember(),
+            )
+            for i in range(1, 500)
+        ],
+        relationships=set(),
+    )
+
+    def write(minimize: bool) -> bytes:
+        return DotWriter(
+            DotWriterConfig[int, BasicDotMember](
+                minimize=minimize,
+                node=NodesConfig(
+                    attributes=DynamicNodeAttributesConfig(
+                        member=lambda _: {"style": "filled", "fillcolor": "#d3d3d3", "shape": "box"},
+                    ),
+                ),
+            ),
+        ).write(tree)
+
+    assert 2 * len(write(minimize=True)) <= len(write(minimize=False))
+
+
+def test_write_streams_entities() -> None:
+    tree = FamilyTree[int, BasicDotMember](
+        rank_type=int,
+        entities=[Entity(ParentKeyStatus.NONE, EntityId(f"Member {i}"), 1, BasicDotMember()) for i in range(100)],
+        relationships=set(),
+    )
+
+    labeled: list[int] = []
+
+    def label(_: BasicDotMember) -> dict[str, Id]:
+        labeled.append(len(labeled))
+        return {"label": "member"}
+
+    writer = DotWriter(
+        DotWriterConfig[int, BasicDotMember](
+            draw_ranks=False,
+            node=NodesConfig(attributes=DynamicNodeAttributesConfig(member=label)),
+        )
+    )
+
+    # Nodes labeled by the time each line of the members is written
+    written = [len(labeled) for line in writer.write_family_tree(tree).lines() if '"Member ' in line]
+    assert written == list(range(1, 101))
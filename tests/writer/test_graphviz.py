@@ -0,0 +1,214 @@
+import sys
+from dataclasses import dataclass, field
+from io import BytesIO
+from pathlib import Path
+
+import pytest
+
+from snutree.model.entity import Entity, EntityId, ParentKeyStatus
+from snutree.model.tree import FamilyTree
+from snutree.tool.dot import Id
+from snutree.tool.layout import DotContents
+from snutree.writer import graphviz
+from snutree.writer.dot import (
+    DotWriter,
+    DotWriterConfig,
+    DynamicNodeAttributesConfig,
+    NodesConfig,
+)
+from snutree.writer.graphviz import (
+    SFDP,
+    GraphvizError,
+    GraphvizTimeoutError,
+    GraphvizWriter,
+    GraphvizWriterConfig,
+    LayoutPolicy,
+    LayoutStrategy,
+    LayoutTier,
+)
+
+# Stands in for Graphviz by writing "<format>:<DOT>" to each output, reading
+# the DOT from the file given or from standard input
+FAKE_DOT = """
+import sys
+arguments = sys.argv[1:]
+if len(arguments) % 4:
+    with open(arguments.pop(), "rb") as f:
+        dot = f.read()
+else:
+    dot = sys.stdin.buffer.read()
+for i in range(0, len(arguments), 4):
+    _, output_format, _, path = arguments[i : i + 4]
+    with open(path, "wb") as f:
+        f.write(output_format.encode() + b":" + dot)
+"""
+
+
+def tree() -> FamilyTree[int, None]:
+    return FamilyTree[int, None](
+        rank_type=int,
+        entities=[
+            Entity(EntityId("2"), EntityId("1"), 2, None),
+            Entity(ParentKeyStatus.NONE, EntityId("2"), 1, None),
+        ],
+        relationships=set(),
+    )
+
+
+def test_write_streams_through_command() -> None:
+    # Stands in for Graphviz by copying the DOT straight through
+    writer = GraphvizWriter(
+        DotWriter[int, None](),
+        command=[sys.executable, "-c", "import shutil, sys; shutil.copyfileobj(sys.stdin.buffer, sys.stdout.buffer)"],
+    )
+    output = BytesIO()
+    writer.write_to(tree(), output)
+    assert output.getvalue() == writer.dot_writer.write(tree())
+
+
+def test_write_command_fails() -> None:
+    writer = GraphvizWriter(
+        DotWriter[int, None](), command=[sys.executable, "-c", "import sys; sys.exit('syntax error')"]
+    )
+    with pytest.raises(GraphvizError, match="syntax error"):
+        writer.write(tree())
+
+
+def test_write_dot_fails() -> None:
+    def fail(entity: Entity[int, None]) -> dict[str, Id]:
+        raise ValueError(f"bad entity: {entity.key}")
+
+    dot_writer = DotWriter(
+        DotWriterConfig[int, None](node=NodesConfig(attributes=DynamicNodeAttributesConfig(entity=fail)))
+    )
+    writer = GraphvizWriter(dot_writer, command=[sys.executable, "-c", "import sys; sys.stdin.read()"])
+    with pytest.raises(ValueError, match="bad entity"):
+        writer.write(tree())
+
+
+def test_write_files(tmp_path: Path) -> None:
+    writer = GraphvizWriter(DotWriter[int, None](), command=[sys.executable, "-c", FAKE_DOT])
+    dot = writer.dot_writer.write(tree())
+
+    writer.write_files(tree(), {"pdf": tmp_path / "tree.pdf", "svg": tmp_path / "tree.svg"})
+    assert (tmp_path / "tree.pdf").read_bytes() == b"pdf:" + dot
+    assert (tmp_path / "tree.svg").read_bytes() == b"svg:" + dot
+
+    (tmp_path / "tree.dot").write_bytes(dot)
+    writer.write_files(tree(), {"png": tmp_path / "tree.png"}, tmp_path / "tree.dot")
+    assert (tmp_path / "tree.png").read_bytes() == b"png:" + dot
+
+
+@dataclass
+class FakeGvc:
+    rendered: list[tuple[bytes, str]] = field(default_factory=list)
+
+    def render(self, dot: bytes, output_format: str) -> bytes:
+        self.rendered.append((dot, output_format))
+        return output_format.encode() + b":" + dot
+
+
+def test_write_in_process(monkeypatch: pytest.MonkeyPatch) -> None:
+    fake = FakeGvc()
+    monkeypatch.setattr(graphviz, "load_gvc", lambda: fake)
+    writer = GraphvizWriter(
+        DotWriter[int, None](),
+        "svg",
+        command=[sys.executable, "-c", "import sys; sys.exit('not in process')"],
+        config=GraphvizWriterConfig(in_process=True),
+    )
+    dot = writer.dot_writer.write(tree())
+    assert writer.write(tree()) == b"svg:" + dot
+    assert fake.rendered == [(dot, "svg")]
+
+
+def test_write_in_process_fallback(monkeypatch: pytest.MonkeyPatch) -> None:
+    monkeypatch.setattr(graphviz, "load_gvc", lambda: None)
+    writer = GraphvizWriter(
+        DotWriter[int, None](),
+        command=[sys.executable, "-c", "import shutil, sys; shutil.copyfileobj(sys.stdin.buffer, sys.stdout.buffer)"],
+        config=GraphvizWriterConfig(in_process=True),
+    )
+    assert writer.write(tree()) == writer.dot_writer.write(tree())
+
+
+# Stands in for Graphviz by writing its arguments and then its input to each
+# output file given with -o
+ECHO_DOT = """
+import sys
+dot = sys.stdin.buffer.read()
+arguments = sys.argv[1:]
+for i, argument in enumerate(arguments):
+    if argument == "-o":
+        with open(arguments[i + 1], "wb") as f:
+            f.write(" ".join(arguments).encode() + b"\\n" + dot)
+"""
+
+
+def test_write_incremental(tmp_path: Path) -> None:
+    layout = tmp_path / "layout.dot"
+    writer = GraphvizWriter(
+        DotWriter[int, None](),
+        command=[sys.executable, "-c", ECHO_DOT],
+        config=GraphvizWriterConfig(layout=layout),
+    )
+    dot = writer.dot_writer.write(tree())
+
+    writer.write_files(tree(), {"svg": tmp_path / "tree.svg"})
+    assert (
+        layout.read_bytes()
+        == f"-T dot -o {tmp_path / '.layout.dot.new'} -T svg -o {tmp_path / 'tree.svg'}\n".encode() + dot
+    )
+
+    # Every node was laid out the last time, so none are placed again
+    layout.write_text(
+        "digraph {\n"
+        + "".join(f'"{name}" [pos="{i},{i}"];\n' for i, name in enumerate(DotContents.read(dot.decode()).nodes))
+        + "}\n",
+        encoding="utf-8",
+    )
+    writer.write_files(tree(), {"svg": tmp_path / "tree.svg"})
+    arguments, pinned = (tmp_path / "tree.svg").read_text(encoding="utf-8").split("\n", 1)
+    assert arguments.startswith("-Kneato -n2 ")
+    assert pinned.startswith(dot.decode().rstrip().removesuffix("}"))
+    assert '"2" [pos="' in pinned
+
+
+# Stands in for Graphviz by echoing its engine and input, after hanging if the
+# engine is dot
+SLOW_DOT = """
+import sys, time
+dot = sys.stdin.buffer.read()
+if "-Kdot" in sys.argv:
+    time.sleep(60)
+sys.stdout.buffer.write(sys.argv[1].encode() + b"\\n" + dot)
+"""
+
+
+def test_layout_policy_strategies() -> None:
+    small, large = LayoutStrategy(), LayoutStrategy("twopi")
+    policy = LayoutPolicy([LayoutTier(1, [small]), LayoutTier(None, [large])])
+    assert policy.strategies(1) == [small]
+    assert policy.strategies(2) == [large]
+    assert SFDP.arguments == ["-Ksfdp", "-Goverlap=prism", "-Gsplines=line"]
+
+
+def test_write_falls_back_when_out_of_time() -> None:
+    policy = LayoutPolicy([LayoutTier(None, [LayoutStrategy(), LayoutStrategy("sfdp")])], budget=1)
+    writer = GraphvizWriter(
+        DotWriter[int, None](),
+        command=[sys.executable, "-c", SLOW_DOT],
+        config=GraphvizWriterConfig(policy=policy),
+    )
+    assert writer.write(tree()) == b"-Ksfdp\n" + writer.dot_writer.write(tree())
+
+
+def test_write_out_of_time() -> None:
+    policy = LayoutPolicy([LayoutTier(None, [LayoutStrategy()])], budget=0.5)
+    writer = GraphvizWriter(
+        DotWriter[int, None](),
+        command=[sys.executable, "-c", SLOW_DOT],
+        config=GraphvizWriterConfig(policy=policy),
+    )
+    with pytest.raises(GraphvizTimeoutError, match="within 0.5 seconds"):
+        writer.write(tree())
@@ -0,0 +1,84 @@
+from xml.etree import ElementTree
+
+from snutree.model.entity import Entity, EntityId, ParentKeyStatus
+from snutree.model.tree import FamilyTree
+from snutree.writer.dot import (
+    DefaultAttributesConfig,
+    DefaultNodeAttributesConfig,
+    DotWriter,
+    DotWriterConfig,
+    DynamicNodeAttributesConfig,
+    GraphsConfig,
+    NodesConfig,
+)
+from snutree.writer.tidy import TidyWriter
+
+SVG = "{http://www.w3.org/2000/svg}"
+
+
+def tree() -> FamilyTree[int, None]:
+    return FamilyTree[int, None](
+        rank_type=int,
+        entities=[
+            Entity(ParentKeyStatus.NONE, EntityId("a"), 1, None),
+            Entity(EntityId("a"), EntityId("b"), 2, None),
+            Entity(EntityId("a"), EntityId("c"), 3, None),
+            Entity(ParentKeyStatus.NONE, EntityId("d"), 3, None),
+        ],
+        relationships=set(),
+    )
+
+
+def labels(svg: bytes) -> dict[str, tuple[float, float]]:
+    """
+    Return the point of each label in the SVG.
+    """
+    points: dict[str, tuple[float, float]] = {}
+    for span in ElementTree.fromstring(svg).iter(f"{SVG}tspan"):
+        assert span.text is not None
+        points[span.text] = (float(span.attrib["x"]), float(span.attrib["y"]))
+    return points
+
+
+def test_write() -> None:
+    writer = TidyWriter(
+        DotWriter(
+            DotWriterConfig[int, None](
+                node=NodesConfig(
+                    defaults=DefaultNodeAttributesConfig(root={"shape": "box"}),
+                    attributes=DynamicNodeAttributesConfig(
+                        by_key={"a": {"label": "A\\nroot"}, "d": {"style": "invis"}},
+                    ),
+                ),
+            )
+        )
+    )
+    svg = writer.write(tree())
+    points = labels(svg)
+
+    # Each rank is drawn at the same depth, with its own nodes on either side
+    assert points["A"][1] < points["b"][1] < points["c"][1]
+    assert points["c"][1] == points["3L"][1] == points["3R"][1]
+    assert points["3L"][0] < points["A"][0] < points["3R"][0]
+    assert points["root"][1] > points["A"][1]
+
+    # Invisible nodes take up space but aren't drawn
+    assert "d" not in points
+    root = ElementTree.fromstring(svg)
+    assert len(list(root.iter(f"{SVG}rect"))) == 3 + 2 * 3
+    assert len(list(root.iter(f"{SVG}line"))) == 2
+
+
+def test_write_left_to_right() -> None:
+    writer = TidyWriter(
+        DotWriter(
+            DotWriterConfig[int, None](
+                draw_ranks=False,
+                graph=GraphsConfig(defaults=DefaultAttributesConfig(root={"rankdir": "LR", "label": "Tree"})),
+            )
+        )
+    )
+    points = labels(writer.write(tree()))
+    assert points["a"][0] < points["b"][0] < points["c"][0]
+    assert "3L" not in points
+    assert "Tree" in points